@@ -9,11 +9,19 @@ from flask import (
     url_for,
 )
 import json
-from backend.db_connection import db
+from backend.db_connection import tx
+from backend.db_connection import streaming
+from backend.db_connection import pagination
 from mysql.connector import Error
 
 Elizabeth = Blueprint("Elizabeth", __name__)
 
+# Sort keys for ?limit=/&cursor= pagination (see pagination.py)
+ERROR_PAGE_KEYS = [("errorID", "errorID")]
+UPDATE_PAGE_KEYS = [("updateID", "updateID")]
+PERMISSION_PAGE_KEYS = [("adminID", "adminID"), ("permission", "permission")]
+CONTACT_PAGE_KEYS = [("adminID", "adminID"), ("eboardID", "eboardID")]
+
 # welcome message for admin page
 @Elizabeth.route("/")
 def welcome_admin():
@@ -28,7 +36,7 @@ def welcome_admin():
 def get_all_errors():
     try:
         current_app.logger.info('Retrieving all errors')
-        cursor = db.get_db().cursor()
+        page = pagination.from_request(ERROR_PAGE_KEYS)
         
         # Get query parameters for filtering 
         error_type = request.args.get("errorType")
@@ -47,13 +55,20 @@ def get_all_errors():
         
         if conditions:
             query += " WHERE " + " AND ".join(conditions)
+        query += page.where(has_where=bool(conditions)) + page.order_by()
+        params += page.params
+        
+        # ?stream=json or ?stream=ndjson sends rows as they are read
+        stream_format = streaming.requested()
+        if stream_format:
+            return streaming.stream_query(query, params, fmt=stream_format)
         
-        cursor.execute(query, params)
-        errors = cursor.fetchall()
-        cursor.close()
+        with tx.cursor() as cursor:
+            cursor.execute(query, params)
+            errors = page.trim(cursor.fetchall())
         
         current_app.logger.info(f'Successfully retrieved {len(errors)} errors.')
-        return jsonify(errors), 200
+        return jsonify(errors), 200, page.headers()
         
     except Error as e:
         current_app.logger.error(f'Database error in get_all_errors: {str(e)}')
@@ -64,16 +79,14 @@ def get_all_errors():
 def get_error(errorId):
     try:
         current_app.logger.info(f'Retrieving error with ID: {errorId}')
-        cursor = db.get_db().cursor()
-        
-        cursor.execute("SELECT * FROM error WHERE errorID = %s", (errorId,))
-        error = cursor.fetchone()
+        with tx.cursor() as cursor:
+            cursor.execute("SELECT * FROM error WHERE errorID = %s", (errorId,))
+            error = cursor.fetchone()
         
         if not error:
             current_app.logger.warning(f'Error ID {errorId} not found')
             return jsonify({"error": "Error not found"}), 404
         
-        cursor.close()
         current_app.logger.info(f'Successfully retrieved error ID: {errorId}')
         return jsonify(error), 200
         
@@ -86,16 +99,13 @@ def get_error(errorId):
 def delete_error(errorId):
     try:
         current_app.logger.info(f'Deleting error ID: {errorId}')
-        cursor = db.get_db().cursor()
-        
-        cursor.execute("SELECT * FROM error WHERE errorID = %s", (errorId,))
-        if not cursor.fetchone():
-            current_app.logger.warning(f'Error ID {errorId} not found for deletion')
-            return jsonify({"error": "Error not found"}), 404
+        with tx.transaction() as cursor:
+            cursor.execute("SELECT * FROM error WHERE errorID = %s", (errorId,))
+            if not cursor.fetchone():
+                current_app.logger.warning(f'Error ID {errorId} not found for deletion')
+                return jsonify({"error": "Error not found"}), 404
         
-        cursor.execute("DELETE FROM error WHERE errorID = %s", (errorId,))
-        db.get_db().commit()
-        cursor.close()
+            cursor.execute("DELETE FROM error WHERE errorID = %s", (errorId,))
         
         current_app.logger.info(f'Successfully deleted error ID: {errorId}')
         return jsonify({"message": "Error deleted successfully", "deleted_error_id": errorId}), 200
@@ -109,8 +119,7 @@ def delete_error(errorId):
 def get_all_updates():
     try:
         current_app.logger.info('Retrieving all updates')
-        cursor = db.get_db().cursor()
-        
+        page = pagination.from_request(UPDATE_PAGE_KEYS)
         # Get query parameters 
         update_type = request.args.get("updateType")
         update_status = request.args.get("updateStatus")
@@ -132,13 +141,15 @@ def get_all_updates():
         
         if conditions:
             query += " WHERE " + " AND ".join(conditions)
+        query += page.where(has_where=bool(conditions)) + page.order_by()
+        params += page.params
         
-        cursor.execute(query, params)
-        updates = cursor.fetchall()
-        cursor.close()
+        with tx.cursor() as cursor:
+            cursor.execute(query, params)
+            updates = page.trim(cursor.fetchall())
         
         current_app.logger.info(f'Successfully retrieved {len(updates)} updates.')
-        return jsonify(updates), 200
+        return jsonify(updates), 200, page.headers()
         
     except Error as e:
         current_app.logger.error(f'Database error in get_all_updates: {str(e)}')
@@ -149,16 +160,14 @@ def get_all_updates():
 def get_update(update_id):
     try:
         current_app.logger.info(f'Retrieving update with ID: {update_id}')
-        cursor = db.get_db().cursor()
-        
-        cursor.execute("SELECT * FROM `update` WHERE updateID = %s", (update_id,))
-        update = cursor.fetchone()
+        with tx.cursor() as cursor:
+            cursor.execute("SELECT * FROM `update` WHERE updateID = %s", (update_id,))
+            update = cursor.fetchone()
         
         if not update:
             current_app.logger.warning(f'Update ID {update_id} not found')
             return jsonify({"error": "Update not found"}), 404
         
-        cursor.close()
         current_app.logger.info(f'Successfully retrieved update ID: {update_id}')
         return jsonify(update), 200
         
@@ -172,34 +181,31 @@ def update_update_status(update_id):
     try:
         current_app.logger.info(f'Updating update ID: {update_id}')
         data = request.get_json()
-        cursor = db.get_db().cursor()
-        
-        cursor.execute("SELECT * FROM `update` WHERE updateID = %s", (update_id,))
-        if not cursor.fetchone():
-            current_app.logger.warning(f'Update ID {update_id} not found')
-            return jsonify({"error": "Update not found"}), 404
+        with tx.transaction() as cursor:
+            cursor.execute("SELECT * FROM `update` WHERE updateID = %s", (update_id,))
+            if not cursor.fetchone():
+                current_app.logger.warning(f'Update ID {update_id} not found')
+                return jsonify({"error": "Update not found"}), 404
 
        
-        update_fields = []
-        params = []
+            update_fields = []
+            params = []
         
-        allowed_fields = ["adminID", "updateStatus", "scheduledTime", "startTime", 
-                         "endTime", "updateType", "availability"]
+            allowed_fields = ["adminID", "updateStatus", "scheduledTime", "startTime", 
+                             "endTime", "updateType", "availability"]
 
-        for field in allowed_fields:
-            if field in data:
-                update_fields.append(f"{field} = %s")
-                params.append(data[field])
+            for field in allowed_fields:
+                if field in data:
+                    update_fields.append(f"{field} = %s")
+                    params.append(data[field])
 
-        if not update_fields:
-            return jsonify({"error": "No valid fields to update"}), 400
+            if not update_fields:
+                return jsonify({"error": "No valid fields to update"}), 400
 
-        params.append(update_id)
-        query = f"UPDATE `update` SET {', '.join(update_fields)} WHERE updateID = %s"
+            params.append(update_id)
+            query = f"UPDATE `update` SET {', '.join(update_fields)} WHERE updateID = %s"
 
-        cursor.execute(query, params)
-        db.get_db().commit()
-        cursor.close()
+            cursor.execute(query, params)
 
         current_app.logger.info(f'Successfully updated update ID: {update_id}')
         return jsonify({"message": "Update status updated successfully"}), 200
@@ -220,17 +226,14 @@ def create_notification():
             if field not in data:
                 return jsonify({"error": f"Missing required field: {field}"}), 400
 
-        cursor = db.get_db().cursor()
-
         query = """
         INSERT INTO updateNotifications (notification, updateID)
         VALUES (%s, %s)
         """
-        cursor.execute(query, (data["notification"], data["updateID"]))
+        with tx.transaction() as cursor:
+            cursor.execute(query, (data["notification"], data["updateID"]))
 
-        db.get_db().commit()
-        new_notification_id = cursor.lastrowid
-        cursor.close()
+            new_notification_id = cursor.lastrowid
 
         current_app.logger.info(f'Successfully created notification with ID: {new_notification_id}')
         return jsonify({"message": "Notification created successfully", 
@@ -244,8 +247,7 @@ def create_notification():
 def get_all_admin_permissions():
     try:
         current_app.logger.info('Retrieving all admin permissions')
-        cursor = db.get_db().cursor()
-        
+        page = pagination.from_request(PERMISSION_PAGE_KEYS)
         admin_id = request.args.get("adminID")
         permission = request.args.get("permission")
         
@@ -262,13 +264,15 @@ def get_all_admin_permissions():
         
         if conditions:
             query += " WHERE " + " AND ".join(conditions)
+        query += page.where(has_where=bool(conditions)) + page.order_by()
+        params += page.params
         
-        cursor.execute(query, params)
-        permissions = cursor.fetchall()
-        cursor.close()
+        with tx.cursor() as cursor:
+            cursor.execute(query, params)
+            permissions = page.trim(cursor.fetchall())
         
         current_app.logger.info(f'Successfully retrieved {len(permissions)} admin permissions.')
-        return jsonify(permissions), 200
+        return jsonify(permissions), 200, page.headers()
         
     except Error as e:
         current_app.logger.error(f'Database error in get_all_admin_permissions: {str(e)}')
@@ -279,16 +283,14 @@ def get_all_admin_permissions():
 def get_admin_permissions(admin_id):
     try:
         current_app.logger.info(f'Fetching permissions for admin ID: {admin_id}')
-        cursor = db.get_db().cursor()
-        
-        cursor.execute("SELECT * FROM adminPermissions WHERE adminID = %s", (admin_id,))
-        permissions = cursor.fetchone()
+        with tx.cursor() as cursor:
+            cursor.execute("SELECT * FROM adminPermissions WHERE adminID = %s", (admin_id,))
+            permissions = cursor.fetchone()
         
         if not permissions:
             current_app.logger.warning(f'Admin ID {admin_id} permissions not found')
             return jsonify({"error": "Admin permissions not found"}), 404
         
-        cursor.close()
         current_app.logger.info(f'Successfully retrieved permissions for admin ID: {admin_id}')
         return jsonify(permissions), 200
         
@@ -302,29 +304,26 @@ def update_admin_permissions(admin_id):
     try:
         current_app.logger.info(f'Updating permissions for admin ID: {admin_id}')
         data = request.get_json()
-        cursor = db.get_db().cursor()
-        
-        cursor.execute("SELECT * FROM adminPermissions WHERE adminID = %s", (admin_id,))
-        if not cursor.fetchone():
-            current_app.logger.warning(f'Admin ID {admin_id} permissions not found')
-            return jsonify({"error": "Admin permissions not found"}), 404
+        with tx.transaction() as cursor:
+            cursor.execute("SELECT * FROM adminPermissions WHERE adminID = %s", (admin_id,))
+            if not cursor.fetchone():
+                current_app.logger.warning(f'Admin ID {admin_id} permissions not found')
+                return jsonify({"error": "Admin permissions not found"}), 404
 
-        update_fields = []
-        params = []
+            update_fields = []
+            params = []
         
-        if "permission" in data:
-            update_fields.append("permission = %s")
-            params.append(data["permission"])
+            if "permission" in data:
+                update_fields.append("permission = %s")
+                params.append(data["permission"])
 
-        if not update_fields:
-            return jsonify({"error": "No valid fields to update"}), 400
+            if not update_fields:
+                return jsonify({"error": "No valid fields to update"}), 400
 
-        params.append(admin_id)
-        query = f"UPDATE adminPermissions SET {', '.join(update_fields)} WHERE adminID = %s"
+            params.append(admin_id)
+            query = f"UPDATE adminPermissions SET {', '.join(update_fields)} WHERE adminID = %s"
 
-        cursor.execute(query, params)
-        db.get_db().commit()
-        cursor.close()
+            cursor.execute(query, params)
 
         current_app.logger.info(f'Successfully updated permissions for admin ID: {admin_id}')
         return jsonify({"message": "Admin permissions updated successfully"}), 200
@@ -345,16 +344,12 @@ def create_admin_permissions():
             if field not in data:
                 return jsonify({"error": f"Missing required field: {field}"}), 400
 
-        cursor = db.get_db().cursor()
-
         query = """
         INSERT INTO adminPermissions (adminID, permission)
         VALUES (%s, %s)
         """
-        cursor.execute(query, (data["adminID"], data["permission"]))
-
-        db.get_db().commit()
-        cursor.close()
+        with tx.transaction() as cursor:
+            cursor.execute(query, (data["adminID"], data["permission"]))
 
         current_app.logger.info(f'Successfully created permissions for admin ID: {data["adminID"]}')
         return jsonify({"message": "Admin permissions created successfully", 
@@ -368,8 +363,7 @@ def create_admin_permissions():
 def get_all_eboard_contacts():
     try:
         current_app.logger.info('Retrieving all eboard contacts')
-        cursor = db.get_db().cursor()
-        
+        page = pagination.from_request(CONTACT_PAGE_KEYS)
         eboard_id = request.args.get("eboardID")
         admin_id = request.args.get("adminID")
         
@@ -386,13 +380,15 @@ def get_all_eboard_contacts():
         
         if conditions:
             query += " WHERE " + " AND ".join(conditions)
+        query += page.where(has_where=bool(conditions)) + page.order_by()
+        params += page.params
         
-        cursor.execute(query, params)
-        contacts = cursor.fetchall()
-        cursor.close()
+        with tx.cursor() as cursor:
+            cursor.execute(query, params)
+            contacts = page.trim(cursor.fetchall())
         
         current_app.logger.info(f'Successfully retrieved {len(contacts)} eboard contacts.')
-        return jsonify(contacts), 200
+        return jsonify(contacts), 200, page.headers()
         
     except Error as e:
         current_app.logger.error(f'Database error in get_all_eboard_contacts: {str(e)}')
@@ -403,16 +399,14 @@ def get_all_eboard_contacts():
 def get_eboard_contact(eboard_id):
     try:
         current_app.logger.info(f'Fetching contact info for E-board ID: {eboard_id}')
-        cursor = db.get_db().cursor()
-        
-        cursor.execute("SELECT * FROM adminContact WHERE eboardID = %s", (eboard_id,))
-        contact = cursor.fetchone()
+        with tx.cursor() as cursor:
+            cursor.execute("SELECT * FROM adminContact WHERE eboardID = %s", (eboard_id,))
+            contact = cursor.fetchone()
         
         if not contact:
             current_app.logger.warning(f'E-board ID {eboard_id} contact not found')
             return jsonify({"error": "E-board contact not found"}), 404
         
-        cursor.close()
         current_app.logger.info(f'Successfully retrieved contact for E-board ID: {eboard_id}')
         return jsonify(contact), 200
         
@@ -425,7 +419,7 @@ def get_eboard_contact(eboard_id):
 def get_all_system_errors():
     try:
         current_app.logger.info('Retrieving all system errors')
-        cursor = db.get_db().cursor()
+        page = pagination.from_request(ERROR_PAGE_KEYS)
         
         system_id = request.args.get("systemID")
         error_type = request.args.get("errorType")
@@ -443,13 +437,19 @@ def get_all_system_errors():
         
         if conditions:
             query += " WHERE " + " AND ".join(conditions)
+        query += page.where(has_where=bool(conditions)) + page.order_by()
+        params += page.params
         
-        cursor.execute(query, params)
-        errors = cursor.fetchall()
-        cursor.close()
+        stream_format = streaming.requested()
+        if stream_format:
+            return streaming.stream_query(query, params, fmt=stream_format)
+        
+        with tx.cursor() as cursor:
+            cursor.execute(query, params)
+            errors = page.trim(cursor.fetchall())
         
         current_app.logger.info(f'Successfully retrieved {len(errors)} system errors')
-        return jsonify(errors), 200
+        return jsonify(errors), 200, page.headers()
         
     except Error as e:
         current_app.logger.error(f'Database error in get_all_system_errors: {str(e)}')
@@ -460,16 +460,14 @@ def get_all_system_errors():
 def get_system_error(errorId):
     try:
         current_app.logger.info(f'Fetching system error with ID: {errorId}')
-        cursor = db.get_db().cursor()
-        
-        cursor.execute("SELECT * FROM error WHERE errorID = %s", (errorId,))
-        error = cursor.fetchone()
+        with tx.cursor() as cursor:
+            cursor.execute("SELECT * FROM error WHERE errorID = %s", (errorId,))
+            error = cursor.fetchone()
         
         if not error:
             current_app.logger.warning(f'System error ID {errorId} not found')
             return jsonify({"error": "System error not found"}), 404
         
-        cursor.close()
         current_app.logger.info(f'Successfully retrieved system error ID: {errorId}')
         return jsonify(error), 200
         
@@ -482,16 +480,13 @@ def get_system_error(errorId):
 def delete_system_error(errorId):
     try:
         current_app.logger.info(f'Deleting system error ID: {errorId}')
-        cursor = db.get_db().cursor()
-        
-        cursor.execute("SELECT * FROM error WHERE errorID = %s", (errorId,))
-        if not cursor.fetchone():
-            current_app.logger.warning(f'System error ID {errorId} not found')
-            return jsonify({"error": "System error not found"}), 404
+        with tx.transaction() as cursor:
+            cursor.execute("SELECT * FROM error WHERE errorID = %s", (errorId,))
+            if not cursor.fetchone():
+                current_app.logger.warning(f'System error ID {errorId} not found')
+                return jsonify({"error": "System error not found"}), 404
         
-        cursor.execute("DELETE FROM error WHERE errorID = %s", (errorId,))
-        db.get_db().commit()
-        cursor.close()
+            cursor.execute("DELETE FROM error WHERE errorID = %s", (errorId,))
         
         current_app.logger.info(f'Successfully deleted system error ID: {errorId}')
         return jsonify({"message": "System error deleted successfully", 
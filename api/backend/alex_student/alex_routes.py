@@ -1,49 +1,83 @@
 from flask import Blueprint, jsonify, request
-from backend.db_connection import db
+from backend.db_connection import db, tx
+from backend.db_connection import pagination
+from backend.cache import cache, idempotency
 from mysql.connector import Error
 from flask import current_app
 from datetime import datetime, date
+from backend.alex_student import registration
+from backend.alex_student import club_search
+from backend.alex_student import applications
+from backend.alex_student import waitlist
+from backend.alex_student import holds
+from backend.alex_student.holds import seat_holds
+from backend.alex_student.search_log import search_log
+from backend.metrics import query_budget
+from backend.willow.rollups import rollups
 
 # Routes for everything a student can do (search clubs, apply, update apps, etc.)
 students = Blueprint("students", __name__)
 
+# Sort keys for ?limit=/&cursor= pagination (see pagination.py)
+CLUB_PAGE_KEYS = [("clubID", "clubID")]
+APPLICATION_PAGE_KEYS = [
+    ("application.dateSubmitted", "dateSubmitted", "DESC"),
+    ("applicationID", "applicationID", "DESC"),
+]
+
 
 # Story 1
 # Let students search for clubs. They can also filter by campus or gradLevel.
 # Example: /student/clubs?campus=Boston&gradLevel=undergrad
+# Add ?q=robotics to search names and descriptions, best match first
+# (each result then has a "relevance" score)
+# Searches with q or a filter are logged to search / searchFilters and
+# counted in club.numSearches (pass ?studentID= to tie them to a student)
+# Add ?limit=20 to page through results (next page: &cursor=<X-Next-Cursor>)
 @students.route("/clubs", methods=["GET"])
+@search_log.logs_searches
+@cache.cached(ttl=300, tags=["clubs"])
 def get_clubs():
     try:
         current_app.logger.info("Starting get_clubs request")
-        cursor = db.get_db().cursor()
-
-        # Base query – we add filters only if they're provided
-        query = """
-            SELECT clubID, name, gradLevel, campus, description,
-                   numMembers, numSearches
-            FROM club
-            WHERE 1=1
-        """
-
-        params = []
+        text = request.args.get("q", "").strip()
+        page = pagination.from_request(club_search.SEARCH_PAGE_KEYS if text else CLUB_PAGE_KEYS)
 
         # Optional filters
+        filters = ""
+        params = []
         campus = request.args.get("campus")
         grad_level = request.args.get("gradLevel")
 
         if campus:
-            query += " AND campus = %s"
+            filters += " AND campus = %s"
             params.append(campus)
 
         if grad_level:
-            query += " AND gradLevel = %s"
+            filters += " AND gradLevel = %s"
             params.append(grad_level)
 
-        cursor.execute(query, params)
-        clubs = cursor.fetchall()
-        cursor.close()
+        if text:
+            with tx.cursor() as cursor:
+                clubs = club_search.search_clubs(cursor, text, filters, params, page)
+            return jsonify(clubs), 200, page.headers()
 
-        return jsonify(clubs), 200
+        # Base query – we add filters only if they're provided
+        query = """
+            SELECT clubID, name, gradLevel, campus, description,
+                   numMembers, numSearches
+            FROM club
+            WHERE 1=1
+        """ + filters
+
+        query += page.where(has_where=True) + page.order_by()
+        params += page.params
+
+        with tx.cursor() as cursor:
+            cursor.execute(query, params)
+            clubs = page.trim(cursor.fetchall())
+
+        return jsonify(clubs), 200, page.headers()
 
     except Error as e:
         current_app.logger.error(f"Database error in get_clubs: {str(e)}")
@@ -57,21 +91,21 @@ def get_clubs():
 def get_student_applications(studentID):
     try:
         current_app.logger.info("Starting get_student_applications request")
-        cursor = db.get_db().cursor()
+        page = pagination.from_request(APPLICATION_PAGE_KEYS)
 
         query = """
             SELECT applicationID, clubID, studentID,
                    DATE_FORMAT(dateSubmitted, '%%Y-%%m-%%d') as dateSubmitted, status
             FROM application
             WHERE studentID = %s
-            ORDER BY dateSubmitted DESC
         """
+        query += page.where(has_where=True) + page.order_by()
 
-        cursor.execute(query, (studentID,))
-        apps = cursor.fetchall()
-        cursor.close()
+        with tx.cursor() as cursor:
+            cursor.execute(query, [studentID] + page.params)
+            apps = page.trim(cursor.fetchall())
 
-        return jsonify(apps), 200
+        return jsonify(apps), 200, page.headers()
 
     except Error as e:
         current_app.logger.error(f"Database error: {str(e)}")
@@ -87,6 +121,8 @@ def get_student_applications(studentID):
 #   "dateSubmitted": "2025-12-02"
 # }
 @students.route("/applications", methods=["POST"])
+@idempotency.keyed
+@tx.retrying
 def create_application():
     try:
         current_app.logger.info("Starting create_application request")
@@ -102,34 +138,30 @@ def create_application():
                 "error": "studentID, clubID, and dateSubmitted are required"
             }), 400
 
-        cursor = db.get_db().cursor()
-
-        # Validate that student exists
-        cursor.execute("SELECT studentID FROM student WHERE studentID = %s", (student_id,))
-        if not cursor.fetchone():
-            cursor.close()
-            return jsonify({
-                "error": f"Student ID {student_id} does not exist. Please use a valid student ID."
-            }), 400
+        with tx.transaction() as cursor:
+            # Validate that student exists
+            cursor.execute("SELECT studentID FROM student WHERE studentID = %s", (student_id,))
+            if not cursor.fetchone():
+                return jsonify({
+                    "error": f"Student ID {student_id} does not exist. Please use a valid student ID."
+                }), 400
 
-        # Validate that club exists
-        cursor.execute("SELECT clubID FROM club WHERE clubID = %s", (club_id,))
-        if not cursor.fetchone():
-            cursor.close()
-            return jsonify({
-                "error": f"Club ID {club_id} does not exist. Please use a valid club ID."
-            }), 400
+            # Validate that club exists
+            cursor.execute("SELECT clubID FROM club WHERE clubID = %s", (club_id,))
+            if not cursor.fetchone():
+                return jsonify({
+                    "error": f"Club ID {club_id} does not exist. Please use a valid club ID."
+                }), 400
 
-        insert_query = """
-            INSERT INTO application (clubID, studentID, dateSubmitted, status)
-            VALUES (%s, %s, %s, %s)
-        """
+            insert_query = """
+                INSERT INTO application (clubID, studentID, dateSubmitted, status)
+                VALUES (%s, %s, %s, %s)
+            """
 
-        cursor.execute(insert_query, (club_id, student_id, date_submitted, "pending"))
-        db.get_db().commit()
+            cursor.execute(insert_query, (club_id, student_id, date_submitted, "pending"))
+            new_id = cursor.lastrowid
 
-        new_id = cursor.lastrowid
-        cursor.close()
+        rollups.mark_club(club_id)
 
         return jsonify({
             "message": "Application created",
@@ -152,10 +184,63 @@ def create_application():
         return jsonify({"error": str(e)}), 500
 
 
+# Story 2 (club fair week)
+# Student applies to many clubs in one request.  All IDs are checked with
+# set-based queries and the applications go in with one INSERT.
+# JSON body should look like:
+# {
+#   "applications": [
+#     {"studentID": 1, "clubID": 3, "dateSubmitted": "2025-12-02"},
+#     {"studentID": 1, "clubID": 4, "dateSubmitted": "2025-12-02"}
+#   ]
+# }
+# or, for one student: {"studentID": 1, "clubIDs": [3, 4], "dateSubmitted": "2025-12-02"}
+@students.route("/applications/batch", methods=["POST"])
+@tx.retrying
+def create_applications_batch():
+    try:
+        current_app.logger.info("Starting create_applications_batch request")
+        data = request.get_json() or {}
+
+        items = data.get("applications")
+        if items is None and "clubIDs" in data:
+            items = [
+                {"studentID": data.get("studentID"), "clubID": club_id, "dateSubmitted": data.get("dateSubmitted")}
+                for club_id in data.get("clubIDs") or []
+            ]
+
+        if not isinstance(items, list) or not items:
+            return jsonify({
+                "error": "applications (a non-empty list) or studentID, clubIDs and dateSubmitted are required"
+            }), 400
+
+        if len(items) > applications.MAX_BATCH:
+            return jsonify({
+                "error": f"At most {applications.MAX_BATCH} applications can be submitted at once"
+            }), 400
+
+        results = applications.submit_applications(db.get_db(), items)
+
+        created = [r for r in results if r["status"] == applications.CREATED]
+        rollups.mark_club(*{r["clubID"] for r in created})
+
+        return jsonify({
+            "message": f"{len(created)} of {len(results)} applications created",
+            "created": len(created),
+            "rejected": len(results) - len(created),
+            "results": results
+        }), 201 if created else 400
+
+    except Error as e:
+        current_app.logger.error(f"Database error in create_applications_batch: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
 # Story 4
 # Student updates their application (ex: withdraw, change status, etc.)
 # JSON body: { "status": "withdrawn" }
 @students.route("/applications/<int:applicationID>", methods=["PUT"])
+@tx.retrying
 def update_application(applicationID):
     try:
         current_app.logger.info("Starting update_application request")
@@ -165,26 +250,22 @@ def update_application(applicationID):
         if not new_status:
             return jsonify({"error": "status is required"}), 400
 
-        cursor = db.get_db().cursor()
-
-        # Check if the application exists
-        cursor.execute(
-            "SELECT applicationID FROM application WHERE applicationID = %s",
-            (applicationID,)
-        )
-        if not cursor.fetchone():
-            cursor.close()
-            return jsonify({"error": "Application not found"}), 404
-
-        update_query = """
-            UPDATE application
-            SET status = %s
-            WHERE applicationID = %s
-        """
+        with tx.transaction() as cursor:
+            # Check if the application exists
+            cursor.execute(
+                "SELECT applicationID FROM application WHERE applicationID = %s",
+                (applicationID,)
+            )
+            if not cursor.fetchone():
+                return jsonify({"error": "Application not found"}), 404
+
+            update_query = """
+                UPDATE application
+                SET status = %s
+                WHERE applicationID = %s
+            """
 
-        cursor.execute(update_query, (new_status, applicationID))
-        db.get_db().commit()
-        cursor.close()
+            cursor.execute(update_query, (new_status, applicationID))
 
         return jsonify({"message": "Application updated"}), 200
 
@@ -196,26 +277,26 @@ def update_application(applicationID):
 # Story 4 (delete/withdraw an application)
 # Student wants to remove an app they no longer care about
 @students.route("/applications/<int:applicationID>", methods=["DELETE"])
+@tx.retrying
 def delete_application(applicationID):
     try:
         current_app.logger.info("Starting delete_application request")
-        cursor = db.get_db().cursor()
-
-        # Make sure the application exists
-        cursor.execute(
-            "SELECT applicationID FROM application WHERE applicationID = %s",
-            (applicationID,)
-        )
-        if not cursor.fetchone():
-            cursor.close()
-            return jsonify({"error": "Application not found"}), 404
-
-        cursor.execute(
-            "DELETE FROM application WHERE applicationID = %s",
-            (applicationID,)
-        )
-        db.get_db().commit()
-        cursor.close()
+        with tx.transaction() as cursor:
+            # Make sure the application exists
+            cursor.execute(
+                "SELECT applicationID, clubID FROM application WHERE applicationID = %s",
+                (applicationID,)
+            )
+            application = cursor.fetchone()
+            if not application:
+                return jsonify({"error": "Application not found"}), 404
+
+            cursor.execute(
+                "DELETE FROM application WHERE applicationID = %s",
+                (applicationID,)
+            )
+
+        rollups.mark_club(application["clubID"])
 
         return jsonify({"message": "Application deleted"}), 200
 
@@ -224,13 +305,89 @@ def delete_application(applicationID):
         return jsonify({"error": str(e)}), 500
 
 
+# Turn a registration / waitlist outcome into an error response
+# (None when the outcome is not an error)
+def registration_error(outcome, student_id, event_id):
+    if outcome == registration.NO_SUCH_STUDENT:
+        return jsonify({
+            "error": f"Student ID {student_id} does not exist. Please use a valid student ID."
+        }), 400
+
+    if outcome == registration.NO_SUCH_EVENT:
+        return jsonify({
+            "error": f"Event ID {event_id} does not exist. Please use a valid event ID."
+        }), 404
+
+    if outcome == registration.EVENT_ARCHIVED:
+        return jsonify({
+            "error": "This event has been archived and is no longer available for registration."
+        }), 400
+
+    if outcome == registration.EVENT_FULL:
+        return jsonify({
+            "error": "This event is full and cannot accept more registrations.",
+            "hint": "Send \"joinWaitlist\": true to join the waitlist instead."
+        }), 400
+
+    if outcome == registration.ALREADY_REGISTERED:
+        return jsonify({
+            "error": "You are already registered for this event."
+        }), 409
+
+    return None
+
+
+# Registration changes numRegistered / isFull (and the rollups)
+def event_changed(event_id):
+    cache.invalidate("events", f"event:{event_id}")
+    rollups.mark_event(event_id)
+
+
+# Register for an event, or join its waitlist when it is full
+def register_or_wait(student_id, event_id):
+    outcome, place = waitlist.join(db.get_db(), student_id, event_id)
+
+    if outcome == waitlist.WAITLISTED:
+        return jsonify({
+            "message": "This event is full. You have been added to the waitlist.",
+            "studentID": student_id,
+            "eventID": event_id,
+            "place": place
+        }), 202
+
+    if outcome == waitlist.ALREADY_WAITLISTED:
+        return jsonify({
+            "error": "You are already on the waitlist for this event.",
+            "place": place
+        }), 409
+
+    error = registration_error(outcome, student_id, event_id)
+    if error:
+        return error
+
+    event_changed(event_id)
+    return jsonify({
+        "message": "Successfully registered for event",
+        "studentID": student_id,
+        "eventID": event_id
+    }), 201
+
+
 # Student registers for an event
 # JSON body should look like:
 # {
 #   "studentID": 1,
-#   "eventID": 5
+#   "eventID": 5,
+#   "joinWaitlist": true      (optional: wait in line if the event is full)
 # }
+# A plain signup is 2 statements; joining the waitlist of a full
+# event (with a promotion check) takes up to about 13.  An
+# Idempotency-Key adds 4 more (lock, lookup, store, unlock) and
+# 2 commits, which count against the same request.
 @students.route("/events", methods=["POST"])
+@idempotency.keyed
+@query_budget.limit(statements=18, round_trips=24)
+@tx.retrying
 def register_for_event():
     try:
         current_app.logger.info("Starting register_for_event request")
@@ -245,81 +402,18 @@ def register_for_event():
                 "error": "studentID and eventID are required"
             }), 400
 
-        cursor = db.get_db().cursor()
+        if data.get("joinWaitlist"):
+            return register_or_wait(student_id, event_id)
 
-        # Validate that student exists
-        cursor.execute("SELECT studentID FROM student WHERE studentID = %s", (student_id,))
-        if not cursor.fetchone():
-            cursor.close()
-            return jsonify({
-                "error": f"Student ID {student_id} does not exist. Please use a valid student ID."
-            }), 400
+        # Takes a seat with a single conditional UPDATE so concurrent
+        # signups can never oversell the event (see registration.py)
+        outcome = registration.register_student(db.get_db(), student_id, event_id)
 
-        # Validate that event exists and get event details
-        cursor.execute("""
-            SELECT eventID, capacity, numRegistered, isFull, isArchived
-            FROM event
-            WHERE eventID = %s
-        """, (event_id,))
-        event_data = cursor.fetchone()
-        
-        if not event_data:
-            cursor.close()
-            return jsonify({
-                "error": f"Event ID {event_id} does not exist. Please use a valid event ID."
-            }), 404
+        error = registration_error(outcome, student_id, event_id)
+        if error:
+            return error
 
-        # Check if event is archived
-        if event_data.get("isArchived") == 1:
-            cursor.close()
-            return jsonify({
-                "error": "This event has been archived and is no longer available for registration."
-            }), 400
-
-        # Check if event is full
-        capacity = event_data.get("capacity", 0)
-        num_registered = event_data.get("numRegistered", 0)
-        is_full = event_data.get("isFull", 0)
-        
-        if is_full == 1 or (capacity > 0 and num_registered >= capacity):
-            cursor.close()
-            return jsonify({
-                "error": "This event is full and cannot accept more registrations."
-            }), 400
-
-        # Check if student is already registered for this event
-        cursor.execute("""
-            SELECT studentID, eventID
-            FROM studentEvents
-            WHERE studentID = %s AND eventID = %s
-        """, (student_id, event_id))
-        
-        if cursor.fetchone():
-            cursor.close()
-            return jsonify({
-                "error": "You are already registered for this event."
-            }), 409
-
-        # Insert into studentEvents table
-        insert_query = """
-            INSERT INTO studentEvents (studentID, eventID)
-            VALUES (%s, %s)
-        """
-        cursor.execute(insert_query, (student_id, event_id))
-
-        # Update numRegistered count in event table
-        new_num_registered = num_registered + 1
-        update_query = """
-            UPDATE event
-            SET numRegistered = %s, isFull = %s
-            WHERE eventID = %s
-        """
-        # Set isFull to 1 if we've reached capacity, otherwise 0
-        new_is_full = 1 if (capacity > 0 and new_num_registered >= capacity) else 0
-        cursor.execute(update_query, (new_num_registered, new_is_full, event_id))
-
-        db.get_db().commit()
-        cursor.close()
+        event_changed(event_id)
 
         return jsonify({
             "message": "Successfully registered for event",
@@ -347,3 +441,205 @@ def register_for_event():
                     "error": f"Event ID {event_id} does not exist. Please use a valid event ID."
                 }), 400
         return jsonify({"error": str(e)}), 500
+
+
+# Student cancels an event registration.  The seat goes straight to
+# the first student on the waitlist, in the same transaction.
+# Example: DELETE /student/events/5/students/1
+@students.route("/events/<int:eventID>/students/<int:studentID>", methods=["DELETE"])
+@tx.retrying
+def unregister_from_event(eventID, studentID):
+    try:
+        current_app.logger.info("Starting unregister_from_event request")
+        outcome, promoted = waitlist.unregister(db.get_db(), studentID, eventID)
+
+        if outcome == registration.NO_SUCH_EVENT:
+            return jsonify({"error": f"Event ID {eventID} does not exist. Please use a valid event ID."}), 404
+
+        if outcome == waitlist.NOT_REGISTERED:
+            return jsonify({"error": "You are not registered for this event."}), 404
+
+        event_changed(eventID)
+
+        return jsonify({
+            "message": "Registration cancelled",
+            "promotedFromWaitlist": promoted
+        }), 200
+
+    except Error as e:
+        current_app.logger.error(f"Database error in unregister_from_event: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+# Student joins the waitlist for a full event (or is registered right
+# away if a seat is free)
+# JSON body: { "studentID": 1 }
+@students.route("/events/<int:eventID>/waitlist", methods=["POST"])
+@tx.retrying
+def join_waitlist(eventID):
+    try:
+        current_app.logger.info("Starting join_waitlist request")
+        data = request.get_json() or {}
+        student_id = data.get("studentID")
+
+        if not student_id:
+            return jsonify({"error": "studentID is required"}), 400
+
+        return register_or_wait(student_id, eventID)
+
+    except Error as e:
+        current_app.logger.error(f"Database error in join_waitlist: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+# Student checks their place on an event's waitlist (two primary-key
+# lookups, cheap enough to poll; place and length are upper bounds)
+# Example: /student/events/5/waitlist/1
+@students.route("/events/<int:eventID>/waitlist/<int:studentID>", methods=["GET"])
+def get_waitlist_place(eventID, studentID):
+    try:
+        current_app.logger.info("Starting get_waitlist_place request")
+        row = waitlist.place(db.get_db(), studentID, eventID)
+
+        if not row:
+            return jsonify({"error": "You are not on the waitlist for this event."}), 404
+
+        return jsonify({
+            "studentID": studentID,
+            "eventID": eventID,
+            "place": row["place"],
+            "waitlistLength": row["waitlistLength"],
+            "joinedAt": row["joinedAt"]
+        }), 200
+
+    except Error as e:
+        current_app.logger.error(f"Database error in get_waitlist_place: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+# Student leaves an event's waitlist
+# Example: DELETE /student/events/5/waitlist/1
+@students.route("/events/<int:eventID>/waitlist/<int:studentID>", methods=["DELETE"])
+@tx.retrying
+def leave_waitlist(eventID, studentID):
+    try:
+        current_app.logger.info("Starting leave_waitlist request")
+
+        if not waitlist.leave(db.get_db(), studentID, eventID):
+            return jsonify({"error": "You are not on the waitlist for this event."}), 404
+
+        return jsonify({"message": "Removed from the waitlist"}), 200
+
+    except Error as e:
+        current_app.logger.error(f"Database error in leave_waitlist: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+# Student grabs a short hold on a seat for a busy event, then has
+# HOLD_SECONDS to confirm it (see holds.py)
+# JSON body: { "studentID": 1 }
+@students.route("/events/<int:eventID>/holds", methods=["POST"])
+@tx.retrying
+def hold_seat(eventID):
+    try:
+        current_app.logger.info("Starting hold_seat request")
+        data = request.get_json() or {}
+        student_id = data.get("studentID")
+
+        if not student_id:
+            return jsonify({"error": "studentID is required"}), 400
+
+        outcome, hold = seat_holds.grant(db.get_db(), student_id, eventID)
+
+        if outcome == holds.ALREADY_HELD:
+            return jsonify({"error": "You already hold a seat for this event.", "hold": hold}), 409
+
+        error = registration_error(outcome, student_id, eventID)
+        if error:
+            return error
+
+        # numHeld and spotsRemaining show on the event pages
+        cache.invalidate("events", f"event:{eventID}")
+        return jsonify({
+            "message": f"Seat held. Confirm it within {hold['secondsLeft']} seconds.",
+            "hold": hold
+        }), 201
+
+    except Error as e:
+        current_app.logger.error(f"Database error in hold_seat: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+# Student checks their hold and how long is left on it
+# Example: /student/events/5/holds/1
+@students.route("/events/<int:eventID>/holds/<int:studentID>", methods=["GET"])
+def get_hold(eventID, studentID):
+    try:
+        current_app.logger.info("Starting get_hold request")
+        hold = seat_holds.get(db.get_db(), studentID, eventID)
+
+        if not hold:
+            return jsonify({"error": "You do not hold a seat for this event."}), 404
+
+        return jsonify(hold), 200
+
+    except Error as e:
+        current_app.logger.error(f"Database error in get_hold: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+# Student confirms their hold, which registers them for the event
+# Example: POST /student/events/5/holds/1/confirm
+@students.route("/events/<int:eventID>/holds/<int:studentID>/confirm", methods=["POST"])
+@tx.retrying
+def confirm_hold(eventID, studentID):
+    try:
+        current_app.logger.info("Starting confirm_hold request")
+        outcome = seat_holds.confirm(db.get_db(), studentID, eventID)
+
+        if outcome == holds.NO_SUCH_HOLD:
+            return jsonify({"error": "You do not hold a seat for this event."}), 404
+
+        if outcome == holds.HOLD_EXPIRED:
+            event_changed(eventID)
+            return jsonify({
+                "error": "Your hold has expired and the seat was released. Please try again."
+            }), 410
+
+        error = registration_error(outcome, studentID, eventID)
+        if error:
+            return error
+
+        event_changed(eventID)
+        return jsonify({
+            "message": "Successfully registered for event",
+            "studentID": studentID,
+            "eventID": eventID
+        }), 201
+
+    except Error as e:
+        current_app.logger.error(f"Database error in confirm_hold: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+# Student gives a held seat back; it goes to the waitlist first
+# Example: DELETE /student/events/5/holds/1
+@students.route("/events/<int:eventID>/holds/<int:studentID>", methods=["DELETE"])
+@tx.retrying
+def release_hold(eventID, studentID):
+    try:
+        current_app.logger.info("Starting release_hold request")
+        outcome, promoted = seat_holds.release(db.get_db(), studentID, eventID)
+
+        if outcome == holds.NO_SUCH_HOLD:
+            return jsonify({"error": "You do not hold a seat for this event."}), 404
+
+        event_changed(eventID)
+        return jsonify({
+            "message": "Hold released",
+            "promotedFromWaitlist": promoted
+        }), 200
+
+    except Error as e:
+        current_app.logger.error(f"Database error in release_hold: {str(e)}")
+        return jsonify({"error": str(e)}), 500
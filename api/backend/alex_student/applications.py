@@ -0,0 +1,98 @@
+#------------------------------------------------------------
+# Batch application submission used by
+# alex_routes.create_applications_batch
+#
+# POST /student/applications makes three round trips per
+# application (student check, club check, INSERT).  A batch is
+# validated with one IN (...) query for all its students and one
+# for all its clubs, and every valid application is inserted with a
+# single multi-row INSERT in one transaction, so a batch costs the
+# same handful of round trips however many applications it holds.
+#------------------------------------------------------------
+from datetime import date
+
+from backend.db_connection import tx
+
+# most applications accepted in one request
+MAX_BATCH = 200
+
+CREATED = "created"
+REJECTED = "rejected"
+
+
+def _ids_that_exist(cursor, table, column, ids):
+    if not ids:
+        return set()
+    cursor.execute(
+        f"SELECT {column} FROM {table} WHERE {column} IN ({', '.join(['%s'] * len(ids))})",
+        sorted(ids),
+    )
+    return {row[column] for row in cursor.fetchall()}
+
+
+def _check_item(item):
+    # returns (studentID, clubID, dateSubmitted) or an error message
+    if not isinstance(item, dict):
+        return "each application must be an object"
+    student_id = item.get("studentID")
+    club_id = item.get("clubID")
+    date_submitted = item.get("dateSubmitted")
+    if not student_id or not club_id or not date_submitted:
+        return "studentID, clubID, and dateSubmitted are required"
+    try:
+        student_id, club_id = int(student_id), int(club_id)
+        date.fromisoformat(str(date_submitted))
+    except (TypeError, ValueError):
+        return "studentID and clubID must be numbers and dateSubmitted a YYYY-MM-DD date"
+    return student_id, club_id, str(date_submitted)
+
+
+def submit_applications(conn, items):
+    """
+    Validate and insert a list of {studentID, clubID, dateSubmitted}
+    and commit.  Returns one result per item, in order:
+    {"index", "status": "created", "applicationID"} or
+    {"index", "status": "rejected", "error"}.
+    """
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        checked = _check_item(item)
+        if isinstance(checked, str):
+            results[index] = {"index": index, "status": REJECTED, "error": checked}
+        else:
+            valid.append((index, checked))
+
+    with tx.transaction(conn) as cursor:
+        students = _ids_that_exist(cursor, "student", "studentID", {s for _, (s, _, _) in valid})
+        clubs = _ids_that_exist(cursor, "club", "clubID", {c for _, (_, c, _) in valid})
+
+        rows = []
+        for index, (student_id, club_id, date_submitted) in valid:
+            if student_id not in students:
+                error = f"Student ID {student_id} does not exist. Please use a valid student ID."
+            elif club_id not in clubs:
+                error = f"Club ID {club_id} does not exist. Please use a valid club ID."
+            else:
+                rows.append((index, student_id, club_id, date_submitted))
+                continue
+            results[index] = {"index": index, "status": REJECTED, "error": error}
+
+        if rows:
+            cursor.execute("SELECT @@auto_increment_increment AS step")
+            step = cursor.fetchone()["step"]
+            cursor.execute(
+                "INSERT INTO application (clubID, studentID, dateSubmitted, status) VALUES "
+                + ", ".join(["(%s, %s, %s, 'pending')"] * len(rows)),
+                [value for _, student_id, club_id, day in rows for value in (club_id, student_id, day)],
+            )
+            # a multi-row INSERT gets consecutive ids; lastrowid is the first
+            first_id = cursor.lastrowid
+            for i, (index, _, club_id, _) in enumerate(rows):
+                results[index] = {
+                    "index": index,
+                    "status": CREATED,
+                    "applicationID": first_id + i * step,
+                    "clubID": club_id,
+                }
+    return results
@@ -0,0 +1,74 @@
+#------------------------------------------------------------
+# Ranked text search over club names and descriptions, used by
+# alex_routes.get_clubs when ?q= is given.
+#
+# Matching and ranking use the MySQL FULLTEXT indexes from
+# migration 0003, so a search is an index lookup rather than a scan
+# of every description.  A hit in the club name counts twice as much
+# as a hit in the description.  Until the migration has been applied
+# the search falls back to LIKE matching with a coarser ranking.
+#------------------------------------------------------------
+import pymysql
+
+# ?q= longer than this is cut off
+MAX_QUERY_LENGTH = 200
+
+# Results are ordered best match first; clubID breaks ties so the
+# order is total for keyset pagination.
+SEARCH_PAGE_KEYS = [("relevance", "relevance", "DESC"), ("clubID", "clubID")]
+
+COLUMNS = "clubID, name, gradLevel, campus, description, numMembers, numSearches"
+
+FULLTEXT_QUERY = f"""
+    SELECT * FROM (
+        SELECT {COLUMNS},
+               MATCH(name) AGAINST (%s IN NATURAL LANGUAGE MODE) * 2
+             + MATCH(name, description) AGAINST (%s IN NATURAL LANGUAGE MODE) AS relevance
+        FROM club
+        WHERE MATCH(name, description) AGAINST (%s IN NATURAL LANGUAGE MODE)
+        {{filters}}
+    ) AS ranked
+"""
+
+LIKE_QUERY = f"""
+    SELECT * FROM (
+        SELECT {COLUMNS},
+               (name LIKE %s) * 2 + (description LIKE %s) AS relevance
+        FROM club
+        WHERE (name LIKE %s OR description LIKE %s)
+        {{filters}}
+    ) AS ranked
+"""
+
+# MySQL error raised by MATCH() when no FULLTEXT index covers the columns
+ER_FT_MATCHING_KEY_NOT_FOUND = 1191
+
+
+def _escape_like(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_clubs(cursor, text, filters, params, page):
+    """
+    Run a ranked search and return the page of rows.
+
+    filters is extra SQL starting with AND (campus / gradLevel) and
+    params its values; page is a pagination.Page built from
+    SEARCH_PAGE_KEYS.
+    """
+    text = text.strip()[:MAX_QUERY_LENGTH]
+    suffix = page.where() + page.order_by()
+    try:
+        cursor.execute(
+            FULLTEXT_QUERY.format(filters=filters) + suffix,
+            [text, text, text] + params + page.params,
+        )
+    except pymysql.err.MySQLError as e:
+        if e.args[0] != ER_FT_MATCHING_KEY_NOT_FOUND:
+            raise
+        pattern = f"%{_escape_like(text)}%"
+        cursor.execute(
+            LIKE_QUERY.format(filters=filters) + suffix,
+            [pattern] * 4 + params + page.params,
+        )
+    return page.trim(cursor.fetchall())
@@ -0,0 +1,293 @@
+#------------------------------------------------------------
+# Time-limited seat holds for events that sell out in seconds.
+#
+# Instead of registering outright, a student can grab a hold: a
+# seat reserved for HOLD_SECONDS that they then confirm (turning it
+# into a studentEvents row) or release.  Granting a hold is the
+# same single conditional UPDATE registration.py uses, against
+# numRegistered + numHeld (migration 0006), plus one INSERT, so
+# admission stays O(1) however many holds are out.
+#
+# Holds that are never confirmed are reclaimed by a background
+# sweeper every HOLD_SWEEP_INTERVAL seconds.  Each worker process
+# starts its sweeper with the first request it serves, whatever the
+# route, and sweeps straight away, so holds that ran out while the
+# API was down do not keep blocking seats.  It reads only expired
+# holds through the expiresAt index (SKIP LOCKED, in batches), gives
+# their seats back and promotes waitlisted students into them, so
+# no request ever scans for stale holds.  Confirming a hold that
+# has run out but not been swept yet releases it on the spot.
+#
+# Paths that change an existing hold lock the hold row before the
+# event row, the same order the sweeper uses.
+#------------------------------------------------------------
+import logging
+import threading
+import time
+
+import pymysql
+
+from backend.alex_student import registration
+from backend.alex_student import waitlist
+from backend.cache import cache
+from backend.db_connection import db, tx
+from backend.db_connection.background import PeriodicTask
+from backend.willow.rollups import rollups
+
+# Outcomes in addition to registration's
+HELD = "held"
+ALREADY_HELD = "already_held"
+CONFIRMED = "confirmed"
+RELEASED = "released"
+HOLD_EXPIRED = "hold_expired"
+NO_SUCH_HOLD = "no_such_hold"
+
+TAKE_HOLD_QUERY = """
+    UPDATE event
+    SET numHeld = numHeld + 1
+    WHERE eventID = %s
+      AND COALESCE(isArchived, 0) = 0
+      AND COALESCE(isFull, 0) = 0
+      AND (capacity IS NULL OR capacity <= 0 OR COALESCE(numRegistered, 0) + numHeld < capacity)
+"""
+
+HOLD_QUERY = """
+    SELECT holdID, eventID, studentID, createdAt, expiresAt,
+           GREATEST(TIMESTAMPDIFF(SECOND, NOW(), expiresAt), 0) AS secondsLeft
+    FROM eventHold
+    WHERE eventID = %s AND studentID = %s
+"""
+
+LOCK_HOLD = """
+    SELECT holdID, expiresAt > NOW() AS live
+    FROM eventHold
+    WHERE eventID = %s AND studentID = %s
+    FOR UPDATE
+"""
+
+# SET runs left to right, so isFull sees the new numRegistered
+CONVERT_SEAT = """
+    UPDATE event
+    SET numHeld = GREATEST(numHeld - 1, 0),
+        numRegistered = COALESCE(numRegistered, 0) + 1,
+        isFull = IF(capacity > 0 AND numRegistered >= capacity, 1, 0)
+    WHERE eventID = %s
+"""
+
+RETURN_SEAT = "UPDATE event SET numHeld = GREATEST(numHeld - 1, 0) WHERE eventID = %s"
+
+EXPIRED_BATCH_QUERY = """
+    SELECT holdID, eventID FROM eventHold
+    WHERE expiresAt <= NOW()
+    ORDER BY expiresAt
+    LIMIT %s
+    FOR UPDATE SKIP LOCKED
+"""
+
+
+def _placeholders(values):
+    return ", ".join(["%s"] * len(values))
+
+
+class HoldManager:
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.hold_seconds = 120
+        self.sweep_batch = 500
+        self._lock = threading.Lock()
+        self._counters = {
+            "granted": 0,
+            "refused_full": 0,
+            "converted": 0,
+            "released": 0,
+            "expired": 0,
+            "sweeps": 0,
+            "sweep_time_total": 0.0,
+        }
+        self._task = PeriodicTask("hold-sweeper", 5, self.sweep, self.logger, run_at_start=True)
+
+    def init_app(self, app):
+        app.config.setdefault("HOLD_SECONDS", self.hold_seconds)
+        app.config.setdefault("HOLD_SWEEP_INTERVAL", 5)
+        app.config.setdefault("HOLD_SWEEP_BATCH", self.sweep_batch)
+        self.hold_seconds = app.config["HOLD_SECONDS"]
+        self.sweep_batch = app.config["HOLD_SWEEP_BATCH"]
+        self._task.interval = app.config["HOLD_SWEEP_INTERVAL"]
+        self._task.logger = self.logger = app.logger
+        # started per request rather than here: a thread started while
+        # gunicorn preloads the app would not survive the fork
+        app.before_request(self._task.ensure_started)
+
+    def _count(self, **increments):
+        with self._lock:
+            for name, value in increments.items():
+                self._counters[name] += value
+
+    # ------------------------------------------------------------
+    # request side
+
+    def grant(self, conn, student_id, event_id):
+        """
+        Reserve a seat for the student and commit.  Returns
+        (outcome, hold): hold is the hold row when HELD or
+        ALREADY_HELD, otherwise None.
+        """
+        with tx.transaction(conn) as cursor:
+            cursor.execute(TAKE_HOLD_QUERY, (event_id,))
+            if cursor.rowcount == 0:
+                conn.rollback()
+                outcome = registration.why_no_seat(cursor, event_id)
+                if outcome == registration.EVENT_FULL:
+                    self._count(refused_full=1)
+                return outcome, None
+
+            cursor.execute(
+                "SELECT 1 FROM studentEvents WHERE studentID = %s AND eventID = %s",
+                (student_id, event_id),
+            )
+            if cursor.fetchone():
+                conn.rollback()
+                return registration.ALREADY_REGISTERED, None
+
+            try:
+                cursor.execute(
+                    "INSERT INTO eventHold (eventID, studentID, expiresAt) "
+                    "VALUES (%s, %s, NOW() + INTERVAL %s SECOND)",
+                    (event_id, student_id, self.hold_seconds),
+                )
+            except pymysql.err.IntegrityError as e:
+                # the rollback also hands the seat back
+                conn.rollback()
+                if e.args[0] == registration.ER_DUP_ENTRY:
+                    return ALREADY_HELD, self.get(conn, student_id, event_id)
+                if e.args[0] == registration.ER_NO_REFERENCED_ROW:
+                    return registration.NO_SUCH_STUDENT, None
+                raise
+
+        self._count(granted=1)
+        return HELD, self.get(conn, student_id, event_id)
+
+    def get(self, conn, student_id, event_id):
+        """The student's hold on the event (with secondsLeft), or None."""
+        with tx.cursor(conn) as cursor:
+            cursor.execute(HOLD_QUERY, (event_id, student_id))
+            return cursor.fetchone()
+
+    def confirm(self, conn, student_id, event_id):
+        """
+        Turn the student's live hold into a registration and commit.
+        A hold that has run out is released instead and reported as
+        HOLD_EXPIRED.  Returns the outcome.
+        """
+        with tx.transaction(conn) as cursor:
+            cursor.execute(LOCK_HOLD, (event_id, student_id))
+            hold = cursor.fetchone()
+            if not hold:
+                conn.rollback()
+                return NO_SUCH_HOLD
+            cursor.execute("DELETE FROM eventHold WHERE holdID = %s", (hold["holdID"],))
+
+            if not hold["live"]:
+                cursor.execute(RETURN_SEAT, (event_id,))
+                waitlist.promote(cursor, event_id)
+                self._count(expired=1)
+                return HOLD_EXPIRED
+
+            cursor.execute(CONVERT_SEAT, (event_id,))
+            try:
+                cursor.execute(
+                    "INSERT INTO studentEvents (studentID, eventID) VALUES (%s, %s)",
+                    (student_id, event_id),
+                )
+            except pymysql.err.IntegrityError as e:
+                # the rollback keeps the hold; it lapses on its own
+                conn.rollback()
+                if e.args[0] == registration.ER_DUP_ENTRY:
+                    return registration.ALREADY_REGISTERED
+                raise
+
+        self._count(converted=1)
+        return CONFIRMED
+
+    def release(self, conn, student_id, event_id):
+        """
+        Give a held seat back (to the waitlist first) and commit.
+        Returns (outcome, promoted studentIDs).
+        """
+        with tx.transaction(conn) as cursor:
+            cursor.execute(LOCK_HOLD, (event_id, student_id))
+            hold = cursor.fetchone()
+            if not hold:
+                conn.rollback()
+                return NO_SUCH_HOLD, []
+            cursor.execute("DELETE FROM eventHold WHERE holdID = %s", (hold["holdID"],))
+            cursor.execute(RETURN_SEAT, (event_id,))
+            promoted = waitlist.promote(cursor, event_id)
+
+        self._count(released=1)
+        return RELEASED, promoted
+
+    # ------------------------------------------------------------
+    # background side
+
+    def sweep(self):
+        """Release every expired hold, a batch per transaction."""
+        started = time.monotonic()
+        expired = 0
+        events = set()
+        with db.pool.connection() as conn:
+            while True:
+                count, event_ids = self._sweep_batch(conn)
+                expired += count
+                events.update(event_ids)
+                if count < self.sweep_batch:
+                    break
+
+        self._count(expired=expired, sweeps=1, sweep_time_total=time.monotonic() - started)
+        if events:
+            # numHeld (and numRegistered, after promotions) changed
+            cache.invalidate("events", *[f"event:{event_id}" for event_id in events])
+            rollups.mark_event(*events)
+
+    def _sweep_batch(self, conn):
+        with tx.transaction(conn) as cursor:
+            cursor.execute(EXPIRED_BATCH_QUERY, (self.sweep_batch,))
+            rows = cursor.fetchall()
+            if not rows:
+                conn.rollback()
+                return 0, set()
+
+            hold_ids = [row["holdID"] for row in rows]
+            per_event = {}
+            for row in rows:
+                per_event[row["eventID"]] = per_event.get(row["eventID"], 0) + 1
+            event_ids = sorted(per_event)
+
+            cursor.execute(
+                f"DELETE FROM eventHold WHERE holdID IN ({_placeholders(hold_ids)})", hold_ids
+            )
+            # one statement for every event; sorted ids keep the row
+            # lock order the same across workers
+            cases = " ".join(["WHEN %s THEN %s"] * len(event_ids))
+            cursor.execute(
+                f"UPDATE event SET numHeld = GREATEST(numHeld - CASE eventID {cases} ELSE 0 END, 0) "
+                f"WHERE eventID IN ({_placeholders(event_ids)})",
+                [value for event_id in event_ids for value in (event_id, per_event[event_id])]
+                + event_ids,
+            )
+            for event_id in event_ids:
+                waitlist.promote(cursor, event_id)
+            return len(rows), event_ids
+
+    def stats(self):
+        """Process-wide hold counters (see /ops/holds)."""
+        with self._lock:
+            counters = dict(self._counters)
+        granted, sweeps = counters["granted"], counters["sweeps"]
+        counters["conversion_rate"] = counters["converted"] / granted if granted else 0.0
+        counters["sweep_time_avg"] = counters["sweep_time_total"] / sweeps if sweeps else 0.0
+        return counters
+
+
+seat_holds = HoldManager()
@@ -0,0 +1,97 @@
+#------------------------------------------------------------
+# Event registration engine used by alex_routes.register_for_event
+#
+# A seat is taken with one conditional UPDATE on the event row:
+# MySQL only changes the row if there is still room, so two
+# students can never both get the last seat.  The studentEvents
+# row is inserted in the same (short) transaction; if that insert
+# fails the rollback hands the seat back.
+#------------------------------------------------------------
+import pymysql
+
+from backend.db_connection import tx
+
+# Possible outcomes of register_student()
+REGISTERED = "registered"
+ALREADY_REGISTERED = "already_registered"
+EVENT_FULL = "event_full"
+EVENT_ARCHIVED = "event_archived"
+NO_SUCH_EVENT = "no_such_event"
+NO_SUCH_STUDENT = "no_such_student"
+
+# capacity <= 0 (or NULL) means the event has no limit.  Seats held
+# by unconfirmed holds (numHeld, see holds.py) are not available.
+# SET is evaluated left to right in MySQL, so isFull sees the
+# incremented numRegistered.
+TAKE_SEAT_QUERY = """
+    UPDATE event
+    SET numRegistered = COALESCE(numRegistered, 0) + 1,
+        isFull = IF(capacity > 0 AND numRegistered >= capacity, 1, 0)
+    WHERE eventID = %s
+      AND COALESCE(isArchived, 0) = 0
+      AND COALESCE(isFull, 0) = 0
+      AND (capacity IS NULL OR capacity <= 0 OR COALESCE(numRegistered, 0) + {held} < capacity)
+"""
+
+# MySQL error codes we translate into outcomes
+ER_DUP_ENTRY = 1062
+ER_NO_REFERENCED_ROW = 1452
+ER_BAD_FIELD_ERROR = 1054
+
+
+def execute_hold_aware(cursor, query, params, column="numHeld"):
+    """
+    Run a query that writes {held} for the event's held seats.
+    event.numHeld comes from migration 0006; until that has run the
+    query is re-run with no seats held, the way club search falls
+    back when its FULLTEXT index is missing.
+    """
+    try:
+        cursor.execute(query.format(held=column), params)
+    except pymysql.err.MySQLError as e:
+        if e.args[0] != ER_BAD_FIELD_ERROR:
+            raise
+        cursor.execute(query.format(held="0"), params)
+
+
+def register_student(conn, student_id, event_id):
+    """
+    Register a student for an event and commit.
+
+    Returns one of the outcome constants above.  On any outcome other
+    than REGISTERED nothing has been changed in the database.
+    """
+    with tx.transaction(conn) as cursor:
+        execute_hold_aware(cursor, TAKE_SEAT_QUERY, (event_id,))
+        if cursor.rowcount == 0:
+            conn.rollback()
+            return why_no_seat(cursor, event_id)
+
+        try:
+            cursor.execute(
+                "INSERT INTO studentEvents (studentID, eventID) VALUES (%s, %s)",
+                (student_id, event_id),
+            )
+        except pymysql.err.IntegrityError as e:
+            # Rolling back also gives the seat back
+            conn.rollback()
+            if e.args[0] == ER_DUP_ENTRY:
+                return ALREADY_REGISTERED
+            if e.args[0] == ER_NO_REFERENCED_ROW:
+                return NO_SUCH_STUDENT
+            raise
+
+        return REGISTERED
+
+
+def why_no_seat(cursor, event_id):
+    # Only runs on the failure path, so the happy path stays at two statements
+    cursor.execute(
+        "SELECT isArchived FROM event WHERE eventID = %s", (event_id,)
+    )
+    row = cursor.fetchone()
+    if not row:
+        return NO_SUCH_EVENT
+    if row["isArchived"] == 1:
+        return EVENT_ARCHIVED
+    return EVENT_FULL
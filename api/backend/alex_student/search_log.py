@@ -0,0 +1,277 @@
+#------------------------------------------------------------
+# Write-behind logging of club searches.
+#
+# Every search on /student/clubs should add a row to search (plus
+# one searchFilters row per filter) and bump club.numSearches for
+# the clubs it returned.  Doing that inside the request would add
+# several writes per search and make popular clubs' rows a lock
+# hot spot, so instead:
+#
+#   - record() only appends to an in-memory buffer and adds to a
+#     per-club counter dict (no SQL on the request path);
+#   - a background job flushes every SEARCH_LOG_FLUSH_INTERVAL
+#     seconds, or as soon as SEARCH_LOG_BATCH_SIZE searches are
+#     waiting, with multi-row INSERTs and one UPDATE that applies
+#     all the merged numSearches increments;
+#   - the job also runs at interpreter exit (and search_log.flush()
+#     can be called directly), so a clean shutdown loses nothing.
+#
+# The search rows and the numSearches increments are written in
+# separate transactions, so a batch of searches that cannot be
+# written does not hold back the club counts.  A studentID that is
+# not in the student table is logged as NULL (checked with one
+# query per flush); a batch the database still refuses with an
+# integrity error is dropped and counted, since retrying it would
+# fail the same way on every later flush.
+#
+# At most SEARCH_LOG_MAX_PENDING searches are buffered; if the
+# database is unreachable for long enough the oldest are dropped
+# (and counted) rather than growing memory without bound.
+#------------------------------------------------------------
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from functools import wraps
+
+import pymysql
+from flask import request
+
+from backend.db_connection import db, tx
+from backend.db_connection.background import PeriodicTask
+from backend.willow.rollups import rollups
+
+# rows per multi-row INSERT statement
+INSERT_CHUNK_ROWS = 500
+
+
+class _Search:
+    __slots__ = ("student_id", "text", "filters", "at")
+
+    def __init__(self, student_id, text, filters, at):
+        self.student_id = student_id
+        self.text = text
+        self.filters = filters
+        self.at = at
+
+
+class SearchLog:
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.enabled = True
+        self.batch_size = 500
+        self.max_pending = 10000
+        self._lock = threading.Lock()
+        self._searches = deque()
+        self._club_hits = {}
+        self._counters = {
+            "recorded": 0, "flushed": 0, "dropped": 0, "refused": 0,
+            "unknown_students": 0, "flushes": 0, "failed_flushes": 0,
+        }
+        self._task = PeriodicTask("search-log-flush", 2, self.flush, self.logger)
+
+    def init_app(self, app):
+        app.config.setdefault("SEARCH_LOG_ENABLED", True)
+        app.config.setdefault("SEARCH_LOG_FLUSH_INTERVAL", 2)
+        app.config.setdefault("SEARCH_LOG_BATCH_SIZE", self.batch_size)
+        app.config.setdefault("SEARCH_LOG_MAX_PENDING", self.max_pending)
+        self.enabled = app.config["SEARCH_LOG_ENABLED"]
+        self.batch_size = app.config["SEARCH_LOG_BATCH_SIZE"]
+        self.max_pending = app.config["SEARCH_LOG_MAX_PENDING"]
+        self._task.interval = app.config["SEARCH_LOG_FLUSH_INTERVAL"]
+        self._task.logger = self.logger = app.logger
+
+    # ------------------------------------------------------------
+    # request side
+
+    def record(self, student_id, text, filters, club_ids):
+        """Buffer one search; club_ids are the clubs it returned."""
+        if not self.enabled:
+            return
+        search = _Search(student_id, text[:200], [f[:100] for f in filters], datetime.now())
+        with self._lock:
+            self._searches.append(search)
+            if len(self._searches) > self.max_pending:
+                self._searches.popleft()
+                self._counters["dropped"] += 1
+            for club_id in club_ids:
+                self._club_hits[club_id] = self._club_hits.get(club_id, 0) + 1
+            self._counters["recorded"] += 1
+            full = len(self._searches) >= self.batch_size
+        if full:
+            self._task.wake()
+        else:
+            self._task.ensure_started()
+
+    def logs_searches(self, view):
+        """
+        Record searches made through a club list route.  Goes outside
+        @cache.cached so cache hits are counted too.
+        """
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            response = view(*args, **kwargs)
+            try:
+                self._record_response(response)
+            except Exception as e:
+                # logging a search must never break the search
+                self.logger.error(f"Could not record search: {str(e)}")
+            return response
+        return wrapper
+
+    def _record_response(self, response):
+        if not self.enabled:
+            return
+        text = request.args.get("q", "").strip()
+        filters = [
+            f"{name}={request.args[name]}" for name in ("campus", "gradLevel") if request.args.get(name)
+        ]
+        # browsing the full list without a query or filter is not a search
+        if not (text or filters):
+            return
+        # views return (body, status, headers) or a Response
+        if isinstance(response, tuple):
+            body, status = response[0], response[1]
+        else:
+            body, status = response, response.status_code
+        if status != 200:
+            return
+        rows = body.get_json(silent=True) if hasattr(body, "get_json") else body
+        club_ids = [row["clubID"] for row in rows or [] if isinstance(row, dict) and "clubID" in row]
+        student_id = request.args.get("studentID", type=int)
+        self.record(student_id, text, filters, club_ids)
+
+    # ------------------------------------------------------------
+    # background side
+
+    def flush(self):
+        with self._lock:
+            searches, self._searches = list(self._searches), deque()
+            club_hits, self._club_hits = self._club_hits, {}
+        if not (searches or club_hits):
+            return
+
+        searches_done = False
+        try:
+            with db.pool.connection() as conn:
+                searches_done = self._write_searches(conn, searches)
+                # the club counts go in even when the searches could not
+                with tx.transaction(conn) as cursor:
+                    self._add_club_hits(cursor, club_hits)
+        except Exception:
+            self._requeue([] if searches_done else searches, club_hits)
+            raise
+        if not searches_done:
+            self._requeue(searches, {})
+
+        with self._lock:
+            self._counters["flushes"] += 1
+        # numSearches feeds the clubStats rollup.  The cached
+        # /student/clubs list is deliberately left alone: a flush
+        # follows almost every search, and clearing "clubs" that often
+        # would empty the cache for a popularity count that may lag by
+        # its TTL.
+        rollups.mark_club(*club_hits)
+
+    def _write_searches(self, conn, searches):
+        """
+        Insert searches in a transaction of their own.  Returns False
+        when the write failed and should be retried by a later flush.
+        """
+        if not searches:
+            return True
+        try:
+            with tx.transaction(conn) as cursor:
+                self._null_unknown_students(cursor, searches)
+                self._insert_searches(cursor, searches)
+        except pymysql.err.IntegrityError as e:
+            self.logger.error(f"Dropping {len(searches)} searches the database refused: {str(e)}")
+            with self._lock:
+                self._counters["refused"] += len(searches)
+            return True
+        except Exception as e:
+            self.logger.error(f"Could not write {len(searches)} searches, will retry: {str(e)}")
+            return False
+        with self._lock:
+            self._counters["flushed"] += len(searches)
+        return True
+
+    def _null_unknown_students(self, cursor, searches):
+        # ?studentID= is not checked on the request path; an id with
+        # no student row would fail the whole INSERT on its foreign key
+        student_ids = {s.student_id for s in searches if s.student_id is not None}
+        if not student_ids:
+            return
+        cursor.execute(
+            f"SELECT studentID FROM student WHERE studentID IN ({', '.join(['%s'] * len(student_ids))}) "
+            "LOCK IN SHARE MODE",
+            list(student_ids),
+        )
+        unknown = student_ids - {row["studentID"] for row in cursor.fetchall()}
+        if not unknown:
+            return
+        count = 0
+        for s in searches:
+            if s.student_id in unknown:
+                s.student_id = None
+                count += 1
+        with self._lock:
+            self._counters["unknown_students"] += count
+
+    def _insert_searches(self, cursor, searches):
+        cursor.execute("SELECT @@auto_increment_increment AS step")
+        step = cursor.fetchone()["step"]
+        for start in range(0, len(searches), INSERT_CHUNK_ROWS):
+            chunk = searches[start:start + INSERT_CHUNK_ROWS]
+            cursor.execute(
+                "INSERT INTO search (studentID, name, dateTime) VALUES "
+                + ", ".join(["(%s, %s, %s)"] * len(chunk)),
+                [value for s in chunk for value in (s.student_id, s.text, s.at)],
+            )
+            # A multi-row INSERT gets consecutive ids (one step apart)
+            # and lastrowid is the id of its first row.
+            first_id = cursor.lastrowid
+            filter_rows = [
+                (first_id + i * step, f)
+                for i, s in enumerate(chunk)
+                for f in dict.fromkeys(s.filters)
+            ]
+            if filter_rows:
+                cursor.execute(
+                    "INSERT INTO searchFilters (searchID, filter) VALUES "
+                    + ", ".join(["(%s, %s)"] * len(filter_rows)),
+                    [value for row in filter_rows for value in row],
+                )
+
+    @staticmethod
+    def _add_club_hits(cursor, club_hits):
+        if not club_hits:
+            return
+        # one statement for every club; sorted ids keep the row lock
+        # order the same across workers
+        club_ids = sorted(club_hits)
+        cases = " ".join(["WHEN %s THEN %s"] * len(club_ids))
+        cursor.execute(
+            f"UPDATE club SET numSearches = COALESCE(numSearches, 0) + CASE clubID {cases} ELSE 0 END "
+            f"WHERE clubID IN ({', '.join(['%s'] * len(club_ids))})",
+            [value for club_id in club_ids for value in (club_id, club_hits[club_id])] + club_ids,
+        )
+
+    def _requeue(self, searches, club_hits):
+        with self._lock:
+            self._counters["failed_flushes"] += 1
+            self._searches.extendleft(reversed(searches))
+            while len(self._searches) > self.max_pending:
+                self._searches.popleft()
+                self._counters["dropped"] += 1
+            for club_id, hits in club_hits.items():
+                self._club_hits[club_id] = self._club_hits.get(club_id, 0) + hits
+
+    def stats(self):
+        with self._lock:
+            pending = {"pending_searches": len(self._searches), "pending_clubs": len(self._club_hits)}
+            return {**self._counters, **pending}
+
+
+search_log = SearchLog()
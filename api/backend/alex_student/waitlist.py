@@ -0,0 +1,259 @@
+#------------------------------------------------------------
+# Waitlists for full events, used by the alex event routes and by
+# kaitlyn.update_event.
+#
+# Students join a FIFO line per event (eventWaitlist, migration
+# 0005).  Joining is O(1): one UPDATE hands out the next position
+# from event.waitlistTail and one INSERT stores it.  Leaving just
+# deletes the student's row: the line only needs ORDER BY position,
+# so the gap is left rather than renumbering (and locking) everyone
+# behind them.  A student's place is position - waitlistHead, read
+# with two primary-key lookups.  Gaps left by students who left make
+# it (and the length, waitlistTail - waitlistHead) an upper bound:
+# nobody is ever further back than they are told.
+#
+# Whenever seats may have opened up (a registration is cancelled,
+# a hold lapses, the capacity or registration count is edited, or
+# someone joins the list while a seat is free) promote() moves students from the
+# front of the line into studentEvents in the same transaction that
+# freed the seats.  Every path locks the event row first, so
+# promotions, joins and cancellations for one event are serialised
+# and never see a half-updated line.
+#------------------------------------------------------------
+import pymysql
+
+from backend.alex_student import registration
+from backend.db_connection import tx
+
+# Outcomes of join() in addition to registration's
+WAITLISTED = "waitlisted"
+ALREADY_WAITLISTED = "already_waitlisted"
+
+# Outcomes of unregister()
+UNREGISTERED = "unregistered"
+NOT_REGISTERED = "not_registered"
+
+ER_NO_SUCH_TABLE = 1146
+
+LOCK_EVENT = """
+    SELECT capacity, numRegistered, numHeld, isFull, isArchived, waitlistHead, waitlistTail
+    FROM event WHERE eventID = %s
+    FOR UPDATE
+"""
+
+# hands out the next position; LAST_INSERT_ID(expr) makes it the
+# statement's insert id, so no second query is needed to read it
+NEXT_POSITION = """
+    UPDATE event SET waitlistTail = LAST_INSERT_ID(waitlistTail + 1)
+    WHERE eventID = %s
+"""
+
+# upper bounds, see the header; both tables are read by primary key
+PLACE_QUERY = """
+    SELECT w.position - e.waitlistHead AS place,
+           e.waitlistTail - e.waitlistHead AS waitlistLength,
+           w.joinedAt
+    FROM eventWaitlist w
+    JOIN event e ON e.eventID = w.eventID
+    WHERE w.eventID = %s AND w.studentID = %s
+"""
+
+FREE_SEAT = """
+    UPDATE event
+    SET numRegistered = GREATEST(COALESCE(numRegistered, 0) - 1, 0),
+        isFull = IF(capacity > 0 AND numRegistered >= capacity, 1, 0)
+    WHERE eventID = %s
+"""
+
+RECOMPUTE_FULL = """
+    UPDATE event
+    SET isFull = IF(capacity > 0 AND COALESCE(numRegistered, 0) >= capacity, 1, 0)
+    WHERE eventID = %s
+"""
+
+# most students promoted per statement
+PROMOTE_BATCH = 500
+
+
+def _placeholders(values):
+    return ", ".join(["%s"] * len(values))
+
+
+def promote(cursor, event_id, recompute_full=False):
+    """
+    Move students from the front of the event's waitlist into the
+    free seats.  Does not commit; the caller's transaction makes the
+    promotion atomic with whatever freed the seats.  Returns the
+    promoted studentIDs in order.
+    """
+    if recompute_full:
+        cursor.execute(RECOMPUTE_FULL, (event_id,))
+
+    promoted = []
+    while True:
+        cursor.execute(LOCK_EVENT, (event_id,))
+        event = cursor.fetchone()
+        if not event or event["isArchived"] == 1 or event["isFull"] == 1:
+            break
+        # an upper bound: students who left the line leave gaps
+        waiting = event["waitlistTail"] - event["waitlistHead"]
+        if waiting <= 0:
+            break
+        capacity = event["capacity"] or 0
+        # seats under a hold (holds.py) are spoken for
+        taken = (event["numRegistered"] or 0) + event["numHeld"]
+        free = capacity - taken if capacity > 0 else waiting
+        if free <= 0:
+            break
+
+        cursor.execute(
+            "SELECT studentID, position FROM eventWaitlist WHERE eventID = %s "
+            "ORDER BY position LIMIT %s FOR UPDATE",
+            (event_id, min(free, PROMOTE_BATCH)),
+        )
+        front = cursor.fetchall()
+        if not front:
+            break
+
+        # anyone who got registered some other way still leaves the
+        # line but does not take a seat
+        student_ids = [row["studentID"] for row in front]
+        cursor.execute(
+            f"SELECT studentID FROM studentEvents "
+            f"WHERE eventID = %s AND studentID IN ({_placeholders(student_ids)}) FOR UPDATE",
+            [event_id] + student_ids,
+        )
+        registered = {row["studentID"] for row in cursor.fetchall()}
+        seated = [student_id for student_id in student_ids if student_id not in registered]
+        if seated:
+            cursor.execute(
+                "INSERT INTO studentEvents (studentID, eventID) VALUES "
+                + ", ".join(["(%s, %s)"] * len(seated)),
+                [value for student_id in seated for value in (student_id, event_id)],
+            )
+        last_position = front[-1]["position"]
+        cursor.execute(
+            "DELETE FROM eventWaitlist WHERE eventID = %s AND position <= %s",
+            (event_id, last_position),
+        )
+        cursor.execute(
+            """
+            UPDATE event
+            SET numRegistered = COALESCE(numRegistered, 0) + %s,
+                isFull = IF(capacity > 0 AND numRegistered >= capacity, 1, 0),
+                waitlistHead = %s
+            WHERE eventID = %s
+            """,
+            (len(seated), last_position, event_id),
+        )
+        promoted.extend(seated)
+    return promoted
+
+
+def promote_if_migrated(cursor, event_id, recompute_full=False):
+    """
+    promote() for routes that predate the waitlist.  Until migrations
+    0005 and 0006 have run there is no line to move up, so this
+    promotes nobody instead of failing the caller's update.
+    """
+    try:
+        return promote(cursor, event_id, recompute_full=recompute_full)
+    except pymysql.err.MySQLError as e:
+        if e.args[0] not in (registration.ER_BAD_FIELD_ERROR, ER_NO_SUCH_TABLE):
+            raise
+        return []
+
+
+def join(conn, student_id, event_id):
+    """
+    Register the student if there is a seat, otherwise put them at
+    the back of the waitlist.  Commits and returns (outcome, place):
+    place is the 1-based place in line when WAITLISTED.
+    """
+    outcome = registration.register_student(conn, student_id, event_id)
+    if outcome != registration.EVENT_FULL:
+        return outcome, None
+
+    with tx.transaction(conn) as cursor:
+        cursor.execute(
+            "SELECT 1 FROM studentEvents WHERE studentID = %s AND eventID = %s",
+            (student_id, event_id),
+        )
+        if cursor.fetchone():
+            conn.rollback()
+            return registration.ALREADY_REGISTERED, None
+
+        cursor.execute(NEXT_POSITION, (event_id,))
+        position = cursor.lastrowid
+        try:
+            cursor.execute(
+                "INSERT INTO eventWaitlist (eventID, studentID, position) VALUES (%s, %s, %s)",
+                (event_id, student_id, position),
+            )
+        except pymysql.err.IntegrityError as e:
+            # the rollback also hands the position back
+            conn.rollback()
+            if e.args[0] == registration.ER_DUP_ENTRY:
+                row = place(conn, student_id, event_id)
+                # promoted by another transaction since the INSERT failed
+                if row is None:
+                    return registration.ALREADY_REGISTERED, None
+                return ALREADY_WAITLISTED, row["place"]
+            if e.args[0] == registration.ER_NO_REFERENCED_ROW:
+                return registration.NO_SUCH_STUDENT, None
+            raise
+
+        # a seat may have opened since register_student() looked
+        promoted = promote(cursor, event_id)
+
+    if student_id in promoted:
+        return registration.REGISTERED, None
+    row = place(conn, student_id, event_id)
+    # a promotion committed by another request may already have
+    # seated them
+    if row is None:
+        return registration.REGISTERED, None
+    return WAITLISTED, row["place"]
+
+
+def place(conn, student_id, event_id):
+    """The student's place in line and the line's length, or None."""
+    with tx.cursor(conn) as cursor:
+        cursor.execute(PLACE_QUERY, (event_id, student_id))
+        return cursor.fetchone()
+
+
+def leave(conn, student_id, event_id):
+    """Take the student off the waitlist.  Commits; returns True if they were on it."""
+    with tx.transaction(conn) as cursor:
+        cursor.execute(LOCK_EVENT, (event_id,))
+        cursor.execute(
+            "DELETE FROM eventWaitlist WHERE eventID = %s AND studentID = %s",
+            (event_id, student_id),
+        )
+        # the gap stays: nobody behind them is rewritten or locked
+        return cursor.rowcount > 0
+
+
+def unregister(conn, student_id, event_id):
+    """
+    Cancel a registration and give the seat to the front of the
+    waitlist in the same transaction.  Commits and returns
+    (outcome, promoted studentIDs).
+    """
+    with tx.transaction(conn) as cursor:
+        cursor.execute(LOCK_EVENT, (event_id,))
+        if not cursor.fetchone():
+            conn.rollback()
+            return registration.NO_SUCH_EVENT, []
+        cursor.execute(
+            "DELETE FROM studentEvents WHERE studentID = %s AND eventID = %s",
+            (student_id, event_id),
+        )
+        if cursor.rowcount == 0:
+            conn.rollback()
+            return NOT_REGISTERED, []
+        cursor.execute(FREE_SEAT, (event_id,))
+        promoted = promote(cursor, event_id)
+        return UNREGISTERED, promoted
+
@@ -0,0 +1,18 @@
+#------------------------------------------------------------
+# This file creates the shared response cache
+#------------------------------------------------------------
+from backend.cache.idempotency import IdempotencyKeys
+from backend.cache.response_cache import ResponseCache
+from backend.cache.transfer import Transfer
+
+
+# ETag / 304 and gzip / brotli for every GET - see transfer.py
+transfer = Transfer()
+
+# Routes opt in with @cache.cached(...) and writers clear what they
+# change with @cache.invalidates(...) - see response_cache.py
+cache = ResponseCache(transfer=transfer)
+
+# POST routes that create rows replay their first response to
+# repeats with the same Idempotency-Key - see idempotency.py
+idempotency = IdempotencyKeys()
@@ -0,0 +1,198 @@
+#------------------------------------------------------------
+# Idempotency keys for POST routes that create rows.
+#
+#   @students.route("/applications", methods=["POST"])
+#   @idempotency.keyed
+#   def create_application(): ...
+#
+# A client that may retry a POST (after a timeout, say) sends a
+# unique Idempotency-Key header with it.  The first request with a
+# key runs as usual and its response is stored in idempotencyKey
+# (migration 0007) for IDEMPOTENCY_TTL seconds.  Repeats with the
+# same key get that stored response back, marked with an
+# Idempotent-Replayed header, without the route touching any table.
+# A repeat whose body differs from the first request's is refused
+# with a 422, since it is a different request under a reused key.
+#
+# Duplicates that arrive while the first is still running wait on a
+# MySQL named lock (GET_LOCK, per key) for up to
+# IDEMPOTENCY_WAIT_SECONDS, so they work in every worker process,
+# and then replay the stored response.  If the wait runs out they
+# get a 409 with Retry-After.  5xx responses are not stored, so a
+# request that failed can be retried with the same key.
+#
+# Keys are scoped to the method and path, and rows are compact:
+# the key and request body are stored as SHA-256 digests and the
+# response body is zlib-compressed.  A background sweeper deletes
+# expired rows through the expiresAt index.  Requests without the
+# header are not affected.
+#------------------------------------------------------------
+import hashlib
+import logging
+import threading
+import zlib
+from functools import wraps
+
+from flask import jsonify, make_response, request
+
+from backend.db_connection import db, tx
+from backend.db_connection.background import PeriodicTask
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+LOOKUP = """
+    SELECT requestHash, statusCode, contentType, body
+    FROM idempotencyKey
+    WHERE keyHash = %s AND expiresAt > NOW()
+"""
+
+STORE_RESPONSE = """
+    REPLACE INTO idempotencyKey (keyHash, requestHash, statusCode, contentType, body, expiresAt)
+    VALUES (%s, %s, %s, %s, %s, NOW() + INTERVAL %s SECOND)
+"""
+
+DELETE_EXPIRED = "DELETE FROM idempotencyKey WHERE expiresAt <= NOW() ORDER BY expiresAt LIMIT %s"
+
+
+class IdempotencyKeys:
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.enabled = True
+        self.ttl = 86400
+        self.wait_seconds = 10
+        self.sweep_batch = 1000
+        self._lock = threading.Lock()
+        self._counters = {
+            "keyed_requests": 0,
+            "stored": 0,
+            "replayed": 0,
+            "mismatched": 0,
+            "wait_timeouts": 0,
+            "expired_removed": 0,
+        }
+        self._task = PeriodicTask("idempotency-sweeper", 300, self.sweep, self.logger)
+
+    def init_app(self, app):
+        app.config.setdefault("IDEMPOTENCY_ENABLED", True)
+        app.config.setdefault("IDEMPOTENCY_TTL", self.ttl)
+        app.config.setdefault("IDEMPOTENCY_WAIT_SECONDS", self.wait_seconds)
+        app.config.setdefault("IDEMPOTENCY_SWEEP_INTERVAL", 300)
+        self.enabled = app.config["IDEMPOTENCY_ENABLED"]
+        self.ttl = app.config["IDEMPOTENCY_TTL"]
+        self.wait_seconds = app.config["IDEMPOTENCY_WAIT_SECONDS"]
+        self._task.interval = app.config["IDEMPOTENCY_SWEEP_INTERVAL"]
+        self._task.logger = self.logger = app.logger
+
+    def _count(self, **increments):
+        with self._lock:
+            for name, value in increments.items():
+                self._counters[name] += value
+
+    # ------------------------------------------------------------
+    # decorator
+
+    def keyed(self, view):
+        """Honour an Idempotency-Key header on a POST route."""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request.headers.get(HEADER)
+            if not self.enabled or key is None:
+                return view(*args, **kwargs)
+            if not key or len(key) > MAX_KEY_LENGTH:
+                return jsonify({
+                    "error": f"{HEADER} must be 1 to {MAX_KEY_LENGTH} characters"
+                }), 400
+
+            self._task.ensure_started()
+            self._count(keyed_requests=1)
+            key_hash = hashlib.sha256(f"{request.method} {request.path}\n{key}".encode()).digest()
+            request_hash = hashlib.sha256(request.get_data()).digest()
+            # GET_LOCK names are limited to 64 characters
+            lock_name = f"idempotency:{key_hash.hex()[:48]}"
+            conn = db.get_db()
+
+            with tx.cursor(conn) as cursor:
+                cursor.execute("SELECT GET_LOCK(%s, %s) AS got", (lock_name, self.wait_seconds))
+                got = cursor.fetchone()["got"]
+            if not got:
+                self._count(wait_timeouts=1)
+                response = jsonify({
+                    "error": f"A request with this {HEADER} is still being processed"
+                })
+                response.status_code = 409
+                response.headers["Retry-After"] = "1"
+                return response
+
+            try:
+                # a transaction of its own, so the read sees what the
+                # request we may have waited for committed
+                with tx.transaction(conn) as cursor:
+                    cursor.execute(LOOKUP, (key_hash,))
+                    stored = cursor.fetchone()
+                if stored:
+                    return self._replay(stored, request_hash)
+                response = make_response(view(*args, **kwargs))
+                if response.status_code < 500 and not response.is_streamed:
+                    self._store(conn, key_hash, request_hash, response)
+                return response
+            finally:
+                try:
+                    with tx.cursor(conn) as cursor:
+                        cursor.execute("SELECT RELEASE_LOCK(%s)", (lock_name,))
+                except Exception as e:
+                    # closing the session drops the lock; back in the pool
+                    # it would block every retry with this key
+                    self.logger.error(f"Could not release {lock_name}, discarding the connection: {str(e)}")
+                    db.discard_db()
+        return wrapper
+
+    def _replay(self, stored, request_hash):
+        if bytes(stored["requestHash"]) != request_hash:
+            self._count(mismatched=1)
+            return jsonify({
+                "error": f"This {HEADER} was already used with a different request body"
+            }), 422
+        self._count(replayed=1)
+        response = make_response(zlib.decompress(stored["body"]), stored["statusCode"])
+        response.headers["Content-Type"] = stored["contentType"]
+        response.headers["Idempotent-Replayed"] = "true"
+        return response
+
+    def _store(self, conn, key_hash, request_hash, response):
+        body = zlib.compress(response.get_data(), 6)
+        try:
+            with tx.transaction(conn) as cursor:
+                cursor.execute(STORE_RESPONSE, (
+                    key_hash, request_hash, response.status_code,
+                    response.content_type or "application/json", body, self.ttl,
+                ))
+        except Exception as e:
+            # the route's own work is committed; a retry would just run it again
+            self.logger.error(f"Could not store idempotent response: {str(e)}")
+            return
+        self._count(stored=1)
+
+    # ------------------------------------------------------------
+    # background side
+
+    def sweep(self):
+        """Delete expired keys, a batch per transaction."""
+        removed = 0
+        with db.pool.connection() as conn:
+            while True:
+                with tx.transaction(conn) as cursor:
+                    cursor.execute(DELETE_EXPIRED, (self.sweep_batch,))
+                    count = cursor.rowcount
+                removed += count
+                if count < self.sweep_batch:
+                    break
+        self._count(expired_removed=removed)
+
+    def stats(self):
+        """Process-wide idempotency counters (see /ops/idempotency)."""
+        with self._lock:
+            counters = dict(self._counters)
+        counters["ttl_seconds"] = self.ttl
+        return counters
@@ -0,0 +1,192 @@
+#------------------------------------------------------------
+# In-process response cache for read-mostly GET routes.
+#
+#   @cache.cached(ttl=300, tags=["clubs"])            on a reader
+#   @cache.invalidates("events", "event:{eventID}")   on a writer
+#   cache.invalidate("event:5")                       inside a route
+#
+# Entries are evicted LRU and expire after their TTL.  Each tag has
+# a version counter; a cached entry remembers the versions of its
+# tags when it was stored and is treated as a miss once any of them
+# has moved on.  Writers bump the counters before they respond, so
+# the next read after a write never sees the old data.
+#
+# The counters live in shared memory created at import time, so
+# worker processes forked from a preloaded app all see each other's
+# invalidations.
+#
+# Each entry also keeps its ETag and compressed variants, so hits
+# are answered (or 304'd) without re-encoding - see transfer.py.
+#------------------------------------------------------------
+import multiprocessing
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from functools import wraps
+
+from flask import make_response, request
+
+from backend.cache.transfer import Transfer, etag_for
+
+
+class _Entry:
+    __slots__ = ("expires_at", "body", "status", "headers", "versions", "etag", "encoded")
+
+    def __init__(self, expires_at, body, status, headers, versions):
+        self.expires_at = expires_at
+        self.body = body
+        self.status = status
+        self.headers = headers
+        self.versions = versions
+        self.etag = etag_for(body)
+        self.encoded = {}   # Content-Encoding -> compressed body
+
+
+class ResponseCache:
+
+    # headers copied into cached responses
+    KEPT_HEADERS = ("Content-Type", "X-Next-Cursor", "Link", "X-Data-Refreshed-At")
+
+    def __init__(self, max_entries=1024, default_ttl=60, tag_slots=4096, transfer=None):
+        self.transfer = transfer or Transfer()
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.enabled = True
+        self._tag_slots = tag_slots
+        self._versions = multiprocessing.Array("Q", tag_slots)
+        self._raw_versions = self._versions.get_obj()   # lock-free reads
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0, "invalidations": 0}
+        self._route_counters = {}
+
+    def init_app(self, app):
+        app.config.setdefault("CACHE_ENABLED", True)
+        app.config.setdefault("CACHE_MAX_ENTRIES", self.max_entries)
+        app.config.setdefault("CACHE_DEFAULT_TTL", self.default_ttl)
+        self.enabled = app.config["CACHE_ENABLED"]
+        self.max_entries = app.config["CACHE_MAX_ENTRIES"]
+        self.default_ttl = app.config["CACHE_DEFAULT_TTL"]
+        self.clear()
+
+    # ------------------------------------------------------------
+    # decorators
+
+    def cached(self, ttl=None, tags=()):
+        """
+        Cache successful GET responses of a route.  tags may use the
+        route's URL variables, e.g. "event:{eventID}".
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or request.method != "GET":
+                    return view(*args, **kwargs)
+
+                route = request.endpoint
+                key = self._key()
+                hit = self._lookup(key, route)
+                if hit is not None:
+                    return hit
+
+                # Versions are read *before* the view queries the DB, so a
+                # write that lands while we are building the response makes
+                # this entry stale instead of being missed.
+                slots = [self._slot(tag.format(**kwargs)) for tag in tags]
+                versions = tuple((slot, self._raw_versions[slot]) for slot in slots)
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed:
+                    entry = self._store(key, response, ttl or self.default_ttl, versions)
+                    # saves transfer.py hashing the body again
+                    response.set_etag(entry.etag)
+                response.headers["X-Cache"] = "MISS"
+                return response
+            return wrapper
+        return decorator
+
+    def invalidates(self, *tags):
+        """Invalidate tags after a route returns a 2xx response."""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                response = make_response(view(*args, **kwargs))
+                if 200 <= response.status_code < 300:
+                    self.invalidate(*(tag.format(**kwargs) for tag in tags))
+                return response
+            return wrapper
+        return decorator
+
+    # ------------------------------------------------------------
+    # API
+
+    def invalidate(self, *tags):
+        with self._versions.get_lock():
+            for tag in tags:
+                self._raw_versions[self._slot(tag)] += 1
+        with self._lock:
+            self._counters["invalidations"] += len(tags)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            counters["entries"] = len(self._entries)
+            counters["max_entries"] = self.max_entries
+            lookups = counters["hits"] + counters["misses"]
+            counters["hit_ratio"] = counters["hits"] / lookups if lookups else 0.0
+            counters["routes"] = {route: dict(c) for route, c in self._route_counters.items()}
+        return counters
+
+    # ------------------------------------------------------------
+    # internals
+
+    def _slot(self, tag):
+        return zlib.crc32(tag.encode()) % self._tag_slots
+
+    @staticmethod
+    def _key():
+        args = sorted(request.args.items(multi=True))
+        return request.path + "?" + "&".join(f"{k}={v}" for k, v in args)
+
+    def _count(self, route, outcome):
+        # caller holds self._lock; outcome is "hits" or "misses"
+        self._counters[outcome] += 1
+        per_route = self._route_counters.setdefault(route, {"hits": 0, "misses": 0})
+        per_route[outcome] += 1
+
+    def _lookup(self, key, route):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._count(route, "misses")
+                return None
+            if entry.expires_at <= now or any(
+                self._raw_versions[slot] != version for slot, version in entry.versions
+            ):
+                # expired or invalidated by a write
+                del self._entries[key]
+                self._counters["stale"] += 1
+                self._count(route, "misses")
+                return None
+            self._entries.move_to_end(key)
+            self._count(route, "hits")
+
+        response = self.transfer.cached_response(entry)
+        response.headers["X-Cache"] = "HIT"
+        return response
+
+    def _store(self, key, response, ttl, versions):
+        headers = [(name, value) for name, value in response.headers if name in self.KEPT_HEADERS]
+        entry = _Entry(time.monotonic() + ttl, response.get_data(), response.status_code, headers, versions)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+        return entry
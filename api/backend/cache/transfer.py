@@ -0,0 +1,174 @@
+#------------------------------------------------------------
+# Conditional GET and compression for API responses.
+#
+# Installed as an after_request hook by create_app.  For every
+# successful GET:
+#
+#   - a strong ETag is computed from the body (BLAKE2b), and a client
+#     that sends it back in If-None-Match gets an empty 304 instead
+#     of the body;
+#   - bodies of at least COMPRESS_MIN_SIZE bytes are compressed with
+#     brotli or gzip, whichever the client prefers in
+#     Accept-Encoding (brotli only when the Brotli package is
+#     installed).  The ETag gets a "-br" / "-gzip" suffix so each
+#     encoding is a distinct representation, and If-None-Match
+#     matches on the part before the suffix.
+#
+# Routes behind @cache.cached do better: the ETag is computed once
+# when the entry is stored and each compressed variant once per
+# entry, so a hit is answered (or 304'd) without running the view,
+# serializing or compressing anything.  The entry's tag versions
+# are bumped by table writes, which is what changes the ETag.
+# Streamed responses are left alone.
+#------------------------------------------------------------
+import gzip
+import hashlib
+import threading
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+def etag_for(body):
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class Transfer:
+
+    def __init__(self):
+        self.etags = True
+        self.compress_enabled = True
+        self.min_size = 1024
+        self.gzip_level = 6
+        self.brotli_quality = 5
+        self._lock = threading.Lock()
+        self._counters = {
+            "not_modified": 0,
+            "compressed": {"br": 0, "gzip": 0},
+            "bytes_before_compression": 0,
+            "bytes_after_compression": 0,
+        }
+
+    def init_app(self, app):
+        app.config.setdefault("ETAGS_ENABLED", True)
+        app.config.setdefault("COMPRESS_ENABLED", True)
+        app.config.setdefault("COMPRESS_MIN_SIZE", self.min_size)
+        app.config.setdefault("COMPRESS_GZIP_LEVEL", self.gzip_level)
+        app.config.setdefault("COMPRESS_BROTLI_QUALITY", self.brotli_quality)
+        self.etags = app.config["ETAGS_ENABLED"]
+        self.compress_enabled = app.config["COMPRESS_ENABLED"]
+        self.min_size = app.config["COMPRESS_MIN_SIZE"]
+        self.gzip_level = app.config["COMPRESS_GZIP_LEVEL"]
+        self.brotli_quality = app.config["COMPRESS_BROTLI_QUALITY"]
+        app.after_request(self.after_request)
+
+    # ------------------------------------------------------------
+    # negotiation
+
+    def choose_encoding(self, mimetype, size):
+        """The Content-Encoding to use for this request, or None."""
+        if not self.compress_enabled or size < self.min_size:
+            return None
+        if not (mimetype or "").startswith(COMPRESSIBLE_TYPES):
+            return None
+        offered = ["br", "gzip"] if brotli is not None else ["gzip"]
+        return request.accept_encodings.best_match(offered)
+
+    def compress(self, body, encoding):
+        if encoding == "br":
+            compressed = brotli.compress(body, quality=self.brotli_quality)
+        else:
+            compressed = gzip.compress(body, compresslevel=self.gzip_level)
+        with self._lock:
+            self._counters["compressed"][encoding] += 1
+            self._counters["bytes_before_compression"] += len(body)
+            self._counters["bytes_after_compression"] += len(compressed)
+        return compressed
+
+    def not_modified(self, etag):
+        """True when the request's If-None-Match already has etag."""
+        if not self.etags or not request.if_none_match:
+            return False
+        if request.if_none_match.star_tag:
+            return True
+        return any(
+            tag.split("-", 1)[0] == etag for tag in request.if_none_match.as_set(include_weak=True)
+        )
+
+    @staticmethod
+    def _tag(etag, encoding):
+        return f"{etag}-{encoding}" if encoding else etag
+
+    def _to_not_modified(self, response, etag):
+        with self._lock:
+            self._counters["not_modified"] += 1
+        response.status_code = 304
+        response.set_data(b"")
+        for name in ("Content-Length", "Content-Type", "Content-Encoding"):
+            response.headers.pop(name, None)
+        response.set_etag(etag)
+        return response
+
+    # ------------------------------------------------------------
+    # hooks
+
+    def after_request(self, response):
+        if (
+            request.method not in ("GET", "HEAD")
+            or response.status_code != 200
+            or response.is_streamed
+            or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+
+        body = response.get_data()
+        encoding = self.choose_encoding(response.mimetype, len(body))
+        response.vary.add("Accept-Encoding")
+        if self.etags:
+            # the response cache may already have set it
+            etag = response.get_etag()[0] or etag_for(body)
+            response.headers.setdefault("Cache-Control", "no-cache")
+            if self.not_modified(etag):
+                return self._to_not_modified(response, self._tag(etag, encoding))
+            response.set_etag(self._tag(etag, encoding))
+        if encoding:
+            response.set_data(self.compress(body, encoding))
+            response.headers["Content-Encoding"] = encoding
+        return response
+
+    def cached_response(self, entry):
+        """Build the response for a response-cache hit."""
+        mimetype = dict(entry.headers).get("Content-Type", "").split(";")[0]
+        encoding = self.choose_encoding(mimetype, len(entry.body))
+        response = Response(status=entry.status, headers=entry.headers)
+        response.vary.add("Accept-Encoding")
+        if self.etags:
+            response.headers["Cache-Control"] = "no-cache"
+            if self.not_modified(entry.etag):
+                return self._to_not_modified(response, self._tag(entry.etag, encoding))
+            response.set_etag(self._tag(entry.etag, encoding))
+
+        body = entry.body
+        if encoding:
+            # each encoding is compressed once per entry
+            body = entry.encoded.get(encoding)
+            if body is None:
+                body = entry.encoded[encoding] = self.compress(entry.body, encoding)
+            response.headers["Content-Encoding"] = encoding
+        response.set_data(body)
+        return response
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters, compressed=dict(self._counters["compressed"]))
+        before = counters["bytes_before_compression"]
+        counters["compression_ratio"] = counters["bytes_after_compression"] / before if before else 0.0
+        counters["brotli_available"] = brotli is not None
+        return counters
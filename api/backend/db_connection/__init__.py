@@ -1,10 +1,18 @@
 #------------------------------------------------------------
 # This file creates a shared DB connection resource
 #------------------------------------------------------------
-from flaskext.mysql import MySQL
-from pymysql import cursors
+from backend.db_connection.instrumented import InstrumentedConnection, InstrumentedDictCursor
+from backend.db_connection.pool import PooledMySQL
+from backend.db_connection.transactions import TransactionManager
 
 
 # the parameter instructs the connection to return data 
 # as a dictionary object. 
-db = MySQL(cursorclass=cursors.DictCursor)
\ No newline at end of file
+# Connections are borrowed from a pool (see pool.py) instead
+# of being opened fresh for every request, and every statement
+# and commit is timed (see instrumented.py).
+db = PooledMySQL(connection_class=InstrumentedConnection, cursorclass=InstrumentedDictCursor)
+
+# Routes open cursors with tx.cursor() / tx.transaction(), which
+# always close them and commit or roll back (see transactions.py)
+tx = TransactionManager(db)
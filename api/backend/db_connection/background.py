@@ -0,0 +1,80 @@
+#------------------------------------------------------------
+# A small periodic background job runner.
+#
+# Used for work that is batched up during requests and written
+# to the database later (rollup refreshes, buffered counters).
+# The thread is started lazily from inside the process that
+# needs it, so an app preloaded before forking (gunicorn
+# --preload) gets one thread per worker rather than a dead
+# thread inherited from the parent.  With run_at_start the job
+# also runs as soon as the thread starts, for cleanup that should
+# not wait a full interval.  The job runs one last time at
+# interpreter exit so buffered work is not lost on a clean
+# shutdown.
+#------------------------------------------------------------
+import atexit
+import logging
+import os
+import threading
+
+
+class PeriodicTask:
+
+    def __init__(self, name, interval, fn, logger=None, run_at_start=False):
+        self.name = name
+        self.interval = interval
+        self.fn = fn
+        self.logger = logger or logging.getLogger(__name__)
+        self.run_at_start = run_at_start
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = None
+        self._wake = threading.Event()
+        self._pid = None
+
+    def ensure_started(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop = threading.Event()
+            self._wake = threading.Event()
+            self._thread = threading.Thread(
+                target=self._run, args=(self._stop,), name=self.name, daemon=True
+            )
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def wake(self):
+        # run the job now instead of waiting for the interval
+        self.ensure_started()
+        self._wake.set()
+
+    def run_once(self):
+        try:
+            self.fn()
+        except Exception as e:
+            self.logger.error(f"{self.name}: background job failed: {str(e)}")
+
+    def stop(self, flush=True):
+        # only the process that started the thread may stop it
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=self.interval + 5)
+        self._thread = None
+        if flush:
+            self.run_once()
+
+    def _run(self, stop):
+        if self.run_at_start:
+            self.run_once()
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if stop.is_set():
+                return
+            self.run_once()
@@ -0,0 +1,107 @@
+#------------------------------------------------------------
+# Timed cursors for every connection the pool hands out.
+#
+# db.get_db().cursor() returns an InstrumentedDictCursor (and the
+# streaming helper an InstrumentedSSDictCursor).  They behave exactly
+# like PyMySQL's DictCursor / SSDictCursor but time each execute()
+# and report it, with the rows it returned, to:
+#
+#   - the current request's QueryStats on flask.g, which the request
+#     metrics use to split a request's time into DB and Python time;
+#   - any listeners registered with add_listener(fn), called as
+#     fn(query, args, seconds, rows) on every statement, inside or
+#     outside a request.
+#
+# executemany() goes through execute(), so it is covered too.
+#
+# The pool opens InstrumentedConnections, which time COMMIT,
+# ROLLBACK and ping() the same way.  Those count as round trips and
+# DB time for the request but not as statements.
+#------------------------------------------------------------
+import time
+
+from flask import g, has_request_context
+from pymysql import connections, cursors
+
+_listeners = []
+
+
+def add_listener(fn):
+    if fn not in _listeners:
+        _listeners.append(fn)
+
+
+class QueryStats:
+    __slots__ = ("statements", "round_trips", "db_time", "rows")
+
+    def __init__(self):
+        self.statements = 0
+        self.round_trips = 0
+        self.db_time = 0.0
+        self.rows = 0
+
+
+def request_stats():
+    """QueryStats for the current request, created on first use."""
+    stats = g.get("_query_stats")
+    if stats is None:
+        stats = g._query_stats = QueryStats()
+    return stats
+
+
+def _record(query, args, seconds, rows):
+    if has_request_context():
+        stats = request_stats()
+        stats.statements += 1
+        stats.round_trips += 1
+        stats.db_time += seconds
+        stats.rows += rows
+    for fn in _listeners:
+        fn(query, args, seconds, rows)
+
+
+def _record_round_trip(seconds):
+    if has_request_context():
+        stats = request_stats()
+        stats.round_trips += 1
+        stats.db_time += seconds
+
+
+class _Timed:
+
+    def execute(self, query, args=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, args)
+        finally:
+            # buffered cursors already hold every row; unbuffered ones
+            # report 0 here (rows arrive while fetching)
+            rows = len(self._rows) if getattr(self, "_rows", None) is not None else 0
+            _record(query, args, time.perf_counter() - started, rows)
+
+
+class InstrumentedDictCursor(_Timed, cursors.DictCursor):
+    pass
+
+
+class InstrumentedSSDictCursor(_Timed, cursors.SSDictCursor):
+    pass
+
+
+class InstrumentedConnection(connections.Connection):
+
+    def _timed(self, method, *args):
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            _record_round_trip(time.perf_counter() - started)
+
+    def commit(self):
+        return self._timed(super().commit)
+
+    def rollback(self):
+        return self._timed(super().rollback)
+
+    def ping(self, reconnect=True):
+        return self._timed(super().ping, reconnect)
@@ -0,0 +1,281 @@
+#------------------------------------------------------------
+# Versioned schema migrations for a running ClubHub database.
+#
+# Migrations are the numbered .sql files in api/migrations
+# (0001_name.sql, 0002_name.sql, ...).  Applied versions are
+# recorded in the schemaMigrations table so each file runs once.
+# Index / column statements are also skipped when the object
+# already exists, which makes every file safe to re-run.
+#
+# Usage (from the api folder):
+#   python -m backend.db_connection.migrate            apply pending migrations
+#   python -m backend.db_connection.migrate --status   list applied / pending
+#   python -m backend.db_connection.migrate --explain  apply, with a before/after
+#                                                     EXPLAIN report
+#------------------------------------------------------------
+import argparse
+import hashlib
+import re
+import sys
+from pathlib import Path
+
+import pymysql
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[2] / "migrations"
+MIGRATION_FILE = re.compile(r"^(\d{4})_(\w+)\.sql$")
+LOCK_NAME = "clubhub_schema_migrations"
+
+CREATE_TRACKING_TABLE = """
+    CREATE TABLE IF NOT EXISTS schemaMigrations (
+        version     INT,
+        name        VARCHAR(200),
+        checksum    CHAR(64),
+        appliedAt   DATETIME DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (version)
+    )
+"""
+
+# Statements the runner knows how to make idempotent
+CREATE_INDEX = re.compile(
+    r"^CREATE\s+(?:UNIQUE\s+|FULLTEXT\s+)?INDEX\s+`?(\w+)`?\s+ON\s+`?(\w+)`?", re.I
+)
+ADD_INDEX = re.compile(
+    r"^ALTER\s+TABLE\s+`?(\w+)`?\s+ADD\s+(?:UNIQUE\s+|FULLTEXT\s+)?(?:INDEX|KEY)\s+`?(\w+)`?", re.I
+)
+DROP_INDEX = re.compile(r"^DROP\s+INDEX\s+`?(\w+)`?\s+ON\s+`?(\w+)`?", re.I)
+ADD_COLUMN = re.compile(r"^ALTER\s+TABLE\s+`?(\w+)`?\s+ADD\s+COLUMN\s+`?(\w+)`?", re.I)
+
+# Representative queries from the route files, used for the EXPLAIN report.
+EXPLAIN_QUERIES = [
+    ("kaitlyn.get_club_applications", """
+        SELECT a.applicationID, s.studentID, s.firstName, s.lastName, a.dateSubmitted, a.status
+        FROM application a
+        JOIN student s ON a.studentID = s.studentID
+        LEFT JOIN studentEmails se ON s.studentID = se.studentID
+        WHERE a.clubID = %s AND a.status = 'Pending'
+        ORDER BY a.dateSubmitted
+    """, (1,)),
+    ("kaitlyn.get_club_members", """
+        SELECT s.studentID, s.firstName, s.lastName, sj.memberType, sj.joinDate, se.email
+        FROM student s
+        JOIN studentJoins sj ON s.studentID = sj.studentID
+        LEFT JOIN studentEmails se ON s.studentID = se.studentID
+        WHERE sj.clubID = %s
+        ORDER BY s.lastName, s.firstName
+    """, (1,)),
+    ("kaitlyn.get_club_events", """
+        SELECT e.eventID, e.name, e.date
+        FROM event e
+        JOIN clubEvents ce ON e.eventID = ce.eventID
+        WHERE ce.clubID = %s AND e.date >= CURDATE() AND e.isArchived = 0
+        ORDER BY e.date
+    """, (1,)),
+    ("alex.get_clubs", """
+        SELECT clubID, name FROM club WHERE campus = %s AND gradLevel = %s
+    """, ("Boston", "undergrad")),
+    ("alex.get_clubs (search)", """
+        SELECT clubID, name,
+               MATCH(name) AGAINST (%s IN NATURAL LANGUAGE MODE) * 2
+             + MATCH(name, description) AGAINST (%s IN NATURAL LANGUAGE MODE) AS relevance
+        FROM club WHERE MATCH(name, description) AGAINST (%s IN NATURAL LANGUAGE MODE)
+        ORDER BY relevance DESC
+    """, ("robotics", "robotics", "robotics")),
+    ("alex.get_student_applications", """
+        SELECT applicationID, clubID, dateSubmitted, status
+        FROM application WHERE studentID = %s ORDER BY dateSubmitted DESC
+    """, (1,)),
+    ("willow.get_club_apps", """
+        SELECT club.name, COUNT(applicationID) AS NumApps
+        FROM application JOIN club ON application.clubID = club.clubID
+        GROUP BY club.clubID
+    """, ()),
+    ("willow.get_club_demographics", """
+        SELECT student.studentID, student.age, student.gender, student.race, student.gradYear
+        FROM student JOIN studentJoins ON student.studentID = studentJoins.studentID
+        WHERE clubID = %s
+    """, (1,)),
+    ("Elizabeth.get_all_errors", """
+        SELECT * FROM error WHERE errorType = %s AND timeReported = %s
+    """, ("syntax error", "2024-12-06 12:45:47")),
+    ("Elizabeth.get_all_system_errors", """
+        SELECT * FROM error WHERE systemID = %s AND errorType = %s
+    """, (1, "syntax error")),
+]
+
+
+def discover(directory=MIGRATIONS_DIR):
+    # [(version, name, path)] sorted by version
+    found = []
+    for path in sorted(directory.glob("*.sql")):
+        match = MIGRATION_FILE.match(path.name)
+        if match:
+            found.append((int(match.group(1)), match.group(2), path))
+    versions = [version for version, _, _ in found]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"duplicate migration version in {directory}")
+    return found
+
+
+def split_statements(sql):
+    # One statement per ';' at the end of a line; '--' comments are dropped
+    statements, current = [], []
+    for line in sql.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith("--"):
+            continue
+        current.append(line)
+        if stripped.endswith(";"):
+            statements.append("\n".join(current).strip().rstrip(";"))
+            current = []
+    if current:
+        statements.append("\n".join(current).strip())
+    return statements
+
+
+def _index_exists(cursor, table, index):
+    cursor.execute("""
+        SELECT 1 FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        LIMIT 1
+    """, (table, index))
+    return cursor.fetchone() is not None
+
+
+def _column_exists(cursor, table, column):
+    cursor.execute("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+        LIMIT 1
+    """, (table, column))
+    return cursor.fetchone() is not None
+
+
+def already_applied(cursor, statement):
+    """Return True if an index/column statement would be a no-op."""
+    text = " ".join(statement.split())
+    match = CREATE_INDEX.match(text)
+    if match:
+        return _index_exists(cursor, match.group(2), match.group(1))
+    match = ADD_INDEX.match(text)
+    if match:
+        return _index_exists(cursor, match.group(1), match.group(2))
+    match = DROP_INDEX.match(text)
+    if match:
+        return not _index_exists(cursor, match.group(2), match.group(1))
+    match = ADD_COLUMN.match(text)
+    if match:
+        return _column_exists(cursor, match.group(1), match.group(2))
+    return False
+
+
+def applied_versions(cursor):
+    cursor.execute(CREATE_TRACKING_TABLE)
+    cursor.execute("SELECT version, name, checksum FROM schemaMigrations")
+    return {row["version"]: row for row in cursor.fetchall()}
+
+
+def apply_pending(conn, log=print):
+    """Apply every migration that is not recorded yet.  Returns their versions."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, 30) AS got", (LOCK_NAME,))
+        if not cursor.fetchone()["got"]:
+            raise RuntimeError("another migration run holds the lock")
+        try:
+            done = applied_versions(cursor)
+            applied = []
+            for version, name, path in discover():
+                sql = path.read_text()
+                checksum = hashlib.sha256(sql.encode()).hexdigest()
+                if version in done:
+                    if done[version]["checksum"] != checksum:
+                        log(f"warning: {path.name} changed after it was applied")
+                    continue
+
+                log(f"applying {path.name}")
+                for statement in split_statements(sql):
+                    if already_applied(cursor, statement):
+                        log(f"  skip (already present): {statement.splitlines()[0]}")
+                        continue
+                    cursor.execute(statement)
+                cursor.execute(
+                    "INSERT INTO schemaMigrations (version, name, checksum) VALUES (%s, %s, %s)",
+                    (version, name, checksum),
+                )
+                conn.commit()
+                applied.append(version)
+            return applied
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def explain(conn):
+    # {label: [(table, type, key, rows, Extra), ...]}
+    plans = {}
+    with conn.cursor() as cursor:
+        for label, query, params in EXPLAIN_QUERIES:
+            try:
+                cursor.execute("EXPLAIN " + query, params)
+            except pymysql.err.MySQLError as e:
+                # e.g. the search query before 0003 adds its FULLTEXT index (1191)
+                plans[label] = [("n/a", None, None, None, f"cannot explain: {e.args[-1]}")]
+                continue
+            plans[label] = [
+                (row["table"], row["type"], row["key"], row["rows"], row["Extra"])
+                for row in cursor.fetchall()
+            ]
+    return plans
+
+
+def format_report(before, after):
+    lines = []
+    for label in before:
+        lines.append(f"== {label}")
+        lines.append(f"   {'':6} {'table':<14} {'type':<7} {'key':<34} {'rows':>7}  Extra")
+        for tag, plan in (("before", before[label]), ("after", after[label])):
+            for table, access, key, rows, extra in plan:
+                lines.append(
+                    f"   {tag:6} {str(table):<14} {str(access):<7} {str(key):<34} {str(rows):>7}  {extra or ''}"
+                )
+        lines.append("")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply ClubHub schema migrations")
+    parser.add_argument("--status", action="store_true", help="list migrations and exit")
+    parser.add_argument("--explain", action="store_true",
+                        help="print EXPLAIN plans for the hot queries before and after")
+    args = parser.parse_args()
+
+    # Use the same settings (and pool) as the API itself
+    from backend.rest_entry import create_app
+    from backend.db_connection import db
+
+    app = create_app()
+    with app.app_context(), db.pool.connection() as conn:
+        if args.status:
+            with conn.cursor() as cursor:
+                done = applied_versions(cursor)
+            conn.commit()
+            for version, name, path in discover():
+                state = f"applied {done[version]['appliedAt']}" if version in done else "pending"
+                print(f"{path.name:<50} {state}")
+            return 0
+
+        before = explain(conn) if args.explain else None
+        applied = apply_pending(conn)
+        print(f"{len(applied)} migration(s) applied" if applied else "schema is up to date")
+        if args.explain:
+            print()
+            print(format_report(before, explain(conn)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+#------------------------------------------------------------
+# Keyset (cursor) pagination shared by the collection routes.
+#
+# A client asks for a page with ?limit=N.  If more rows exist the
+# response carries an opaque cursor in the X-Next-Cursor header (and
+# a Link: rel="next" header); passing it back as ?cursor=... returns
+# the following page.  The cursor holds the sort-key values of the
+# last row sent, so the next page is found with an index range
+# ("rows after these values") instead of OFFSET, and costs the same
+# on page 1 and page 1000.
+#
+# Without ?limit the route returns every row, exactly as before.
+#------------------------------------------------------------
+import base64
+import json
+from urllib.parse import urlencode
+
+from flask import abort, jsonify, make_response, request
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+def _bad_request(message):
+    abort(make_response(jsonify({"error": message}), 400))
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, default=str, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    padded = token + "=" * (-len(token) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+
+class Page:
+    """
+    One page request against an ordered query.
+
+    keys is a list of (sql_expression, row_key) or
+    (sql_expression, row_key, "DESC") tuples.  The last key must be
+    unique (normally the primary key) so the ordering is total.
+    """
+
+    def __init__(self, keys, limit=None, after=None):
+        self.keys = keys
+        self.limit = limit
+        self.after = after
+        self.next_cursor = None
+
+    @property
+    def params(self):
+        """Values for the placeholders in where(), in order."""
+        return [value for _, values in self._branches() for value in values]
+
+    def where(self, has_where=False):
+        """SQL for 'rows after the cursor', starting with WHERE or AND."""
+        if not self.after:
+            return ""
+        branches = [sql for sql, _ in self._branches()] or ["FALSE"]
+        return (" AND " if has_where else " WHERE ") + "(" + " OR ".join(branches) + ")"
+
+    def _branches(self):
+        """
+        (sql, values) per sort key: rows equal to the cursor on the keys
+        before it and after the cursor on this one.  Sort keys may be
+        NULL (a nullable column, a LEFT JOIN): ties use <=>, and MySQL
+        sorts NULL first ascending and last descending, so that is
+        where the range comparisons put it.
+        """
+        if not self.after:
+            return []
+        branches = []
+        for i, key in enumerate(self.keys):
+            column, value = key[0], self.after[i]
+            terms = [f"{earlier[0]} <=> %s" for earlier in self.keys[:i]]
+            values = list(self.after[:i])
+            if value is None:
+                if _is_desc(key):
+                    continue    # nothing sorts after NULL
+                terms.append(f"{column} IS NOT NULL")
+            elif _is_desc(key):
+                terms.append(f"({column} < %s OR {column} IS NULL)")
+                values.append(value)
+            else:
+                terms.append(f"{column} > %s")
+                values.append(value)
+            branches.append(("(" + " AND ".join(terms) + ")", values))
+        return branches
+
+    def order_by(self):
+        """ORDER BY for the sort keys, plus LIMIT when paginating."""
+        sql = " ORDER BY " + ", ".join(
+            f"{key[0]} {'DESC' if _is_desc(key) else 'ASC'}" for key in self.keys
+        )
+        if self.limit:
+            # one extra row tells us whether there is a next page
+            sql += f" LIMIT {int(self.limit) + 1}"
+        return sql
+
+    def trim(self, rows):
+        """Drop the look-ahead row and remember the cursor for the next page."""
+        rows = list(rows)
+        if self.limit and len(rows) > self.limit:
+            rows = rows[: self.limit]
+            last = rows[-1]
+            self.next_cursor = encode_cursor([last[row_key] for _, row_key, *_ in self.keys])
+        return rows
+
+    def headers(self):
+        if not self.next_cursor:
+            return {}
+        args = request.args.to_dict()
+        args["cursor"] = self.next_cursor
+        args["limit"] = self.limit
+        query = urlencode(args)
+        return {
+            "X-Next-Cursor": self.next_cursor,
+            "Link": f'<{request.path}?{query}>; rel="next"',
+        }
+
+
+def _is_desc(key):
+    return len(key) > 2 and key[2].upper() == "DESC"
+
+
+def from_request(keys):
+    """Build a Page from ?limit= and ?cursor= (400 if either is malformed)."""
+    limit = request.args.get("limit")
+    token = request.args.get("cursor")
+
+    if limit is None and token is None:
+        return Page(keys)
+
+    try:
+        limit = int(limit) if limit is not None else DEFAULT_LIMIT
+    except ValueError:
+        _bad_request("limit must be a whole number")
+    if not 1 <= limit <= MAX_LIMIT:
+        _bad_request(f"limit must be between 1 and {MAX_LIMIT}")
+
+    after = None
+    if token:
+        try:
+            after = decode_cursor(token)
+        except (ValueError, TypeError):
+            _bad_request("cursor is not valid")
+        if not isinstance(after, list) or len(after) != len(keys):
+            _bad_request("cursor does not match this endpoint")
+
+    return Page(keys, limit, after)
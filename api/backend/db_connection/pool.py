@@ -0,0 +1,356 @@
+#------------------------------------------------------------
+# A bounded, health-checked pool of PyMySQL connections.
+#
+# flaskext.mysql opens a brand new connection (TCP + auth
+# handshake) for every request.  PooledMySQL keeps the same
+# get_db() interface but borrows connections from a shared
+# ConnectionPool and hands them back when the request ends.
+#------------------------------------------------------------
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pymysql
+from pymysql.constants import SERVER_STATUS
+from flask import g
+from flaskext.mysql import MySQL
+
+
+class PoolTimeout(pymysql.err.OperationalError):
+    """Raised when no connection could be borrowed within the wait timeout."""
+
+
+class _Slot:
+    # Book-keeping for a single pooled connection
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn):
+        now = time.monotonic()
+        self.conn = conn
+        self.created_at = now
+        self.last_used = now
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of DB-API connections.
+
+    Args:
+        connect: zero-argument callable returning a new connection
+        min_size: idle connections that are never evicted for idleness
+        max_size: hard cap on open connections (idle + in use)
+        max_idle: seconds an idle connection may sit before it is closed
+        max_lifetime: seconds after which a connection is retired
+        timeout: seconds acquire() waits for a free connection
+        pre_ping: validate connections with ping() before handing them out
+    """
+
+    def __init__(self, connect, min_size=1, max_size=10, max_idle=300,
+                 max_lifetime=3600, timeout=5.0, pre_ping=True):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError("pool sizes must satisfy 0 <= min_size <= max_size, max_size >= 1")
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.pre_ping = pre_ping
+
+        self._cond = threading.Condition(threading.Lock())
+        self._idle = deque()    # most recently used on the right
+        self._in_use = {}       # id(conn) -> _Slot
+        self._opening = 0       # connections being created outside the lock
+        self._pid = os.getpid()
+
+        self._counters = {
+            "acquired": 0,
+            "created": 0,
+            "closed": 0,
+            "failed_pings": 0,
+            "timeouts": 0,
+            "waits": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+        }
+
+    # ------------------------------------------------------------
+    # borrowing / returning
+
+    def acquire(self):
+        self._check_fork()
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+
+        while True:
+            slot = None
+            timed_out = False
+            with self._cond:
+                stale = self._evict_idle_locked()
+                while not self._idle and self._total_locked() >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._counters["timeouts"] += 1
+                        timed_out = True
+                        break
+                    waited = True
+                    self._cond.wait(remaining)
+
+                if not timed_out:
+                    if self._idle:
+                        slot = self._idle.pop()
+                        self._in_use[id(slot.conn)] = slot
+                    else:
+                        self._opening += 1
+
+            for conn in stale:
+                self._close_quietly(conn)
+            if timed_out:
+                raise PoolTimeout(
+                    2013, f"timed out after {self.timeout}s waiting for a DB connection"
+                )
+
+            if slot is None:
+                slot = self._open_slot()
+            elif not self._validate(slot):
+                self._discard(slot)
+                continue
+
+            with self._cond:
+                self._counters["acquired"] += 1
+                if waited:
+                    wait = time.monotonic() - started
+                    self._counters["waits"] += 1
+                    self._counters["wait_time_total"] += wait
+                    self._counters["wait_time_max"] = max(self._counters["wait_time_max"], wait)
+            return slot.conn
+
+    def release(self, conn, discard=False):
+        with self._cond:
+            slot = self._in_use.pop(id(conn), None)
+        if slot is None:
+            # not ours (or borrowed before a fork) - just close it
+            self._close_quietly(conn)
+            return
+
+        if not discard:
+            discard = not self._reset(conn) or self._expired(slot)
+
+        if discard:
+            self._close_quietly(conn)
+            with self._cond:
+                self._counters["closed"] += 1
+                self._cond.notify()
+            return
+
+        slot.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(slot)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        # For code running outside a request (jobs, scripts)
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            self.release(conn, discard=not conn.open)
+            raise
+        else:
+            self.release(conn)
+
+    def close(self):
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._counters["closed"] += len(idle)
+            self._cond.notify_all()
+        for slot in idle:
+            self._close_quietly(slot.conn)
+
+    def stats(self):
+        with self._cond:
+            in_use = len(self._in_use)
+            idle = len(self._idle)
+            counters = dict(self._counters)
+        waits = counters["waits"]
+        counters["wait_time_avg"] = counters["wait_time_total"] / waits if waits else 0.0
+        counters.update({
+            "in_use": in_use,
+            "idle": idle,
+            "size": in_use + idle,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+        })
+        return counters
+
+    # ------------------------------------------------------------
+    # internals
+
+    def _total_locked(self):
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    def _open_slot(self):
+        try:
+            slot = _Slot(self._connect())
+        except BaseException:
+            with self._cond:
+                self._opening -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._opening -= 1
+            self._in_use[id(slot.conn)] = slot
+            self._counters["created"] += 1
+        return slot
+
+    def _validate(self, slot):
+        if self._expired(slot):
+            return False
+        if not self.pre_ping:
+            return True
+        try:
+            slot.conn.ping(reconnect=False)
+            return True
+        except Exception:
+            with self._cond:
+                self._counters["failed_pings"] += 1
+            return False
+
+    def _expired(self, slot):
+        return self.max_lifetime and time.monotonic() - slot.created_at > self.max_lifetime
+
+    def _reset(self, conn):
+        # Roll back anything a route left open so the next borrower
+        # starts clean; skip the round trip when no transaction is active.
+        try:
+            if not conn.open:
+                return False
+            if conn.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+                conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, slot):
+        with self._cond:
+            self._in_use.pop(id(slot.conn), None)
+            self._counters["closed"] += 1
+            self._cond.notify()
+        self._close_quietly(slot.conn)
+
+    def _evict_idle_locked(self):
+        # Oldest idle connections sit on the left of the deque.  The
+        # caller closes the returned connections once the lock is released.
+        stale = []
+        if not self.max_idle:
+            return stale
+        cutoff = time.monotonic() - self.max_idle
+        while len(self._idle) > self.min_size and self._idle[0].last_used < cutoff:
+            stale.append(self._idle.popleft().conn)
+            self._counters["closed"] += 1
+        return stale
+
+    def _check_fork(self):
+        # Connections must never be shared between a parent process and
+        # its forked workers; a child simply starts with an empty pool.
+        if self._pid != os.getpid():
+            with self._cond:
+                if self._pid != os.getpid():
+                    self._idle = deque()
+                    self._in_use = {}
+                    self._opening = 0
+                    self._pid = os.getpid()
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+# pymysql.connect() argument -> app config key, as in flaskext.mysql
+CONNECT_SETTINGS = (
+    ("host", "MYSQL_DATABASE_HOST"),
+    ("port", "MYSQL_DATABASE_PORT"),
+    ("user", "MYSQL_DATABASE_USER"),
+    ("password", "MYSQL_DATABASE_PASSWORD"),
+    ("db", "MYSQL_DATABASE_DB"),
+    ("charset", "MYSQL_DATABASE_CHARSET"),
+    ("use_unicode", "MYSQL_USE_UNICODE"),
+    ("unix_socket", "MYSQL_DATABASE_SOCKET"),
+    ("sql_mode", "MYSQL_SQL_MODE"),
+    ("cursorclass", "MYSQL_CURSORCLASS"),
+    ("ssl", "MYSQL_SSL_CA"),
+)
+
+
+class PooledMySQL(MySQL):
+    """
+    Drop-in replacement for flaskext.mysql.MySQL that serves get_db()
+    from a ConnectionPool.  Every blueprint keeps calling
+    db.get_db().cursor() and db.get_db().commit() unchanged.
+    """
+
+    def __init__(self, app=None, prefix="mysql", connection_class=pymysql.connections.Connection,
+                 **connect_args):
+        self.pool = None
+        self.connection_class = connection_class
+        super().__init__(app, prefix, **connect_args)
+
+    def init_app(self, app):
+        super().init_app(app)
+        app.config.setdefault("MYSQL_POOL_MIN_SIZE", 1)
+        app.config.setdefault("MYSQL_POOL_MAX_SIZE", 10)
+        app.config.setdefault("MYSQL_POOL_MAX_IDLE", 300)
+        app.config.setdefault("MYSQL_POOL_MAX_LIFETIME", 3600)
+        app.config.setdefault("MYSQL_POOL_TIMEOUT", 5.0)
+        app.config.setdefault("MYSQL_POOL_PRE_PING", True)
+
+        self.pool = ConnectionPool(
+            self.connect,
+            min_size=app.config["MYSQL_POOL_MIN_SIZE"],
+            max_size=app.config["MYSQL_POOL_MAX_SIZE"],
+            max_idle=app.config["MYSQL_POOL_MAX_IDLE"],
+            max_lifetime=app.config["MYSQL_POOL_MAX_LIFETIME"],
+            timeout=app.config["MYSQL_POOL_TIMEOUT"],
+            pre_ping=app.config["MYSQL_POOL_PRE_PING"],
+        )
+
+    def connect(self):
+        # flaskext.mysql copies the MYSQL_* settings into connect_args
+        # and calls pymysql.connect(); do the same with connection_class
+        for arg, key in CONNECT_SETTINGS:
+            if self.app.config[key]:
+                self.connect_args[arg] = self.app.config[key]
+        return self.connection_class(**self.connect_args)
+
+    def get_db(self):
+        key = f"_{self.prefix}_conn"
+        conn = g.get(key)
+        if conn is None:
+            conn = self.pool.acquire()
+            setattr(g, key, conn)
+        return conn
+
+    def discard_db(self):
+        """
+        Close the request's connection instead of returning it to the
+        pool, for a session left in a state the next borrower must not
+        inherit (e.g. still holding a named lock).
+        """
+        conn = g.pop(f"_{self.prefix}_conn", None)
+        if conn is not None:
+            self.pool.release(conn, discard=True)
+
+    def teardown_request(self, exception):
+        conn = g.pop(f"_{self.prefix}_conn", None)
+        if conn is not None:
+            self.pool.release(conn, discard=not conn.open)
+
+    def stats(self):
+        return self.pool.stats() if self.pool else {}
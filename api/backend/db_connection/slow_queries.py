@@ -0,0 +1,226 @@
+#------------------------------------------------------------
+# Slow-query capture.
+#
+# Listens to the timed cursors (see instrumented.py), so it sees
+# every statement run through db.get_db() or the pool, and keeps
+# per-statement totals in this process:
+#
+#   - each statement is reduced to a fingerprint: comments and
+#     extra whitespace removed, string and number literals and
+#     %s placeholders replaced by "?", and lists such as IN (...),
+#     multi-row VALUES and CASE ... WHEN arms collapsed, so the
+#     f-string queries built inline in the routes group with their
+#     siblings;
+#   - statements slower than SLOW_QUERY_MS are logged with the
+#     route that ran them;
+#   - for a sample of slow SELECT / INSERT / UPDATE / DELETE
+#     statements (SLOW_QUERY_EXPLAIN_RATE, at most once per
+#     fingerprint every SLOW_QUERY_EXPLAIN_INTERVAL seconds) the
+#     plan is fetched with EXPLAIN by a background job on its own
+#     pooled connection, never on the request's;
+#   - report(n) lists the n fingerprints with the most total time.
+#
+# At most SLOW_QUERY_MAX_FINGERPRINTS fingerprints are tracked;
+# statements beyond that are added to a single "<other>" entry.
+#------------------------------------------------------------
+import logging
+import random
+import re
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+
+from flask import has_request_context, request
+from pymysql import cursors
+
+from backend.db_connection import db
+from backend.db_connection.background import PeriodicTask
+from backend.db_connection.instrumented import add_listener
+
+OTHER = "<other>"
+
+# statements MySQL can EXPLAIN
+EXPLAINABLE = ("SELECT", "WITH", "INSERT", "REPLACE", "UPDATE", "DELETE")
+
+# slow statements waiting for EXPLAIN
+MAX_PENDING_EXPLAINS = 100
+
+_COMMENTS = re.compile(r"/\*.*?\*/|(?:--|#)[^\n]*", re.S)
+_STRINGS = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"")
+_NUMBERS = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:e[+-]?\d+)?(?![\w.])", re.I)
+_PLACEHOLDERS = re.compile(r"%(?:\(\w+\))?s")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROWS = re.compile(r"\(\?\+\)(?:\s*,\s*\(\?(?:\+)?\))+")
+_CASES = re.compile(r"(?:WHEN \? THEN \? ?){2,}", re.I)
+_SPACES = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(query):
+    """The statement with its literals normalized."""
+    text = _STRINGS.sub("?", query)
+    text = _COMMENTS.sub(" ", text)
+    text = _PLACEHOLDERS.sub("?", text)
+    text = _NUMBERS.sub("?", text)
+    text = _SPACES.sub(" ", text).strip().rstrip(";").strip()
+    text = _LISTS.sub("(?+)", text)
+    text = _ROWS.sub("(?+)+", text)
+    text = _CASES.sub("WHEN ? THEN ? ... ", text)
+    return text
+
+
+def _calling_route():
+    if not has_request_context():
+        return "background"
+    return f"{request.method} {request.url_rule.rule if request.url_rule else request.path}"
+
+
+class SlowQueryLog:
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.enabled = True
+        self.threshold = 0.2
+        self.explain_rate = 0.2
+        self.explain_interval = 300
+        self.max_fingerprints = 500
+        self._lock = threading.Lock()
+        self._queries = {}
+        self._pending = deque(maxlen=MAX_PENDING_EXPLAINS)
+        self._counters = {"statements": 0, "slow": 0, "explained": 0, "failed_explains": 0}
+        self._task = PeriodicTask("slow-query-explain", 5, self.explain_pending, self.logger)
+
+    def init_app(self, app):
+        app.config.setdefault("SLOW_QUERY_ENABLED", True)
+        app.config.setdefault("SLOW_QUERY_MS", 200)
+        app.config.setdefault("SLOW_QUERY_EXPLAIN_RATE", self.explain_rate)
+        app.config.setdefault("SLOW_QUERY_EXPLAIN_INTERVAL", self.explain_interval)
+        app.config.setdefault("SLOW_QUERY_MAX_FINGERPRINTS", self.max_fingerprints)
+        self.enabled = app.config["SLOW_QUERY_ENABLED"]
+        self.threshold = app.config["SLOW_QUERY_MS"] / 1000
+        self.explain_rate = app.config["SLOW_QUERY_EXPLAIN_RATE"]
+        self.explain_interval = app.config["SLOW_QUERY_EXPLAIN_INTERVAL"]
+        self.max_fingerprints = app.config["SLOW_QUERY_MAX_FINGERPRINTS"]
+        self._task.logger = self.logger = app.logger
+        if self.enabled:
+            add_listener(self.observe)
+
+    # ------------------------------------------------------------
+    # cursor side
+
+    def observe(self, query, args, seconds, rows):
+        if not self.enabled:
+            return
+        if isinstance(query, bytes):
+            query = query.decode("utf-8", "replace")
+        key = fingerprint(query)
+        slow = seconds >= self.threshold
+        route = _calling_route() if slow else None
+        explain = False
+
+        with self._lock:
+            self._counters["statements"] += 1
+            entry = self._queries.get(key)
+            if entry is None:
+                if len(self._queries) >= self.max_fingerprints:
+                    key = OTHER
+                    entry = self._queries.get(OTHER)
+                if entry is None:
+                    entry = self._queries[key] = {
+                        "calls": 0, "total_seconds": 0.0, "max_seconds": 0.0, "rows": 0,
+                        "slow_calls": 0, "last_slow_route": None, "sample": query[:1000],
+                        "explain": None, "explained_at": None, "_explain_due": 0.0,
+                    }
+            entry["calls"] += 1
+            entry["total_seconds"] += seconds
+            entry["rows"] += rows
+            if seconds > entry["max_seconds"]:
+                entry["max_seconds"] = seconds
+            if slow:
+                self._counters["slow"] += 1
+                entry["slow_calls"] += 1
+                entry["last_slow_route"] = route
+                now = time.monotonic()
+                if (
+                    key != OTHER
+                    and now >= entry["_explain_due"]
+                    and (query.split(None, 1) or [""])[0].upper() in EXPLAINABLE
+                    and random.random() < self.explain_rate
+                ):
+                    entry["_explain_due"] = now + self.explain_interval
+                    self._pending.append((key, query, args))
+                    explain = True
+
+        if slow:
+            self.logger.warning(
+                f"Slow query: {seconds * 1000:.0f} ms, {rows} rows, in {route}: {key}"
+            )
+        if explain:
+            self._task.wake()
+
+    # ------------------------------------------------------------
+    # background side
+
+    def explain_pending(self):
+        with self._lock:
+            pending, self._pending = list(self._pending), deque(maxlen=MAX_PENDING_EXPLAINS)
+        if not pending:
+            return
+
+        with db.pool.connection() as conn:
+            # a plain cursor, so the EXPLAINs are not timed themselves
+            with conn.cursor(cursors.DictCursor) as cursor:
+                for key, query, args in pending:
+                    try:
+                        cursor.execute("EXPLAIN " + query, args)
+                        plan = cursor.fetchall()
+                    except Exception as e:
+                        self.logger.error(f"Could not EXPLAIN slow query {key}: {str(e)}")
+                        with self._lock:
+                            self._counters["failed_explains"] += 1
+                        continue
+                    with self._lock:
+                        self._counters["explained"] += 1
+                        entry = self._queries.get(key)
+                        if entry is not None:
+                            entry["explain"] = plan
+                            entry["explained_at"] = time.time()
+            conn.rollback()
+
+    # ------------------------------------------------------------
+    # reporting
+
+    def report(self, n=20):
+        """The n fingerprints with the most total time, slowest first."""
+        with self._lock:
+            entries = sorted(self._queries.items(), key=lambda item: item[1]["total_seconds"], reverse=True)[:n]
+            rows = [(key, dict(entry)) for key, entry in entries]
+        report = []
+        for key, entry in rows:
+            report.append({
+                "fingerprint": key,
+                "calls": entry["calls"],
+                "total_ms": round(entry["total_seconds"] * 1000, 3),
+                "avg_ms": round(entry["total_seconds"] * 1000 / entry["calls"], 3),
+                "max_ms": round(entry["max_seconds"] * 1000, 3),
+                "rows": entry["rows"],
+                "slow_calls": entry["slow_calls"],
+                "last_slow_route": entry["last_slow_route"],
+                "sample": entry["sample"],
+                "explain": entry["explain"],
+                "explained_at": entry["explained_at"],
+            })
+        return report
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._counters,
+                "fingerprints": len(self._queries),
+                "pending_explains": len(self._pending),
+                "threshold_ms": self.threshold * 1000,
+            }
+
+
+slow_queries = SlowQueryLog()
@@ -0,0 +1,104 @@
+#------------------------------------------------------------
+# Opt-in streaming responses for large result sets.
+#
+# Normal routes do cursor.fetchall() and jsonify() the list, so
+# the whole result sits in memory several times (driver buffer,
+# list of dicts, encoded JSON).  stream_query() instead reads the
+# rows through an unbuffered server-side cursor and writes them to
+# the client in small chunks, so memory stays flat no matter how
+# many rows the query returns.
+#
+# A client opts in with ?stream=json (a chunked JSON array) or
+# ?stream=ndjson (one JSON object per line).  A stream is the whole
+# result, so ?limit= / ?cursor= pagination cannot be combined with it.
+#------------------------------------------------------------
+from flask import Response, abort, current_app, jsonify, make_response, request
+
+from backend.db_connection import db
+from backend.db_connection.instrumented import InstrumentedSSDictCursor
+
+# rows fetched from MySQL (and written to the client) per chunk
+CHUNK_ROWS = 500
+
+MIMETYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def requested():
+    """
+    Return the stream format asked for by the client, or None.
+    400 if the client also asked for a page (?limit= or ?cursor=).
+    """
+    value = request.args.get("stream", "").lower()
+    fmt = None
+    if value in ("1", "true", "json"):
+        fmt = "json"
+    elif value == "ndjson" or "application/x-ndjson" in request.headers.get("Accept", ""):
+        fmt = "ndjson"
+    if fmt and ("limit" in request.args or "cursor" in request.args):
+        abort(make_response(jsonify({
+            "error": "stream returns every row; it cannot be combined with limit or cursor"
+        }), 400))
+    return fmt
+
+
+def stream_query(query, params=(), fmt="json", chunk_rows=CHUNK_ROWS):
+    """
+    Run query on a dedicated pooled connection and return a streaming
+    Response.  The query is executed right away (so SQL errors still
+    reach the route's error handling); the connection is held until the
+    last row is sent or the client goes away, then returned to the pool.
+    """
+    dumps = current_app.json.dumps
+    logger = current_app.logger
+    pool = db.pool
+
+    conn = pool.acquire()
+    cursor = conn.cursor(InstrumentedSSDictCursor)
+    try:
+        cursor.execute(query, params)
+    except Exception:
+        pool.release(conn, discard=True)
+        raise
+
+    state = {"finished": False}
+
+    def generate():
+        try:
+            first = True
+            if fmt == "json":
+                yield "["
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                if fmt == "json":
+                    chunk = ",".join(dumps(row) for row in rows)
+                    yield chunk if first else "," + chunk
+                else:
+                    yield "".join(dumps(row) + "\n" for row in rows)
+                first = False
+            if fmt == "json":
+                yield "]"
+            state["finished"] = True
+        except Exception as e:
+            # Headers are already sent, so all we can do is stop; the
+            # client sees a truncated body.
+            logger.error(f"Error while streaming query results: {str(e)}")
+            raise
+
+    def release():
+        if state["finished"]:
+            cursor.close()
+            pool.release(conn)
+        else:
+            # Unread rows would have to be drained before the connection
+            # could be reused; cheaper to drop it.
+            pool.release(conn, discard=True)
+
+    response = Response(generate(), mimetype=MIMETYPES[fmt])
+    response.headers["X-Accel-Buffering"] = "no"
+    response.call_on_close(release)
+    return response
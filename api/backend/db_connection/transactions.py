@@ -0,0 +1,269 @@
+#------------------------------------------------------------
+# Request-scoped cursors and transactions.
+#
+# Routes used to open a cursor with db.get_db().cursor(), and close
+# it and commit by hand.  Any early return (a 404, a 400 after the
+# first SELECT) or exception skipped the close, and a write that
+# failed half way left its row locks held until the connection went
+# back to the pool.  Instead:
+#
+#     with tx.cursor() as cursor:          # reads
+#         cursor.execute(...)
+#
+#     with tx.transaction() as cursor:     # writes
+#         cursor.execute("UPDATE ...")
+#         if cursor.rowcount == 0:
+#             return ..., 404              # commits (nothing written)
+#
+# cursor() closes the cursor however the block is left.
+# transaction() also commits when the block finishes (including an
+# early return) and rolls back when it raises.  Both use the
+# request's pooled connection unless a conn is passed, as the helper
+# modules that take one do.  At request teardown (before the
+# connection is released) any cursor still open is closed and any
+# transaction still open is rolled back, and both are counted.
+#
+# Writes that collide with other writes can fail with a deadlock
+# (1213) or a lock wait timeout (1205).  Both are transient: the
+# server has already rolled the loser back, so running the request
+# again normally succeeds.  Write routes are decorated with
+#
+#     @students.route("/events", methods=["POST"])
+#     @tx.retrying
+#     def register_for_event(): ...
+#
+# which re-runs the whole view, after a jittered exponential backoff,
+# up to TRANSACTION_RETRIES more times, and answers 503 with a
+# Retry-After header if it still fails.  Only decorate views whose
+# writes all happen in one tx.transaction() (anything committed
+# before the failing transaction would be written twice) and that do
+# not read the request body as a stream.
+#
+# stats() reports transaction counts and durations, commits,
+# rollbacks, lock wait timeouts (1205) and deadlocks (1213) seen by
+# this process, plus the server's own InnoDB row lock wait totals.
+#------------------------------------------------------------
+import functools
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+import pymysql
+from flask import g, has_request_context, jsonify, request
+from pymysql.constants import SERVER_STATUS
+
+ER_LOCK_WAIT_TIMEOUT = 1205
+ER_LOCK_DEADLOCK = 1213
+RETRYABLE = (ER_LOCK_WAIT_TIMEOUT, ER_LOCK_DEADLOCK)
+
+# upper bounds in seconds for the transaction duration histogram
+DURATION_BUCKETS = (0.005, 0.025, 0.1, 0.5, 1.0, 5.0)
+
+
+class TransactionManager:
+
+    def __init__(self, db):
+        self.db = db
+        self.logger = logging.getLogger(__name__)
+        self.slow_seconds = 0.5
+        self.retries = 3
+        self.retry_base = 0.025
+        self.retry_max = 0.5
+        self._lock = threading.Lock()
+        self._counters = {
+            "transactions": 0, "commits": 0, "rollbacks": 0,
+            "lock_wait_timeouts": 0, "deadlocks": 0, "slow_transactions": 0,
+            "cursors_closed_at_teardown": 0, "transactions_rolled_back_at_teardown": 0,
+            "retries": 0, "retried_requests_succeeded": 0, "retries_given_up": 0,
+        }
+        self._durations = {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0,
+                           "buckets": [0] * (len(DURATION_BUCKETS) + 1)}
+
+    def init_app(self, app):
+        """Call after db.init_app(app), so teardown runs before release."""
+        app.config.setdefault("TRANSACTION_SLOW_MS", 500)
+        app.config.setdefault("TRANSACTION_RETRIES", self.retries)
+        app.config.setdefault("TRANSACTION_RETRY_BASE_MS", self.retry_base * 1000)
+        app.config.setdefault("TRANSACTION_RETRY_MAX_MS", self.retry_max * 1000)
+        self.slow_seconds = app.config["TRANSACTION_SLOW_MS"] / 1000
+        self.retries = app.config["TRANSACTION_RETRIES"]
+        self.retry_base = app.config["TRANSACTION_RETRY_BASE_MS"] / 1000
+        self.retry_max = app.config["TRANSACTION_RETRY_MAX_MS"] / 1000
+        self.logger = app.logger
+        app.teardown_request(self.teardown_request)
+
+    # ------------------------------------------------------------
+    # context managers
+
+    @contextmanager
+    def cursor(self, conn=None):
+        """A cursor that is closed when the block is left."""
+        conn = conn or self.db.get_db()
+        cursor = conn.cursor()
+        self._track(cursor)
+        try:
+            yield cursor
+        finally:
+            self._close(cursor)
+
+    @contextmanager
+    def transaction(self, conn=None):
+        """A cursor whose work is committed on exit, rolled back on error."""
+        conn = conn or self.db.get_db()
+        started = time.perf_counter()
+        with self.cursor(conn) as cursor:
+            try:
+                yield cursor
+                conn.commit()
+            except BaseException as e:
+                self._rollback(conn, e)
+                self._finished(started, committed=False)
+                raise
+        self._finished(started, committed=True)
+
+    # ------------------------------------------------------------
+    # retrying write routes
+
+    def retrying(self, view):
+        """Re-run the view when it fails with a deadlock or lock wait timeout."""
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            for attempt in range(self.retries + 1):
+                try:
+                    response = view(*args, **kwargs)
+                except pymysql.err.OperationalError as e:
+                    code = e.args[0] if e.args else None
+                    if code not in RETRYABLE:
+                        raise
+                    error = e
+                else:
+                    if attempt:
+                        self._count(retried_requests_succeeded=1)
+                    return response
+                self._discard_transaction()
+                if attempt == self.retries:
+                    break
+                # full jitter, so colliding requests do not collide again
+                delay = random.uniform(0, min(self.retry_max, self.retry_base * 2 ** attempt))
+                self._count(retries=1)
+                self.logger.warning(
+                    f"Retrying {request.method} {request.path} in {delay * 1000:.0f} ms "
+                    f"(attempt {attempt + 1} of {self.retries}): {str(error)}"
+                )
+                time.sleep(delay)
+
+            self._count(retries_given_up=1)
+            self.logger.error(
+                f"Giving up on {request.method} {request.path} after {self.retries} retries: {str(error)}"
+            )
+            response = jsonify({"error": "The database is busy, please try again"})
+            response.status_code = 503
+            response.headers["Retry-After"] = "1"
+            return response
+        return wrapper
+
+    def _discard_transaction(self):
+        # a lock wait timeout only rolls back the statement that timed out,
+        # so drop whatever a tx.cursor() read left open before starting over
+        try:
+            self.db.get_db().rollback()
+        except Exception as e:
+            self.logger.error(f"Rollback before retry failed: {str(e)}")
+
+    # ------------------------------------------------------------
+    # book-keeping
+
+    def _count(self, **increments):
+        with self._lock:
+            for name, n in increments.items():
+                self._counters[name] += n
+
+    @staticmethod
+    def _track(cursor):
+        if has_request_context():
+            g.setdefault("_open_cursors", set()).add(cursor)
+
+    @staticmethod
+    def _close(cursor):
+        if has_request_context():
+            g.get("_open_cursors", set()).discard(cursor)
+        cursor.close()
+
+    def _rollback(self, conn, error):
+        code = error.args[0] if isinstance(error, pymysql.err.MySQLError) and error.args else None
+        with self._lock:
+            if code == ER_LOCK_WAIT_TIMEOUT:
+                self._counters["lock_wait_timeouts"] += 1
+            elif code == ER_LOCK_DEADLOCK:
+                self._counters["deadlocks"] += 1
+        try:
+            conn.rollback()
+        except Exception as e:
+            # the original error matters more; the pool discards a dead conn
+            self.logger.error(f"Rollback failed: {str(e)}")
+
+    def _finished(self, started, committed):
+        seconds = time.perf_counter() - started
+        slot = next((i for i, bound in enumerate(DURATION_BUCKETS) if seconds <= bound), len(DURATION_BUCKETS))
+        with self._lock:
+            self._counters["transactions"] += 1
+            self._counters["commits" if committed else "rollbacks"] += 1
+            self._durations["count"] += 1
+            self._durations["total_seconds"] += seconds
+            self._durations["max_seconds"] = max(self._durations["max_seconds"], seconds)
+            self._durations["buckets"][slot] += 1
+            slow = seconds >= self.slow_seconds
+            if slow:
+                self._counters["slow_transactions"] += 1
+        if slow:
+            where = f"{request.method} {request.path}" if has_request_context() else "background"
+            self.logger.warning(f"Transaction held for {seconds * 1000:.0f} ms in {where}")
+
+    def teardown_request(self, exception):
+        leftover = g.pop("_open_cursors", None)
+        for cursor in leftover or ():
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        conn = g.get(f"_{self.db.prefix}_conn")
+        open_tx = False
+        try:
+            open_tx = bool(conn is not None and conn.open
+                           and conn.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS)
+            if open_tx:
+                conn.rollback()
+        except Exception as e:
+            self.logger.error(f"Could not roll back at teardown: {str(e)}")
+        if leftover or open_tx:
+            with self._lock:
+                self._counters["cursors_closed_at_teardown"] += len(leftover or ())
+                self._counters["transactions_rolled_back_at_teardown"] += int(open_tx)
+
+    # ------------------------------------------------------------
+    # reporting
+
+    def lock_waits(self):
+        """The server's InnoDB row lock wait totals (all sessions)."""
+        with self.db.pool.connection() as conn:
+            with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+                cursor.execute("SHOW GLOBAL STATUS LIKE 'Innodb_row_lock%'")
+                return {row["Variable_name"]: int(row["Value"]) for row in cursor.fetchall()}
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            durations = dict(self._durations, buckets=list(self._durations["buckets"]))
+        count = durations["count"]
+        durations["avg_ms"] = round(durations["total_seconds"] * 1000 / count, 3) if count else 0.0
+        durations["max_ms"] = round(durations.pop("max_seconds") * 1000, 3)
+        durations["total_ms"] = round(durations.pop("total_seconds") * 1000, 3)
+        durations["buckets"] = dict(zip([f"le_{bound}" for bound in DURATION_BUCKETS] + ["le_inf"],
+                                        durations["buckets"]))
+        try:
+            server = self.lock_waits()
+        except Exception as e:
+            server = {"error": str(e)}
+        return {**counters, "duration": durations, "server_row_lock_waits": server}
@@ -0,0 +1,21 @@
+#------------------------------------------------------------
+# This file picks the JSON provider installed on the app
+#------------------------------------------------------------
+from backend.json_provider.providers import OrjsonProvider, StdlibProvider, orjson
+
+PROVIDERS = {"orjson": OrjsonProvider, "stdlib": StdlibProvider}
+
+
+def init_app(app):
+    # JSON_PROVIDER chooses the encoder (see providers.py); orjson
+    # falls back to the stdlib one when it is not installed
+    app.config.setdefault("JSON_PROVIDER", "orjson")
+    name = app.config["JSON_PROVIDER"]
+    if name not in PROVIDERS:
+        raise ValueError(f"JSON_PROVIDER must be one of {', '.join(PROVIDERS)}, not {name!r}")
+    if name == "orjson" and orjson is None:
+        app.logger.warning("orjson is not installed; using the stdlib JSON provider")
+        name = "stdlib"
+
+    app.json_provider_class = PROVIDERS[name]
+    app.json = app.json_provider_class(app)
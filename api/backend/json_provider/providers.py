@@ -0,0 +1,95 @@
+#------------------------------------------------------------
+# JSON providers for app.json (used by jsonify, request.get_json
+# and the streaming responses).
+#
+# Rows from PyMySQL hold date (DATE), datetime (DATETIME),
+# timedelta (TIME) and Decimal (DECIMAL, SUM/AVG) values.  Flask's
+# default provider turns dates into HTTP date strings
+# ("Wed, 15 Jan 2025 00:00:00 GMT") and fails on timedelta, so both
+# providers here encode them the same explicit way:
+#
+#   date        "2025-01-15"
+#   datetime    "2025-01-15T18:00:00"  (ISO 8601, offset if tz-aware)
+#   timedelta   "18:30:00"             (as MySQL prints TIME, [-]HH:MM:SS[.ffffff])
+#   Decimal     "12.50"                (a string, so no precision is lost)
+#
+# OrjsonProvider does the work in orjson's C encoder and only calls
+# back into Python for timedelta and Decimal.  StdlibProvider is the
+# fallback when orjson is not installed (or JSON_PROVIDER=stdlib).
+# Keys are sorted like Flask's default, so responses keep their
+# field order whichever provider is used.
+#------------------------------------------------------------
+import dataclasses
+import decimal
+import uuid
+from datetime import date, datetime, timedelta
+
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def format_timedelta(value):
+    micros = (value.days * 86400 + value.seconds) * 1_000_000 + value.microseconds
+    sign = "-" if micros < 0 else ""
+    seconds, micros = divmod(abs(micros), 1_000_000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    text = f"{sign}{hours:02d}:{minutes:02d}:{seconds:02d}"
+    return f"{text}.{micros:06d}" if micros else text
+
+
+def encode_value(value):
+    """default= hook shared by both providers."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return format_timedelta(value)
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if hasattr(value, "__html__"):
+        return str(value.__html__())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class StdlibProvider(DefaultJSONProvider):
+    """Flask's provider with the encoders above."""
+
+    default = staticmethod(encode_value)
+
+
+class OrjsonProvider(JSONProvider):
+    """app.json backed by orjson; same interface and settings as Flask's."""
+
+    sort_keys = True
+    compact = None
+    mimetype = "application/json"
+
+    def _options(self, indent=False):
+        # non-str keys (e.g. int ids) are allowed, as with the stdlib
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        indent = bool(kwargs.get("indent"))
+        return orjson.dumps(obj, default=encode_value, option=self._options(indent)).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=encode_value, option=self._options(indent))
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
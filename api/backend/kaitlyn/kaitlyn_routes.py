@@ -8,16 +8,47 @@ from flask import (
     url_for,
 )
 import json
-from backend.db_connection import db
+from backend.db_connection import db, tx
+from backend.db_connection import streaming
+from backend.db_connection import pagination
+from backend.cache import cache, idempotency
+from backend.willow.rollups import rollups
+from backend.kaitlyn import review
+from backend.kaitlyn import roster
+from backend.alex_student import registration
+from backend.alex_student import waitlist
 #from backend.simple.playlist import sample_playlist_data
 #from backend.ml_models import model01
 from mysql.connector import Error
 
 kaitlyn = Blueprint("kaitlyn", __name__)
 
+# Sort keys for ?limit=/&cursor= pagination (see pagination.py).
+# Lists joined to studentEmails get one row per email, so the email
+# is the final tie-breaker.
+PENDING_APPLICATION_PAGE_KEYS = [
+    ("a.dateSubmitted", "dateSubmitted"),
+    ("a.applicationID", "applicationID"),
+    ("se.email", "email"),
+]
+EVENT_PAGE_KEYS = [("e.date", "date"), ("e.eventID", "eventID")]
+MEMBER_PAGE_KEYS = [
+    ("s.lastName", "lastName"),
+    ("s.firstName", "firstName"),
+    ("s.studentID", "studentID"),
+    ("se.email", "email"),
+]
+REGISTERED_PAGE_KEYS = [
+    ("s.lastName", "lastName"),
+    ("s.firstName", "firstName"),
+    ("s.studentID", "studentID"),
+    ("se2.email", "email"),
+]
+
 # PUT update application status (approve or deny)
 # Kaitlyn - 7
 @kaitlyn.route("/applications/<int:applicationID>", methods=["PUT"])
+@tx.retrying
 def update_application_status(applicationID):
     current_app.logger.info(f"PUT /applications/{applicationID} handler")
     
@@ -25,63 +56,230 @@ def update_application_status(applicationID):
         data = request.get_json()
         
         # Check if application exists
-        cursor = db.get_db().cursor()
-        cursor.execute("SELECT * FROM application WHERE applicationID = %s", (applicationID,))
-        if not cursor.fetchone():
-            return jsonify({"error": "Application not found"}), 404
+        with tx.transaction() as cursor:
+            cursor.execute("SELECT * FROM application WHERE applicationID = %s", (applicationID,))
+            if not cursor.fetchone():
+                return jsonify({"error": "Application not found"}), 404
         
-        # Build update query
-        update_fields = []
-        params = []
-        allowed_fields = ["status"]  # Can update status to 'Accepted' or 'Rejected'
+            # Build update query
+            update_fields = []
+            params = []
+            allowed_fields = ["status"]  # Can update status to 'Accepted' or 'Rejected'
         
-        for field in allowed_fields:
-            if field in data:
-                update_fields.append(f"{field} = %s")
-                params.append(data[field])
+            for field in allowed_fields:
+                if field in data:
+                    update_fields.append(f"{field} = %s")
+                    params.append(data[field])
         
-        if not update_fields:
-            return jsonify({"error": "No valid fields to update"}), 400
+            if not update_fields:
+                return jsonify({"error": "No valid fields to update"}), 400
         
-        # Validate status value
-        if data.get('status') not in ['Accepted', 'Rejected', 'Pending']:
-            return jsonify({"error": "Invalid status. Must be 'Accepted', 'Rejected', or 'Pending'"}), 400
+            # Validate status value
+            if data.get('status') not in ['Accepted', 'Rejected', 'Pending']:
+                return jsonify({"error": "Invalid status. Must be 'Accepted', 'Rejected', or 'Pending'"}), 400
         
-        params.append(applicationID)
-        query = f"UPDATE application SET {', '.join(update_fields)} WHERE applicationID = %s"
+            params.append(applicationID)
+            query = f"UPDATE application SET {', '.join(update_fields)} WHERE applicationID = %s"
         
-        cursor.execute(query, params)
-        db.get_db().commit()
-        cursor.close()
+            cursor.execute(query, params)
         
         return jsonify({"message": "Application status updated successfully"}), 200
         
     except Error as e:
         return jsonify({"error": str(e)}), 500
 
+# Read {"decisions": [{"applicationID", "status"}, ...]} or
+# {"applicationIDs": [...], "status": ...} into {applicationID: status}.
+# Returns (decisions, None) or (None, error message).
+def parse_decisions(data):
+    if "decisions" in data:
+        decisions = data["decisions"]
+    else:
+        decisions = [
+            {"applicationID": application_id, "status": data.get("status")}
+            for application_id in data.get("applicationIDs") or []
+        ]
+    
+    if not isinstance(decisions, list) or not decisions:
+        return None, "decisions (or applicationIDs and status) are required"
+    
+    if len(decisions) > review.MAX_DECISIONS:
+        return None, f"At most {review.MAX_DECISIONS} decisions can be sent at once"
+    
+    by_id = {}
+    for decision in decisions:
+        if not isinstance(decision, dict) or not isinstance(decision.get("applicationID"), int):
+            return None, "Each decision needs a numeric applicationID"
+        if decision.get("status") not in review.STATUSES:
+            return None, "Invalid status. Must be 'Accepted', 'Rejected', or 'Pending'"
+        by_id[decision["applicationID"]] = decision["status"]
+    return by_id, None
+
+
+# PUT decide many applications at once (a whole review round)
+# Kaitlyn - 7
+# JSON body: {"decisions": [{"applicationID": 4, "status": "Accepted"},
+#                           {"applicationID": 9, "status": "Rejected"}]}
+#        or: {"applicationIDs": [4, 9], "status": "Accepted"}
+# Add "clubID" to only touch that club's applications.
+@kaitlyn.route("/applications", methods=["PUT"])
+@tx.retrying
+def update_application_statuses():
+    current_app.logger.info("PUT /applications handler")
+    
+    try:
+        data = request.get_json() or {}
+        
+        by_id, error = parse_decisions(data)
+        if error:
+            return jsonify({"error": error}), 400
+        
+        counts, missing = review.apply_decisions(db.get_db(), by_id, data.get("clubID"))
+        applied = sum(counts.values())
+        
+        if not applied:
+            return jsonify({"error": "No matching applications found", "missing": missing}), 404
+        
+        return jsonify({
+            "message": "Application statuses updated successfully",
+            "applied": applied,
+            "counts": counts,
+            "missing": missing
+        }), 200
+        
+    except Error as e:
+        return jsonify({"error": str(e)}), 500
+
+# Review queue: reviewers of the same club lease the next pending
+# applications instead of all working from one list (see review.py).
+# Kaitlyn - 7
+
+# GET queue depth (pending / available / leased, leases per reviewer)
+@kaitlyn.route("/clubs/<int:clubID>/review-queue", methods=["GET"])
+def get_review_queue(clubID):
+    current_app.logger.info(f"GET /clubs/{clubID}/review-queue handler")
+    
+    try:
+        return jsonify(review.depth(db.get_db(), clubID)), 200
+        
+    except Error as e:
+        return jsonify({"error": str(e)}), 500
+
+# POST claim the next applications
+# JSON body: {"reviewer": "kaitlyn", "count": 10, "leaseSeconds": 300}
+@kaitlyn.route("/clubs/<int:clubID>/review-queue/claim", methods=["POST"])
+@tx.retrying
+def claim_applications(clubID):
+    current_app.logger.info(f"POST /clubs/{clubID}/review-queue/claim handler")
+    
+    try:
+        data = request.get_json() or {}
+        reviewer = data.get("reviewer")
+        count = data.get("count", review.DEFAULT_CLAIM_COUNT)
+        lease_seconds = data.get("leaseSeconds", review.DEFAULT_LEASE_SECONDS)
+        
+        if not reviewer or not isinstance(reviewer, str):
+            return jsonify({"error": "reviewer is required"}), 400
+        if not isinstance(count, int) or not 1 <= count <= review.MAX_CLAIM_COUNT:
+            return jsonify({"error": f"count must be between 1 and {review.MAX_CLAIM_COUNT}"}), 400
+        if not isinstance(lease_seconds, int) or not 1 <= lease_seconds <= review.MAX_LEASE_SECONDS:
+            return jsonify({"error": f"leaseSeconds must be between 1 and {review.MAX_LEASE_SECONDS}"}), 400
+        
+        claimed = review.claim(db.get_db(), clubID, reviewer[:100], count, lease_seconds)
+        
+        return jsonify({
+            "message": f"{len(claimed)} applications claimed",
+            "leaseSeconds": lease_seconds,
+            "applications": claimed
+        }), 200
+        
+    except Error as e:
+        return jsonify({"error": str(e)}), 500
+
+# POST decide claimed applications (only while the lease is held)
+# JSON body: {"reviewer": "kaitlyn", "decisions": [{"applicationID": 4, "status": "Accepted"}]}
+@kaitlyn.route("/clubs/<int:clubID>/review-queue/decisions", methods=["POST"])
+@tx.retrying
+def decide_claimed_applications(clubID):
+    current_app.logger.info(f"POST /clubs/{clubID}/review-queue/decisions handler")
+    
+    try:
+        data = request.get_json() or {}
+        reviewer = data.get("reviewer")
+        if not reviewer or not isinstance(reviewer, str):
+            return jsonify({"error": "reviewer is required"}), 400
+        
+        by_id, error = parse_decisions(data)
+        if error:
+            return jsonify({"error": error}), 400
+        
+        counts, lost = review.decide(db.get_db(), clubID, reviewer[:100], by_id)
+        applied = sum(counts.values())
+        
+        if not applied:
+            # the lease expired or someone else holds it now
+            return jsonify({"error": "None of these applications are claimed by you", "lost": lost}), 409
+        
+        return jsonify({
+            "message": "Decisions applied",
+            "applied": applied,
+            "counts": counts,
+            "lost": lost
+        }), 200
+        
+    except Error as e:
+        return jsonify({"error": str(e)}), 500
+
+# POST give claimed applications back to the queue
+# JSON body: {"reviewer": "kaitlyn"} or {"reviewer": "kaitlyn", "applicationIDs": [4, 9]}
+@kaitlyn.route("/clubs/<int:clubID>/review-queue/release", methods=["POST"])
+@tx.retrying
+def release_applications(clubID):
+    current_app.logger.info(f"POST /clubs/{clubID}/review-queue/release handler")
+    
+    try:
+        data = request.get_json() or {}
+        reviewer = data.get("reviewer")
+        application_ids = data.get("applicationIDs")
+        
+        if not reviewer or not isinstance(reviewer, str):
+            return jsonify({"error": "reviewer is required"}), 400
+        if application_ids is not None and (
+            not isinstance(application_ids, list)
+            or not all(isinstance(i, int) for i in application_ids)
+        ):
+            return jsonify({"error": "applicationIDs must be a list of numbers"}), 400
+        
+        released = review.release(db.get_db(), clubID, reviewer[:100], application_ids)
+        
+        return jsonify({"message": f"{released} applications released", "released": released}), 200
+        
+    except Error as e:
+        return jsonify({"error": str(e)}), 500
+
 # DELETE remove processed application
 # Kaitlyn - 7
 @kaitlyn.route("/applications/<int:applicationID>", methods=["DELETE"])
+@tx.retrying
 def delete_application(applicationID):
     current_app.logger.info(f"DELETE /applications/{applicationID} handler")
     
     try:
-        cursor = db.get_db().cursor()
-        
-        # Check if application exists
-        cursor.execute("SELECT * FROM application WHERE applicationID = %s", (applicationID,))
-        if not cursor.fetchone():
-            return jsonify({"error": "Application not found"}), 404
-        
-        # Delete the application
-        the_query = '''
-            DELETE FROM application
-            WHERE applicationID = %s
-        '''
-        
-        cursor.execute(the_query, (applicationID,))
-        db.get_db().commit()
-        cursor.close()
+        with tx.transaction() as cursor:
+            # Check if application exists
+            cursor.execute("SELECT * FROM application WHERE applicationID = %s", (applicationID,))
+            application = cursor.fetchone()
+            if not application:
+                return jsonify({"error": "Application not found"}), 404
+        
+            # Delete the application
+            the_query = '''
+                DELETE FROM application
+                WHERE applicationID = %s
+            '''
+        
+            cursor.execute(the_query, (applicationID,))
+        rollups.mark_club(application["clubID"])
         
         return jsonify({"message": "Application deleted successfully"}), 200
         
@@ -94,9 +292,10 @@ def get_interested_students(clubID):
     current_app.logger.info(f"GET /clubs/{clubID}/interested-students handler")
     
     try:
-        cursor = db.get_db().cursor()
+        page = pagination.from_request(PENDING_APPLICATION_PAGE_KEYS)
         the_query = '''
             SELECT
+                a.applicationID,
                 s.firstName,
                 s.lastName,
                 s.major,
@@ -108,29 +307,28 @@ def get_interested_students(clubID):
             LEFT JOIN studentEmails se ON s.studentID = se.studentID
             WHERE a.clubID = %s
                 AND a.status = 'Pending'
-            ORDER BY a.dateSubmitted;
-
         '''
+        the_query += page.where(has_where=True) + page.order_by()
         
-        cursor.execute(the_query, (clubID,))
-        the_data = cursor.fetchall()
-        cursor.close()
+        with tx.cursor() as cursor:
+            cursor.execute(the_query, [clubID] + page.params)
+            the_data = page.trim(cursor.fetchall())
         
         if not the_data:
             return jsonify({"message": "No pending applications found"}), 200
         
-        return jsonify(the_data), 200
+        return jsonify(the_data), 200, page.headers()
         
     except Error as e:
         return jsonify({"error": str(e)}), 500
 
 # GET member details including tier for a specific club
 @kaitlyn.route("/clubs/<int:clubID>/members/<int:memberID>", methods=["GET"])
+@cache.cached(ttl=120, tags=["members:{clubID}"])
 def get_member_details(clubID, memberID):
     current_app.logger.info(f"GET /club/{clubID}/members/{memberID} handler")
     
     try:
-        cursor = db.get_db().cursor()
         the_query = '''
             SELECT 
                 s.studentID,
@@ -150,9 +348,9 @@ def get_member_details(clubID, memberID):
                 AND s.studentID = %s
         '''
         
-        cursor.execute(the_query, (clubID, memberID))
-        the_data = cursor.fetchone()
-        cursor.close()
+        with tx.cursor() as cursor:
+            cursor.execute(the_query, (clubID, memberID))
+            the_data = cursor.fetchone()
         
         if not the_data:
             return jsonify({"error": "Member not found in this club"}), 404
@@ -165,6 +363,8 @@ def get_member_details(clubID, memberID):
 # PUT update member tier (e.g., general to active)
 # Kaitlyn - 5
 @kaitlyn.route("/clubs/<int:clubID>/members/<int:memberID>", methods=["PUT"])
+@cache.invalidates("members:{clubID}")
+@tx.retrying
 def update_member_tier(clubID, memberID):
     current_app.logger.info(f"PUT /club/{clubID}/members/{memberID} handler")
     
@@ -172,47 +372,140 @@ def update_member_tier(clubID, memberID):
         data = request.get_json()
         
         # Check if member exists in this club
-        cursor = db.get_db().cursor()
-        cursor.execute(
-            "SELECT * FROM studentJoins WHERE studentID = %s AND clubID = %s",
-            (memberID, clubID)
-        )
-        if not cursor.fetchone():
-            return jsonify({"error": "Member not found in this club"}), 404
+        with tx.transaction() as cursor:
+            cursor.execute(
+                "SELECT * FROM studentJoins WHERE studentID = %s AND clubID = %s",
+                (memberID, clubID)
+            )
+            if not cursor.fetchone():
+                return jsonify({"error": "Member not found in this club"}), 404
         
-        # Build update query
-        update_fields = []
-        params = []
-        allowed_fields = ["memberType"]
+            # Build update query
+            update_fields = []
+            params = []
+            allowed_fields = ["memberType"]
         
-        for field in allowed_fields:
-            if field in data:
-                update_fields.append(f"{field} = %s")
-                params.append(data[field])
+            for field in allowed_fields:
+                if field in data:
+                    update_fields.append(f"{field} = %s")
+                    params.append(data[field])
         
-        if not update_fields:
-            return jsonify({"error": "No valid fields to update"}), 400
+            if not update_fields:
+                return jsonify({"error": "No valid fields to update"}), 400
         
-        params.extend([memberID, clubID])
-        query = f"UPDATE studentJoins SET {', '.join(update_fields)} WHERE studentID = %s AND clubID = %s"
+            params.extend([memberID, clubID])
+            query = f"UPDATE studentJoins SET {', '.join(update_fields)} WHERE studentID = %s AND clubID = %s"
         
-        cursor.execute(query, params)
-        db.get_db().commit()
-        cursor.close()
+            cursor.execute(query, params)
         
         return jsonify({"message": "Member tier updated successfully"}), 200
         
     except Error as e:
         return jsonify({"error": str(e)}), 500
 
+# PUT change many members' tiers at once (e.g. promote a cohort)
+# Kaitlyn - 5
+# JSON body: {"studentIDs": [3, 8, 12], "memberType": "Active Member"}
+#        or: {"changes": [{"studentID": 3, "memberType": "E-Board"}, ...]}
+@kaitlyn.route("/clubs/<int:clubID>/members", methods=["PUT"])
+@cache.invalidates("members:{clubID}")
+@tx.retrying
+def update_member_tiers(clubID):
+    current_app.logger.info(f"PUT /club/{clubID}/members handler")
+    
+    try:
+        data = request.get_json() or {}
+        
+        if "changes" in data:
+            changes = data["changes"]
+        else:
+            changes = [
+                {"studentID": student_id, "memberType": data.get("memberType")}
+                for student_id in data.get("studentIDs") or []
+            ]
+        
+        if not isinstance(changes, list) or not changes:
+            return jsonify({"error": "changes (or studentIDs and memberType) are required"}), 400
+        
+        by_id = {}
+        for change in changes:
+            if not isinstance(change, dict) or not isinstance(change.get("studentID"), int):
+                return jsonify({"error": "Each change needs a numeric studentID"}), 400
+            member_type = change.get("memberType")
+            if not isinstance(member_type, str) or not member_type.strip() or len(member_type) > 50:
+                return jsonify({"error": "Each change needs a memberType of at most 50 characters"}), 400
+            by_id[change["studentID"]] = member_type.strip()
+        
+        counts, missing = roster.update_tiers(db.get_db(), clubID, by_id)
+        applied = sum(counts.values())
+        
+        if not applied:
+            return jsonify({"error": "None of these students are members of this club", "missing": missing}), 404
+        
+        return jsonify({
+            "message": "Member tiers updated successfully",
+            "applied": applied,
+            "counts": counts,
+            "missing": missing
+        }), 200
+        
+    except roster.NoSuchClub:
+        return jsonify({"error": "Club not found"}), 404
+    except Error as e:
+        return jsonify({"error": str(e)}), 500
+
+# POST import a roster file into the club's members
+# Kaitlyn - 5
+# Body is the file itself, read as it uploads:
+#   CSV (Content-Type: text/csv) with a header row, or
+#   NDJSON (Content-Type: application/x-ndjson), one object per line
+# Columns: studentID (required), memberType, joinDate (YYYY-MM-DD)
+# ?mode=replace also removes members who are not in the file.
+# Example: curl -X POST -H "Content-Type: text/csv" --data-binary @roster.csv \
+#            "http://localhost:4000/eboardmember/clubs/1/members/import"
+@kaitlyn.route("/clubs/<int:clubID>/members/import", methods=["POST"])
+@cache.invalidates("members:{clubID}", "demographics", "clubs")
+def import_members(clubID):
+    current_app.logger.info(f"POST /club/{clubID}/members/import handler")
+    
+    try:
+        fmt = request.args.get("format")
+        if not fmt:
+            content_type = request.mimetype or ""
+            fmt = "ndjson" if "ndjson" in content_type or "jsonl" in content_type else "csv"
+        if fmt not in roster.FORMATS:
+            return jsonify({"error": "format must be csv or ndjson"}), 400
+        
+        mode = request.args.get("mode", "merge")
+        if mode not in ("merge", "replace"):
+            return jsonify({"error": "mode must be merge or replace"}), 400
+        
+        rows = roster.read_rows(request.stream, fmt)
+        result = roster.import_roster(db.get_db(), clubID, rows, replace=(mode == "replace"))
+        
+        # numMembers feeds the analytics rollups
+        rollups.mark_club(clubID)
+        
+        response = result.to_dict()
+        response["message"] = f"Imported {result.upserted} members"
+        return jsonify(response), 200
+        
+    except roster.NoSuchClub:
+        return jsonify({"error": "Club not found"}), 404
+    except UnicodeDecodeError:
+        return jsonify({"error": "Roster must be UTF-8 text"}), 400
+    except Error as e:
+        return jsonify({"error": str(e)}), 500
+
 # GET events the club is hosting
 # Kaitlyn - 6
 @kaitlyn.route("/clubs/<int:clubID>/events", methods=["GET"])
+@cache.cached(ttl=60, tags=["events"])
 def get_club_events(clubID):
     current_app.logger.info(f"GET /club/{clubID}/events handler")
     
     try:
-        cursor = db.get_db().cursor()
+        page = pagination.from_request(EVENT_PAGE_KEYS)
         the_query = '''
             SELECT
                 e.eventID,
@@ -227,23 +520,25 @@ def get_club_events(clubID):
                 e.isFull,
                 e.isArchived,
                 e.tierRequirement,
-                e.capacity - e.numRegistered AS spotsRemaining
+                {held} AS numHeld,
+                e.capacity - e.numRegistered - {held} AS spotsRemaining
             FROM event e
             JOIN clubEvents ce ON e.eventID = ce.eventID
             WHERE ce.clubID = %s
                 AND e.date >= CURDATE()
                 AND e.isArchived = 0
-            ORDER BY e.date
         '''
+        the_query += page.where(has_where=True) + page.order_by()
         
-        cursor.execute(the_query, (clubID,))
-        the_data = cursor.fetchall()
-        cursor.close()
+        with tx.cursor() as cursor:
+            # seats under a hold are not free (see alex_student/holds.py)
+            registration.execute_hold_aware(cursor, the_query, [clubID] + page.params, column="e.numHeld")
+            the_data = page.trim(cursor.fetchall())
         
         if not the_data:
             return jsonify({"message": "No upcoming events found"}), 200
         
-        return jsonify(the_data), 200
+        return jsonify(the_data), 200, page.headers()
         
     except Error as e:
         return jsonify({"error": str(e)}), 500
@@ -251,6 +546,9 @@ def get_club_events(clubID):
 # POST create new event on club page
 # Kaitlyn - 8
 @kaitlyn.route("/clubs/<int:clubID>/events", methods=["POST"])
+@idempotency.keyed
+@cache.invalidates("events")
+@tx.retrying
 def create_club_event(clubID):
     current_app.logger.info(f"POST /club/{clubID}/events handler")
     
@@ -263,8 +561,6 @@ def create_club_event(clubID):
             if field not in data:
                 return jsonify({"error": f"Missing required field: {field}"}), 400
         
-        cursor = db.get_db().cursor()
-        
         # Insert new event
         event_query = '''
             INSERT INTO `event` 
@@ -276,30 +572,29 @@ def create_club_event(clubID):
         # Set default tier requirement if not provided
         tier_requirement = data.get('tierRequirement', 'Open')
         
-        cursor.execute(event_query, (
-            data['name'],
-            data['date'],
-            data['startTime'],
-            data['endTime'],
-            data['location'],
-            data['description'],
-            data['capacity'],
-            tier_requirement
-        ))
-        
-        # Get the newly created eventID
-        new_event_id = cursor.lastrowid
-        
-        # Link event to club in clubEvents table
-        club_event_query = '''
-            INSERT INTO clubEvents (clubID, eventID)
-            VALUES (%s, %s)
-        '''
-        
-        cursor.execute(club_event_query, (clubID, new_event_id))
-        
-        db.get_db().commit()
-        cursor.close()
+        with tx.transaction() as cursor:
+            cursor.execute(event_query, (
+                data['name'],
+                data['date'],
+                data['startTime'],
+                data['endTime'],
+                data['location'],
+                data['description'],
+                data['capacity'],
+                tier_requirement
+            ))
+        
+            # Get the newly created eventID
+            new_event_id = cursor.lastrowid
+        
+            # Link event to club in clubEvents table
+            club_event_query = '''
+                INSERT INTO clubEvents (clubID, eventID)
+                VALUES (%s, %s)
+            '''
+        
+            cursor.execute(club_event_query, (clubID, new_event_id))
+        rollups.mark_event(new_event_id)
         
         return jsonify({
             "message": "Event created successfully",
@@ -317,7 +612,7 @@ def get_club_applications(clubID):
     current_app.logger.info(f"GET /clubs/{clubID}/applications handler")
     
     try:
-        cursor = db.get_db().cursor()
+        page = pagination.from_request(PENDING_APPLICATION_PAGE_KEYS)
         the_query = '''
             SELECT
                 a.applicationID,
@@ -334,28 +629,29 @@ def get_club_applications(clubID):
             LEFT JOIN studentEmails se ON s.studentID = se.studentID
             WHERE a.clubID = %s
                 AND a.status = 'Pending'
-            ORDER BY a.dateSubmitted
         '''
+        the_query += page.where(has_where=True) + page.order_by()
         
-        cursor.execute(the_query, (clubID,))
-        the_data = cursor.fetchall()
-        cursor.close()
+        with tx.cursor() as cursor:
+            cursor.execute(the_query, [clubID] + page.params)
+            the_data = page.trim(cursor.fetchall())
         
         if not the_data:
             return jsonify({"message": "No pending applications found"}), 200
         
-        return jsonify(the_data), 200
+        return jsonify(the_data), 200, page.headers()
         
     except Error as e:
         return jsonify({"error": str(e)}), 500
 
 # GET all members of a specific club
 @kaitlyn.route("/clubs/<int:clubID>/members", methods=["GET"])
+@cache.cached(ttl=120, tags=["members:{clubID}"])
 def get_club_members(clubID):
     current_app.logger.info(f"GET /clubs/{clubID}/members handler")
     
     try:
-        cursor = db.get_db().cursor()
+        page = pagination.from_request(MEMBER_PAGE_KEYS)
         the_query = '''
             SELECT 
                 s.studentID,
@@ -370,17 +666,24 @@ def get_club_members(clubID):
             JOIN studentJoins sj ON s.studentID = sj.studentID
             LEFT JOIN studentEmails se ON s.studentID = se.studentID
             WHERE sj.clubID = %s
-            ORDER BY s.lastName, s.firstName
         '''
+        the_query += page.where(has_where=True) + page.order_by()
+        params = [clubID] + page.params
         
-        cursor.execute(the_query, (clubID,))
-        the_data = cursor.fetchall()
-        cursor.close()
+        # ?stream=json or ?stream=ndjson sends rows as they are read
+        # (an empty club streams [] rather than the "No members" message)
+        stream_format = streaming.requested()
+        if stream_format:
+            return streaming.stream_query(the_query, params, fmt=stream_format)
+        
+        with tx.cursor() as cursor:
+            cursor.execute(the_query, params)
+            the_data = page.trim(cursor.fetchall())
         
         if not the_data:
             return jsonify({"message": "No members found"}), 200
         
-        return jsonify(the_data), 200
+        return jsonify(the_data), 200, page.headers()
         
     except Error as e:
         return jsonify({"error": str(e)}), 500
@@ -391,9 +694,10 @@ def get_registered_students(eventID):
     current_app.logger.info(f"GET /events/{eventID}/registered-students handler")
     
     try:
-        cursor = db.get_db().cursor()
+        page = pagination.from_request(REGISTERED_PAGE_KEYS)
         the_query = '''
             SELECT
+                s.studentID,
                 s.firstName,
                 s.lastName,
                 se2.email
@@ -401,28 +705,28 @@ def get_registered_students(eventID):
             JOIN student s ON se.studentID = s.studentID
             JOIN studentEmails se2 ON s.studentID = se2.studentID
             WHERE se.eventID = %s
-            ORDER BY s.lastName, s.firstName
         '''
+        the_query += page.where(has_where=True) + page.order_by()
         
-        cursor.execute(the_query, (eventID,))
-        the_data = cursor.fetchall()
-        cursor.close()
+        with tx.cursor() as cursor:
+            cursor.execute(the_query, [eventID] + page.params)
+            the_data = page.trim(cursor.fetchall())
         
         if not the_data:
             return jsonify({"message": "No registered students found"}), 200
         
-        return jsonify(the_data), 200
+        return jsonify(the_data), 200, page.headers()
         
     except Error as e:
         return jsonify({"error": str(e)}), 500
     
 # GET event details including capacity
 @kaitlyn.route("/events/<int:eventID>", methods=["GET"])
+@cache.cached(ttl=60, tags=["event:{eventID}"])
 def get_event_details(eventID):
     current_app.logger.info(f"GET /events/{eventID} handler")
     
     try:
-        cursor = db.get_db().cursor()
         the_query = '''
             SELECT 
                 eventID,
@@ -436,14 +740,15 @@ def get_event_details(eventID):
                 numRegistered,
                 isFull,
                 isArchived,
-                tierRequirement
+                tierRequirement,
+                {held} AS numHeld
             FROM event
             WHERE eventID = %s
         '''
         
-        cursor.execute(the_query, (eventID,))
-        the_data = cursor.fetchone()
-        cursor.close()
+        with tx.cursor() as cursor:
+            registration.execute_hold_aware(cursor, the_query, (eventID,))
+            the_data = cursor.fetchone()
         
         if not the_data:
             return jsonify({"error": "Event not found"}), 404
@@ -455,6 +760,8 @@ def get_event_details(eventID):
 
 # PUT update event (mark as full, set tier restrictions)
 @kaitlyn.route("/events/<int:eventID>", methods=["PUT"])
+@cache.invalidates("events", "event:{eventID}")
+@tx.retrying
 def update_event(eventID):
     current_app.logger.info(f"PUT /events/{eventID} handler")
     
@@ -462,54 +769,62 @@ def update_event(eventID):
         data = request.get_json()
         
         # Check if event exists
-        cursor = db.get_db().cursor()
-        cursor.execute("SELECT * FROM `event` WHERE eventID = %s", (eventID,))
-        if not cursor.fetchone():
-            return jsonify({"error": "Event not found"}), 404
-        
-        update_fields = []
-        params = []
-        allowed_fields = ["isFull", "tierRequirement", "capacity", "numRegistered", "location", "date", "startTime", "endTime"]
+        with tx.transaction() as cursor:
+            cursor.execute("SELECT * FROM `event` WHERE eventID = %s", (eventID,))
+            if not cursor.fetchone():
+                return jsonify({"error": "Event not found"}), 404
         
-        for field in allowed_fields:
-            if field in data:
-                update_fields.append(f"{field} = %s")
-                params.append(data[field])
+            update_fields = []
+            params = []
+            allowed_fields = ["isFull", "tierRequirement", "capacity", "numRegistered", "location", "date", "startTime", "endTime"]
         
-        if not update_fields:
-            return jsonify({"error": "No valid fields to update"}), 400
+            for field in allowed_fields:
+                if field in data:
+                    update_fields.append(f"{field} = %s")
+                    params.append(data[field])
         
-        params.append(eventID)
-        query = f"UPDATE `event` SET {', '.join(update_fields)} WHERE eventID = %s"
+            if not update_fields:
+                return jsonify({"error": "No valid fields to update"}), 400
         
-        cursor.execute(query, params)
-        db.get_db().commit()
-        cursor.close()
+            params.append(eventID)
+            query = f"UPDATE `event` SET {', '.join(update_fields)} WHERE eventID = %s"
         
-        return jsonify({"message": "Event updated successfully"}), 200
+            cursor.execute(query, params)
+
+            # more room (or fewer registrations) lets the waitlist move up,
+            # in the same transaction as the edit; a new capacity also
+            # decides isFull unless it was set explicitly
+            promoted = []
+            if {"capacity", "numRegistered", "isFull"} & set(data):
+                promoted = waitlist.promote_if_migrated(
+                    cursor, eventID, recompute_full="capacity" in data and "isFull" not in data
+                )
+        rollups.mark_event(eventID)
+        
+        return jsonify({"message": "Event updated successfully", "promotedFromWaitlist": promoted}), 200
         
     except Error as e:
         return jsonify({"error": str(e)}), 500
     
 # DELETE archive/remove past events
 @kaitlyn.route("/events/<int:eventID>", methods=["DELETE"])
+@cache.invalidates("events", "event:{eventID}")
+@tx.retrying
 def archive_event(eventID):
     current_app.logger.info(f"DELETE /events/{eventID} handler")
     
     try:
-        cursor = db.get_db().cursor()
-        
         the_query = '''
             UPDATE `event`
             SET isArchived = 1
             WHERE eventID = %s
         '''
         
-        cursor.execute(the_query, (eventID,))
-        db.get_db().commit()
-        cursor.close()
+        with tx.transaction() as cursor:
+            cursor.execute(the_query, (eventID,))
+            archived = cursor.rowcount
         
-        if cursor.rowcount == 0:
+        if archived == 0:
             return jsonify({"error": "Event not found"}), 404
         
         return jsonify({"message": "Event archived successfully"}), 200
@@ -0,0 +1,235 @@
+#------------------------------------------------------------
+# Application review helpers used by the kaitlyn routes.
+#
+# apply_decisions() records a whole review round (many
+# applicationIDs, each Accepted / Rejected / Pending) with one
+# locking SELECT to find which applications exist and one UPDATE
+# per distinct status, all in a single transaction.  The review
+# queue further down builds on the same pattern.
+#------------------------------------------------------------
+import threading
+import time
+
+from backend.db_connection import tx
+
+STATUSES = ("Accepted", "Rejected", "Pending")
+
+# most decisions accepted in one request
+MAX_DECISIONS = 1000
+
+
+def _placeholders(values):
+    return ", ".join(["%s"] * len(values))
+
+
+def apply_decisions(conn, decisions, club_id=None):
+    """
+    decisions maps applicationID -> status (already validated).
+    When club_id is given, applications of other clubs count as
+    missing.  Commits and returns (counts per status, missing ids).
+    """
+    ids = sorted(decisions)
+    with tx.transaction(conn) as cursor:
+        # lock the rows we are about to change so a concurrent round
+        # cannot interleave with this one
+        query = f"SELECT applicationID FROM application WHERE applicationID IN ({_placeholders(ids)})"
+        params = list(ids)
+        if club_id is not None:
+            query += " AND clubID = %s"
+            params.append(club_id)
+        cursor.execute(query + " FOR UPDATE", params)
+        found = {row["applicationID"] for row in cursor.fetchall()}
+
+        by_status = {}
+        for application_id in ids:
+            if application_id in found:
+                by_status.setdefault(decisions[application_id], []).append(application_id)
+
+        for status, status_ids in by_status.items():
+            cursor.execute(
+                f"UPDATE application SET status = %s WHERE applicationID IN ({_placeholders(status_ids)})",
+                [status] + status_ids,
+            )
+
+    counts = {status: len(status_ids) for status, status_ids in by_status.items()}
+    missing = [application_id for application_id in ids if application_id not in found]
+    return counts, missing
+
+
+#------------------------------------------------------------
+# Claim-based review queue.
+#
+# Reviewers of the same club lease the next N pending applications
+# instead of all working from the same list.  The claim picks rows
+# with SELECT ... FOR UPDATE SKIP LOCKED, so two reviewers claiming
+# at the same moment never wait on each other or get the same row,
+# and stamps them with claimedBy / claimExpiresAt (migration 0004)
+# so the lease outlives the request.  A decision is only applied
+# while the reviewer still holds the lease, so an application can
+# not be decided twice; expired leases simply return to the queue.
+#------------------------------------------------------------
+DEFAULT_CLAIM_COUNT = 10
+MAX_CLAIM_COUNT = 100
+DEFAULT_LEASE_SECONDS = 300
+MAX_LEASE_SECONDS = 3600
+
+# a row is claimable when it is pending and nobody holds a live lease
+CLAIMABLE = "status = 'Pending' AND (claimExpiresAt IS NULL OR claimExpiresAt < NOW())"
+
+CLAIM_QUERY = f"""
+    SELECT applicationID FROM application
+    WHERE clubID = %s AND {CLAIMABLE}
+    ORDER BY dateSubmitted, applicationID
+    LIMIT %s
+    FOR UPDATE SKIP LOCKED
+"""
+
+CLAIMED_DETAILS_QUERY = """
+    SELECT a.applicationID, a.dateSubmitted, a.status, a.claimExpiresAt,
+           s.studentID, s.firstName, s.lastName, s.major, s.gradYear
+    FROM application a
+    JOIN student s ON a.studentID = s.studentID
+    WHERE a.applicationID IN ({ids})
+    ORDER BY a.dateSubmitted, a.applicationID
+"""
+
+QUEUE_DEPTH_QUERY = """
+    SELECT COUNT(*) AS pending,
+           COALESCE(SUM(claimExpiresAt IS NULL OR claimExpiresAt < NOW()), 0) AS available,
+           COALESCE(SUM(claimExpiresAt >= NOW()), 0) AS leased,
+           COALESCE(SUM(claimedBy IS NOT NULL AND claimExpiresAt < NOW()), 0) AS expiredLeases,
+           MIN(dateSubmitted) AS oldestSubmitted
+    FROM application
+    WHERE clubID = %s AND status = 'Pending'
+"""
+
+QUEUE_REVIEWERS_QUERY = """
+    SELECT claimedBy AS reviewer, COUNT(*) AS leased, MIN(claimExpiresAt) AS nextExpiry
+    FROM application
+    WHERE clubID = %s AND status = 'Pending' AND claimExpiresAt >= NOW()
+    GROUP BY claimedBy
+    ORDER BY claimedBy
+"""
+
+_metrics_lock = threading.Lock()
+_metrics = {
+    "claims": 0,
+    "empty_claims": 0,
+    "claimed": 0,
+    "claim_time_total": 0.0,
+    "decisions_applied": 0,
+    "decisions_lost": 0,
+    "released": 0,
+}
+
+
+def _count(**increments):
+    with _metrics_lock:
+        for name, value in increments.items():
+            _metrics[name] += value
+
+
+def metrics():
+    """Process-wide review queue counters (see /ops/review-queue)."""
+    with _metrics_lock:
+        counters = dict(_metrics)
+    claims = counters["claims"]
+    counters["claim_time_avg"] = counters["claim_time_total"] / claims if claims else 0.0
+    return counters
+
+
+def claim(conn, club_id, reviewer, count, lease_seconds):
+    """
+    Lease up to count claimable applications of a club to reviewer
+    and commit.  Returns the claimed applications with student details.
+    """
+    started = time.perf_counter()
+    # commit right away: the row locks are only held for the claim itself
+    with tx.transaction(conn) as cursor:
+        cursor.execute(CLAIM_QUERY, (club_id, count))
+        ids = [row["applicationID"] for row in cursor.fetchall()]
+        if ids:
+            cursor.execute(
+                f"UPDATE application SET claimedBy = %s, "
+                f"claimExpiresAt = NOW() + INTERVAL %s SECOND "
+                f"WHERE applicationID IN ({_placeholders(ids)})",
+                [reviewer, lease_seconds] + ids,
+            )
+
+    rows = []
+    if ids:
+        with tx.cursor(conn) as cursor:
+            cursor.execute(CLAIMED_DETAILS_QUERY.format(ids=_placeholders(ids)), ids)
+            rows = cursor.fetchall()
+
+    _count(
+        claims=1,
+        empty_claims=0 if ids else 1,
+        claimed=len(ids),
+        claim_time_total=time.perf_counter() - started,
+    )
+    return rows
+
+
+def decide(conn, club_id, reviewer, decisions):
+    """
+    Apply decisions ({applicationID: status}) for applications the
+    reviewer still holds a live lease on, clearing the lease, and
+    commit.  Returns (counts per status, ids whose lease was lost).
+    """
+    ids = sorted(decisions)
+    with tx.transaction(conn) as cursor:
+        cursor.execute(
+            f"SELECT applicationID FROM application "
+            f"WHERE applicationID IN ({_placeholders(ids)}) AND clubID = %s "
+            f"AND status = 'Pending' AND claimedBy = %s AND claimExpiresAt >= NOW() "
+            f"FOR UPDATE",
+            ids + [club_id, reviewer],
+        )
+        held = {row["applicationID"] for row in cursor.fetchall()}
+
+        by_status = {}
+        for application_id in ids:
+            if application_id in held:
+                by_status.setdefault(decisions[application_id], []).append(application_id)
+
+        for status, status_ids in by_status.items():
+            cursor.execute(
+                f"UPDATE application SET status = %s, claimedBy = NULL, claimExpiresAt = NULL "
+                f"WHERE applicationID IN ({_placeholders(status_ids)})",
+                [status] + status_ids,
+            )
+
+    counts = {status: len(status_ids) for status, status_ids in by_status.items()}
+    lost = [application_id for application_id in ids if application_id not in held]
+    _count(decisions_applied=sum(counts.values()), decisions_lost=len(lost))
+    return counts, lost
+
+
+def release(conn, club_id, reviewer, application_ids=None):
+    """Give back the reviewer's leases (all of them, or just these) and commit."""
+    query = (
+        "UPDATE application SET claimedBy = NULL, claimExpiresAt = NULL "
+        "WHERE clubID = %s AND claimedBy = %s AND status = 'Pending'"
+    )
+    params = [club_id, reviewer]
+    if application_ids:
+        query += f" AND applicationID IN ({_placeholders(application_ids)})"
+        params += list(application_ids)
+    with tx.transaction(conn) as cursor:
+        cursor.execute(query, params)
+        released = cursor.rowcount
+    _count(released=released)
+    return released
+
+
+def depth(conn, club_id):
+    """Queue depth for one club: pending, available, leased and per-reviewer leases."""
+    with tx.cursor(conn) as cursor:
+        cursor.execute(QUEUE_DEPTH_QUERY, (club_id,))
+        summary = cursor.fetchone()
+        cursor.execute(QUEUE_REVIEWERS_QUERY, (club_id,))
+        summary["reviewers"] = cursor.fetchall()
+    for name in ("pending", "available", "leased", "expiredLeases"):
+        summary[name] = int(summary[name] or 0)
+    return summary
@@ -0,0 +1,249 @@
+#------------------------------------------------------------
+# Bulk membership changes for a club (studentJoins).
+#
+# update_tiers() changes memberType for many members with one
+# UPDATE per distinct tier.  import_roster() reads an uploaded
+# roster (CSV or NDJSON) row by row straight from the request
+# stream, so a large file is never held in memory, and writes it in
+# batches: one IN (...) query validates a batch's student IDs and
+# one multi-row INSERT ... ON DUPLICATE KEY UPDATE upserts it.
+#
+# Everything happens in one transaction that starts by locking the
+# club row, and club.numMembers is recomputed from studentJoins
+# before the commit, so the counter always matches the roster.
+#------------------------------------------------------------
+import csv
+import io
+import json
+from datetime import date
+
+from backend.db_connection import tx
+
+# rows validated / upserted per statement
+BATCH_ROWS = 500
+
+# most row errors reported back (the rest are only counted)
+MAX_REPORTED_ERRORS = 100
+
+DEFAULT_MEMBER_TYPE = "General Member"
+
+FORMATS = ("csv", "ndjson")
+
+LOCK_CLUB = "SELECT clubID FROM club WHERE clubID = %s FOR UPDATE"
+
+RECOUNT_MEMBERS = """
+    UPDATE club
+    SET numMembers = (SELECT COUNT(*) FROM studentJoins WHERE clubID = %s)
+    WHERE clubID = %s
+"""
+
+UPSERT_MEMBERS = """
+    INSERT INTO studentJoins (studentID, clubID, joinDate, memberType)
+    VALUES {rows} AS incoming
+    ON DUPLICATE KEY UPDATE memberType = incoming.memberType
+"""
+
+
+class NoSuchClub(Exception):
+    pass
+
+
+def _placeholders(values):
+    return ", ".join(["%s"] * len(values))
+
+
+def _chunks(values, size=BATCH_ROWS):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _lock_club(cursor, club_id):
+    cursor.execute(LOCK_CLUB, (club_id,))
+    if not cursor.fetchone():
+        raise NoSuchClub(club_id)
+
+
+def _recount(cursor, club_id):
+    cursor.execute(RECOUNT_MEMBERS, (club_id, club_id))
+    cursor.execute("SELECT numMembers FROM club WHERE clubID = %s", (club_id,))
+    return cursor.fetchone()["numMembers"]
+
+
+# ------------------------------------------------------------
+# bulk tier update
+
+def update_tiers(conn, club_id, changes):
+    """
+    changes maps studentID -> memberType.  Students who are not
+    members of the club are reported as missing.  Commits and returns
+    (counts per memberType, missing studentIDs).
+    """
+    with tx.transaction(conn) as cursor:
+        _lock_club(cursor, club_id)
+        members = set()
+        for chunk in _chunks(sorted(changes)):
+            cursor.execute(
+                f"SELECT studentID FROM studentJoins "
+                f"WHERE clubID = %s AND studentID IN ({_placeholders(chunk)}) FOR UPDATE",
+                [club_id] + chunk,
+            )
+            members.update(row["studentID"] for row in cursor.fetchall())
+
+        by_tier = {}
+        for student_id in sorted(members):
+            by_tier.setdefault(changes[student_id], []).append(student_id)
+        for tier, student_ids in by_tier.items():
+            for chunk in _chunks(student_ids):
+                cursor.execute(
+                    f"UPDATE studentJoins SET memberType = %s "
+                    f"WHERE clubID = %s AND studentID IN ({_placeholders(chunk)})",
+                    [tier, club_id] + chunk,
+                )
+
+    counts = {tier: len(student_ids) for tier, student_ids in by_tier.items()}
+    missing = [student_id for student_id in sorted(changes) if student_id not in members]
+    return counts, missing
+
+
+# ------------------------------------------------------------
+# roster import
+
+def read_rows(stream, fmt):
+    """
+    Yield (line number, dict) for each roster row in a binary stream.
+    Blank lines are skipped; unparseable NDJSON lines yield a string
+    error instead of a dict.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            if any((value or "").strip() for value in row.values()):
+                yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_number, "line is not valid JSON"
+            continue
+        yield line_number, row if isinstance(row, dict) else "line is not a JSON object"
+
+
+def _check_row(row):
+    # returns (studentID, joinDate, memberType) or an error message
+    if isinstance(row, str):
+        return row
+    try:
+        student_id = int(str(row.get("studentID", "")).strip())
+    except ValueError:
+        return "studentID is missing or not a number"
+    member_type = str(row.get("memberType") or DEFAULT_MEMBER_TYPE).strip()
+    if len(member_type) > 50:
+        return "memberType is longer than 50 characters"
+    join_date = row.get("joinDate")
+    try:
+        join_date = date.fromisoformat(str(join_date).strip()) if join_date else date.today()
+    except ValueError:
+        return "joinDate must be a YYYY-MM-DD date"
+    return student_id, join_date, member_type
+
+
+class ImportResult:
+
+    def __init__(self):
+        self.processed = 0
+        self.upserted = 0
+        self.removed = 0
+        self.rejected = 0
+        self.errors = []
+        self.num_members = None
+
+    def reject(self, line, error):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": error})
+
+    def to_dict(self):
+        return {
+            "processed": self.processed,
+            "upserted": self.upserted,
+            "removed": self.removed,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "numMembers": self.num_members,
+        }
+
+
+def _write_batch(cursor, club_id, batch, result, seen):
+    # batch: [(line, studentID, joinDate, memberType)]
+    student_ids = sorted({student_id for _, student_id, _, _ in batch})
+    cursor.execute(
+        f"SELECT studentID FROM student WHERE studentID IN ({_placeholders(student_ids)})",
+        student_ids,
+    )
+    known = {row["studentID"] for row in cursor.fetchall()}
+
+    # a student listed twice keeps the last row
+    rows = {}
+    for line, student_id, join_date, member_type in batch:
+        if student_id not in known:
+            result.reject(line, f"Student ID {student_id} does not exist")
+        else:
+            rows[student_id] = (student_id, club_id, join_date, member_type)
+    if not rows:
+        return
+
+    cursor.execute(
+        UPSERT_MEMBERS.format(rows=", ".join(["(%s, %s, %s, %s)"] * len(rows))),
+        [value for row in rows.values() for value in row],
+    )
+    result.upserted += len(rows)
+    seen.update(rows)
+
+
+def _remove_unlisted(cursor, club_id, seen):
+    cursor.execute("SELECT studentID FROM studentJoins WHERE clubID = %s FOR UPDATE", (club_id,))
+    unlisted = sorted(row["studentID"] for row in cursor.fetchall() if row["studentID"] not in seen)
+    for chunk in _chunks(unlisted):
+        cursor.execute(
+            f"DELETE FROM studentJoins WHERE clubID = %s AND studentID IN ({_placeholders(chunk)})",
+            [club_id] + chunk,
+        )
+    return len(unlisted)
+
+
+def import_roster(conn, club_id, rows, replace=False):
+    """
+    Upsert roster rows ((line, dict) pairs from read_rows) into the
+    club's studentJoins in one transaction.  With replace=True,
+    members missing from the roster are removed.  Existing members
+    keep their joinDate; their memberType is updated.  Returns an
+    ImportResult; raises NoSuchClub if the club does not exist.
+    """
+    result = ImportResult()
+    seen = set()
+    with tx.transaction(conn) as cursor:
+        _lock_club(cursor, club_id)
+        batch = []
+        for line, row in rows:
+            result.processed += 1
+            checked = _check_row(row)
+            if isinstance(checked, str):
+                result.reject(line, checked)
+                continue
+            batch.append((line,) + checked)
+            if len(batch) >= BATCH_ROWS:
+                _write_batch(cursor, club_id, batch, result, seen)
+                batch = []
+        if batch:
+            _write_batch(cursor, club_id, batch, result, seen)
+
+        if replace:
+            result.removed = _remove_unlisted(cursor, club_id, seen)
+        result.num_members = _recount(cursor, club_id)
+    return result
@@ -0,0 +1,14 @@
+#------------------------------------------------------------
+# This file creates the shared request metrics
+#------------------------------------------------------------
+from backend.metrics.query_budget import QueryBudget
+from backend.metrics.request_metrics import RequestMetrics
+
+
+# Per-route counts, latency and DB time, served at GET /metrics
+# (Prometheus text format) - see request_metrics.py
+metrics = RequestMetrics()
+
+# Statement / round trip / row counts per request, Server-Timing
+# headers and route query budgets - see query_budget.py
+query_budget = QueryBudget()
@@ -0,0 +1,183 @@
+#------------------------------------------------------------
+# Per-request query accounting and budgets.
+#
+# The timed cursors and connections (db_connection/instrumented.py)
+# count, for the current request, the SQL statements executed, the
+# round trips to MySQL (statements plus COMMIT / ROLLBACK / ping),
+# the rows returned and the time spent waiting on them.  This hook:
+#
+#   - adds a Server-Timing header to every response, so the browser
+#     dev tools (or curl -i) show where the time went:
+#         Server-Timing: db;dur=4.1;desc="3 statements, 4 round trips, 12 rows",
+#                        app;dur=1.3, total;dur=5.4
+#   - checks the numbers against the route's budget, declared with
+#     @query_budget.limit(statements=..., round_trips=..., rows=...,
+#     db_ms=...) under the route decorator, or the QUERY_BUDGET_*
+#     defaults, and logs a warning when a request goes over;
+#   - warns when one statement (by slow-query fingerprint) runs more
+#     than QUERY_REPEAT_LIMIT times in a request - the usual shape
+#     of an N+1 loop;
+#   - with QUERY_BUDGET_STRICT on (for tests), replaces the response
+#     of a route that went over its declared budget with a 500, so a
+#     regression fails the test that exercised it.  Changes the route
+#     already committed stay committed.
+#------------------------------------------------------------
+import logging
+import threading
+import time
+
+from flask import current_app, g, has_request_context, jsonify, request
+
+from backend.db_connection.instrumented import add_listener, request_stats
+from backend.db_connection.slow_queries import fingerprint
+
+LIMITS = ("statements", "round_trips", "rows", "db_ms")
+
+
+class QueryBudget:
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.enabled = True
+        self.server_timing = True
+        self.strict = False
+        self.defaults = {"statements": 25, "db_ms": 1000}
+        self.repeat_limit = 10
+        self._lock = threading.Lock()
+        self._counters = {"over_budget": 0, "strict_failures": 0, "repeated_statements": 0}
+        self._over_by_route = {}
+
+    def init_app(self, app):
+        app.config.setdefault("QUERY_BUDGET_ENABLED", True)
+        app.config.setdefault("SERVER_TIMING_ENABLED", True)
+        app.config.setdefault("QUERY_BUDGET_STRICT", False)
+        app.config.setdefault("QUERY_BUDGET_STATEMENTS", self.defaults["statements"])
+        app.config.setdefault("QUERY_BUDGET_DB_MS", self.defaults["db_ms"])
+        app.config.setdefault("QUERY_REPEAT_LIMIT", self.repeat_limit)
+        self.enabled = app.config["QUERY_BUDGET_ENABLED"]
+        self.server_timing = app.config["SERVER_TIMING_ENABLED"]
+        self.strict = app.config["QUERY_BUDGET_STRICT"]
+        self.defaults = {
+            "statements": app.config["QUERY_BUDGET_STATEMENTS"],
+            "db_ms": app.config["QUERY_BUDGET_DB_MS"],
+        }
+        self.repeat_limit = app.config["QUERY_REPEAT_LIMIT"]
+        self.logger = app.logger
+        if not (self.enabled or self.server_timing):
+            return
+        add_listener(self._count_statement)
+        app.before_request(self._start)
+        app.after_request(self.after_request)
+
+    # ------------------------------------------------------------
+    # declaring budgets
+
+    def limit(self, **budget):
+        """
+        Declare a route's query budget:
+
+            @students.route("/events", methods=["POST"])
+            @query_budget.limit(statements=6, round_trips=8)
+            def register_for_event(): ...
+        """
+        unknown = set(budget) - set(LIMITS)
+        if unknown:
+            raise ValueError(f"unknown query budget limit(s): {', '.join(sorted(unknown))}")
+
+        def decorator(view):
+            # kept through functools.wraps by the decorators above it
+            view.query_budget = budget
+            return view
+        return decorator
+
+    # ------------------------------------------------------------
+    # request hooks
+
+    @staticmethod
+    def _start():
+        g._budget_started = time.perf_counter()
+
+    def _count_statement(self, query, args, seconds, rows):
+        if not (self.enabled and has_request_context() and "_budget_started" in g):
+            return
+        counts = g.get("_statement_counts")
+        if counts is None:
+            counts = g._statement_counts = {}
+        if isinstance(query, bytes):
+            query = query.decode("utf-8", "replace")
+        key = fingerprint(query)
+        counts[key] = counts.get(key, 0) + 1
+
+    def after_request(self, response):
+        started = g.pop("_budget_started", None)
+        if started is None:
+            return response
+        total_ms = (time.perf_counter() - started) * 1000
+        stats = request_stats()
+        used = {
+            "statements": stats.statements,
+            "round_trips": stats.round_trips,
+            "rows": stats.rows,
+            "db_ms": round(stats.db_time * 1000, 3),
+        }
+
+        if self.server_timing:
+            response.headers["Server-Timing"] = (
+                f'db;dur={used["db_ms"]:.1f};desc="{used["statements"]} statements, '
+                f'{used["round_trips"]} round trips, {used["rows"]} rows", '
+                f"app;dur={max(total_ms - used['db_ms'], 0):.1f}, total;dur={total_ms:.1f}"
+            )
+        # a streamed body is still running its statements
+        if not self.enabled or response.is_streamed:
+            return response
+
+        self._check_repeats()
+        declared = getattr(current_app.view_functions.get(request.endpoint), "query_budget", None)
+        budget = {**self.defaults, **(declared or {})}
+        over = {name: (used[name], limit) for name, limit in budget.items() if used[name] > limit}
+        if not over:
+            return response
+
+        route = f"{request.method} {request.url_rule.rule if request.url_rule else request.path}"
+        with self._lock:
+            self._counters["over_budget"] += 1
+            self._over_by_route[route] = self._over_by_route.get(route, 0) + 1
+        self.logger.warning(
+            f"Query budget exceeded on {route}: "
+            + ", ".join(f"{name} {value} > {limit}" for name, (value, limit) in over.items())
+        )
+
+        if self.strict and declared and any(name in declared for name in over):
+            with self._lock:
+                self._counters["strict_failures"] += 1
+            failed = jsonify({
+                "error": f"Query budget exceeded on {route}",
+                "used": used,
+                "budget": budget,
+            })
+            failed.status_code = 500
+            if "Server-Timing" in response.headers:
+                failed.headers["Server-Timing"] = response.headers["Server-Timing"]
+            return failed
+        return response
+
+    def _check_repeats(self):
+        counts = g.pop("_statement_counts", None) or {}
+        for key, count in counts.items():
+            if count > self.repeat_limit:
+                with self._lock:
+                    self._counters["repeated_statements"] += 1
+                self.logger.warning(
+                    f"Possible N+1 on {request.method} {request.path}: "
+                    f"same statement run {count} times: {key}"
+                )
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._counters,
+                "over_budget_by_route": dict(self._over_by_route),
+                "defaults": dict(self.defaults),
+                "repeat_limit": self.repeat_limit,
+                "strict": self.strict,
+            }
@@ -0,0 +1,205 @@
+#------------------------------------------------------------
+# Per-route request metrics, served in Prometheus text format at
+# GET /metrics.
+#
+# For every request we record, under its blueprint and URL rule:
+#
+#   - the count, by status code;
+#   - a latency histogram of the whole request;
+#   - a histogram of the time spent waiting on MySQL (summed from
+#     the timed cursors, see db_connection/instrumented.py) and the
+#     remaining Python time;
+#   - the number of SQL statements and rows they returned.
+#
+# The numbers live in one flat shared-memory array with a fixed
+# slot per (route, method) - the URL map is complete once the
+# blueprints are registered - so recording a request is a handful
+# of additions under one lock, and gunicorn workers forked from a
+# preloaded app all add into (and report) the same totals.
+#------------------------------------------------------------
+import multiprocessing
+import time
+
+from flask import Response, g, request
+
+from backend.db_connection.instrumented import request_stats
+
+# upper bounds in seconds (the Prometheus client defaults)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# status codes with their own series; anything else is counted
+# under its class ("2xx", "4xx", ...)
+STATUS_CODES = (200, 201, 202, 204, 206, 304, 400, 401, 403, 404, 405, 409, 410, 413, 422, 429, 500, 503)
+STATUS_LABELS = tuple(str(code) for code in STATUS_CODES) + ("1xx", "2xx", "3xx", "4xx", "5xx")
+_STATUS_SLOT = {code: i for i, code in enumerate(STATUS_CODES)}
+
+# requests that matched no URL rule (404s, 405s before routing)
+UNMATCHED = ("", "<unmatched>", "ANY")
+
+# layout of one series' slots in the shared array
+_HIST = len(BUCKETS) + 1            # finite buckets + "+Inf"
+_STATUS = 0
+_DURATION = _STATUS + len(STATUS_LABELS)
+_DURATION_SUM = _DURATION + _HIST
+_DB = _DURATION_SUM + 1
+_DB_SUM = _DB + _HIST
+_PYTHON_SUM = _DB_SUM + 1
+_STATEMENTS = _PYTHON_SUM + 1
+_ROWS = _STATEMENTS + 1
+_STRIDE = _ROWS + 1
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _bucket(seconds):
+    for i, bound in enumerate(BUCKETS):
+        if seconds <= bound:
+            return i
+    return len(BUCKETS)
+
+
+def _status_slot(code):
+    slot = _STATUS_SLOT.get(code)
+    if slot is None:
+        slot = len(STATUS_CODES) + min(max(code // 100, 1), 5) - 1
+    return slot
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class RequestMetrics:
+
+    def __init__(self):
+        self.enabled = True
+        self._series = {}       # (endpoint, method) -> slot index
+        self._labels = []       # slot index -> (blueprint, route, method)
+        self._values = None
+        self._raw = None
+
+    def init_app(self, app):
+        """Call after every blueprint has been registered."""
+        app.config.setdefault("METRICS_ENABLED", True)
+        self.enabled = app.config["METRICS_ENABLED"]
+        if not self.enabled:
+            return
+
+        app.add_url_rule("/metrics", "metrics", self.exposition, methods=["GET"])
+        for rule in sorted(app.url_map.iter_rules(), key=lambda r: (r.rule, r.endpoint)):
+            blueprint = rule.endpoint.rsplit(".", 1)[0] if "." in rule.endpoint else ""
+            for method in sorted((rule.methods or set()) - {"HEAD", "OPTIONS"}):
+                self._add_series(rule.endpoint, method, (blueprint, rule.rule, method))
+        self._add_series(None, None, UNMATCHED)
+
+        # allocated here, before any worker is forked
+        self._values = multiprocessing.Array("d", len(self._labels) * _STRIDE)
+        self._raw = self._values.get_obj()
+
+        app.before_request(self._start)
+        app.after_request(self._capture_status)
+        app.teardown_request(self._finish)
+
+    def _add_series(self, endpoint, method, labels):
+        self._series[(endpoint, method)] = len(self._labels)
+        self._labels.append(labels)
+
+    # ------------------------------------------------------------
+    # request hooks
+
+    @staticmethod
+    def _start():
+        g._metrics_started = time.perf_counter()
+
+    @staticmethod
+    def _capture_status(response):
+        g._metrics_status = response.status_code
+        return response
+
+    def _finish(self, exception):
+        started = g.pop("_metrics_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        stats = request_stats()
+        self.record(
+            request.endpoint, request.method, g.pop("_metrics_status", 500),
+            elapsed, stats.db_time, stats.statements, stats.rows,
+        )
+
+    def record(self, endpoint, method, status, seconds, db_seconds, statements, rows):
+        if method == "HEAD":
+            method = "GET"
+        slot = self._series.get((endpoint, method))
+        if slot is None:
+            slot = self._series[(None, None)]
+        base = slot * _STRIDE
+        raw = self._raw
+        with self._values.get_lock():
+            raw[base + _STATUS + _status_slot(status)] += 1
+            raw[base + _DURATION + _bucket(seconds)] += 1
+            raw[base + _DURATION_SUM] += seconds
+            raw[base + _DB + _bucket(db_seconds)] += 1
+            raw[base + _DB_SUM] += db_seconds
+            raw[base + _PYTHON_SUM] += max(seconds - db_seconds, 0.0)
+            raw[base + _STATEMENTS] += statements
+            raw[base + _ROWS] += rows
+
+    # ------------------------------------------------------------
+    # exposition
+
+    def exposition(self):
+        return Response(self.render(), mimetype=None, content_type=CONTENT_TYPE)
+
+    def render(self):
+        with self._values.get_lock():
+            values = self._raw[:]
+
+        series = []
+        for slot, (blueprint, route, method) in enumerate(self._labels):
+            row = values[slot * _STRIDE:(slot + 1) * _STRIDE]
+            count = sum(row[_STATUS:_STATUS + len(STATUS_LABELS)])
+            if count:
+                labels = f'blueprint="{_escape(blueprint)}",route="{_escape(route)}",method="{method}"'
+                series.append((labels, row, count))
+
+        lines = [
+            "# HELP clubhub_http_requests_total Requests handled, by route and status code.",
+            "# TYPE clubhub_http_requests_total counter",
+        ]
+        for labels, row, _ in series:
+            for i, status in enumerate(STATUS_LABELS):
+                if row[_STATUS + i]:
+                    lines.append(f'clubhub_http_requests_total{{{labels},status="{status}"}} {row[_STATUS + i]:.0f}')
+
+        for name, offset, sum_offset, help_text in (
+            ("clubhub_http_request_duration_seconds", _DURATION, _DURATION_SUM,
+             "Time from routing to the end of the request."),
+            ("clubhub_http_request_db_seconds", _DB, _DB_SUM,
+             "Time per request spent executing SQL statements."),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, row, count in series:
+                cumulative = 0
+                for i, bound in enumerate(BUCKETS + (float("inf"),)):
+                    cumulative += row[offset + i]
+                    le = "+Inf" if i == len(BUCKETS) else repr(bound)
+                    lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative:.0f}')
+                lines.append(f"{name}_sum{{{labels}}} {row[sum_offset]!r}")
+                lines.append(f"{name}_count{{{labels}}} {count:.0f}")
+
+        for name, offset, kind, help_text in (
+            ("clubhub_http_request_python_seconds_total", _PYTHON_SUM, "counter",
+             "Request time not spent executing SQL statements."),
+            ("clubhub_db_statements_total", _STATEMENTS, "counter",
+             "SQL statements executed while handling requests."),
+            ("clubhub_db_rows_total", _ROWS, "counter",
+             "Rows returned by SQL statements executed while handling requests."),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, row, _ in series:
+                value = row[offset]
+                lines.append(f"{name}{{{labels}}} {value!r}" if offset == _PYTHON_SUM else f"{name}{{{labels}}} {value:.0f}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,133 @@
+from flask import Blueprint, jsonify, current_app, request
+from backend.db_connection import db, tx
+from backend.db_connection.slow_queries import slow_queries
+from backend.metrics import query_budget
+from backend.cache import cache, idempotency, transfer
+from backend.willow.rollups import rollups
+from backend.alex_student.search_log import search_log
+from backend.kaitlyn import review
+from backend.alex_student.holds import seat_holds
+
+# Operational routes for checking on the health of the API itself
+# (connection pool, caches, etc.) rather than ClubHub data.
+ops = Blueprint("ops", __name__)
+
+
+# ------------------------------------------------------------
+# Connection pool statistics: connections in use / idle and how
+# long requests have had to wait to borrow one.
+# Example: /ops/pool
+@ops.route("/pool", methods=["GET"])
+def get_pool_stats():
+    current_app.logger.info("GET /ops/pool handler")
+    return jsonify(db.stats()), 200
+
+
+# ------------------------------------------------------------
+# Transactions run by this process: commits, rollbacks, lock wait
+# timeouts and deadlocks, how long they were held, cursors and
+# transactions left open at teardown, and the server's InnoDB row
+# lock wait totals.
+# Example: /ops/transactions
+@ops.route("/transactions", methods=["GET"])
+def get_transaction_stats():
+    current_app.logger.info("GET /ops/transactions handler")
+    return jsonify(tx.stats()), 200
+
+
+# ------------------------------------------------------------
+# Statements run by this process ranked by total time, with call
+# counts, slow calls, the route that last ran one slowly and a
+# sampled EXPLAIN plan.  ?top=N (default 20) limits the list.
+# Example: /ops/slow-queries?top=10
+@ops.route("/slow-queries", methods=["GET"])
+def get_slow_queries():
+    current_app.logger.info("GET /ops/slow-queries handler")
+    top = request.args.get("top", default=20, type=int)
+    if top < 1:
+        return jsonify({"error": "top must be a positive integer"}), 400
+    return jsonify({"stats": slow_queries.stats(), "queries": slow_queries.report(top)}), 200
+
+
+# ------------------------------------------------------------
+# Query budgets: requests that went over their statement / round
+# trip / row / DB time budget (per route), possible N+1 loops seen
+# and responses failed in strict mode.
+# Example: /ops/query-budget
+@ops.route("/query-budget", methods=["GET"])
+def get_query_budget_stats():
+    current_app.logger.info("GET /ops/query-budget handler")
+    return jsonify(query_budget.stats()), 200
+
+
+# ------------------------------------------------------------
+# Response cache hit/miss counters, overall and per route.
+# Example: /ops/cache
+@ops.route("/cache", methods=["GET"])
+def get_cache_stats():
+    current_app.logger.info("GET /ops/cache handler")
+    return jsonify(cache.stats()), 200
+
+
+# ------------------------------------------------------------
+# Conditional GET and compression: 304s sent, responses compressed
+# per encoding and bytes before / after compression.
+# Example: /ops/transfer
+@ops.route("/transfer", methods=["GET"])
+def get_transfer_stats():
+    current_app.logger.info("GET /ops/transfer handler")
+    return jsonify(transfer.stats()), 200
+
+
+# ------------------------------------------------------------
+# Analytics rollup refreshes: how many have run and how many
+# clubs / events are waiting for the next one.
+# Example: /ops/rollups
+@ops.route("/rollups", methods=["GET"])
+def get_rollup_stats():
+    current_app.logger.info("GET /ops/rollups handler")
+    return jsonify(rollups.stats()), 200
+
+
+# ------------------------------------------------------------
+# Buffered search logging: searches recorded, written, dropped and
+# still waiting for the next flush.
+# Example: /ops/search-log
+@ops.route("/search-log", methods=["GET"])
+def get_search_log_stats():
+    current_app.logger.info("GET /ops/search-log handler")
+    return jsonify(search_log.stats()), 200
+
+
+# ------------------------------------------------------------
+# Review queue activity in this process: claims (and how many came
+# back empty), applications claimed, decisions applied or refused
+# because the lease was lost, and releases.  Queue depth per club is
+# at /eboardmember/clubs/<clubID>/review-queue.
+# Example: /ops/review-queue
+@ops.route("/review-queue", methods=["GET"])
+def get_review_queue_stats():
+    current_app.logger.info("GET /ops/review-queue handler")
+    return jsonify(review.metrics()), 200
+
+
+# ------------------------------------------------------------
+# Seat holds in this process: granted, refused because the event
+# was full, converted into registrations, released and expired,
+# plus how long the expiry sweeps take.
+# Example: /ops/holds
+@ops.route("/holds", methods=["GET"])
+def get_hold_stats():
+    current_app.logger.info("GET /ops/holds handler")
+    return jsonify(seat_holds.stats()), 200
+
+
+# ------------------------------------------------------------
+# Idempotency keys in this process: keyed POSTs, responses stored
+# and replayed, keys reused with a different body, duplicates that
+# gave up waiting for the first request, and expired keys removed.
+# Example: /ops/idempotency
+@ops.route("/idempotency", methods=["GET"])
+def get_idempotency_stats():
+    current_app.logger.info("GET /ops/idempotency handler")
+    return jsonify(idempotency.stats()), 200
@@ -4,13 +4,21 @@ import os
 import logging
 from logging.handlers import RotatingFileHandler
 
-from backend.db_connection import db
+from backend.db_connection import db, tx
+from backend.db_connection.slow_queries import slow_queries
+from backend.cache import cache, idempotency, transfer
+from backend import json_provider
+from backend.willow.rollups import rollups
+from backend.alex_student.search_log import search_log
+from backend.alex_student.holds import seat_holds
+from backend.metrics import metrics, query_budget
 from backend.simple.simple_routes import simple_routes
 #from backend.ngos.ngo_routes import ngos
 from backend.willow.willow_routes import willow
 from backend.alex_student.alex_routes import students
 from backend.kaitlyn.kaitlyn_routes import kaitlyn
 from backend.Elizabeth.Elizabeth_routes import Elizabeth
+from backend.ops.ops_routes import ops
 
 def create_app():
     app = Flask(__name__)
@@ -45,9 +53,102 @@ def create_app():
         "DB_NAME"
     ).strip()  # Change this to your DB name
 
+    # Connection pool settings (see backend/db_connection/pool.py).
+    # Sizes are per API process; idle/lifetime/timeout are in seconds.
+    app.config["MYSQL_POOL_MIN_SIZE"] = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+    app.config["MYSQL_POOL_MAX_SIZE"] = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+    app.config["MYSQL_POOL_MAX_IDLE"] = float(os.getenv("DB_POOL_MAX_IDLE", "300"))
+    app.config["MYSQL_POOL_MAX_LIFETIME"] = float(os.getenv("DB_POOL_MAX_LIFETIME", "3600"))
+    app.config["MYSQL_POOL_TIMEOUT"] = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+    app.config["MYSQL_POOL_PRE_PING"] = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+    # Slow-query capture (see backend/db_connection/slow_queries.py).
+    # Statements over SLOW_QUERY_MS are logged; EXPLAIN_RATE is the
+    # share of them whose plan is fetched, at most once per statement
+    # every EXPLAIN_INTERVAL seconds.
+    app.config["SLOW_QUERY_ENABLED"] = os.getenv("SLOW_QUERY_ENABLED", "true").lower() == "true"
+    app.config["SLOW_QUERY_MS"] = float(os.getenv("SLOW_QUERY_MS", "200"))
+    app.config["SLOW_QUERY_EXPLAIN_RATE"] = float(os.getenv("SLOW_QUERY_EXPLAIN_RATE", "0.2"))
+    app.config["SLOW_QUERY_EXPLAIN_INTERVAL"] = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL", "300"))
+    app.config["SLOW_QUERY_MAX_FINGERPRINTS"] = int(os.getenv("SLOW_QUERY_MAX_FINGERPRINTS", "500"))
+
+    # Response cache for read-mostly routes (see backend/cache)
+    app.config["CACHE_ENABLED"] = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+    app.config["CACHE_MAX_ENTRIES"] = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+    app.config["CACHE_DEFAULT_TTL"] = float(os.getenv("CACHE_DEFAULT_TTL", "60"))
+
+    # ETag / 304 and gzip / brotli compression of GET responses
+    # (see backend/cache/transfer.py); sizes in bytes
+    app.config["ETAGS_ENABLED"] = os.getenv("ETAGS_ENABLED", "true").lower() == "true"
+    app.config["COMPRESS_ENABLED"] = os.getenv("COMPRESS_ENABLED", "true").lower() == "true"
+    app.config["COMPRESS_MIN_SIZE"] = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+    app.config["COMPRESS_GZIP_LEVEL"] = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+    app.config["COMPRESS_BROTLI_QUALITY"] = int(os.getenv("COMPRESS_BROTLI_QUALITY", "5"))
+
+    # Analytics rollup refresh intervals in seconds (see backend/willow/rollups.py)
+    app.config["ROLLUP_FLUSH_INTERVAL"] = float(os.getenv("ROLLUP_FLUSH_INTERVAL", "5"))
+    app.config["ROLLUP_FULL_REFRESH_INTERVAL"] = float(os.getenv("ROLLUP_FULL_REFRESH_INTERVAL", "3600"))
+
+    # Buffered search logging (see backend/alex_student/search_log.py)
+    app.config["SEARCH_LOG_ENABLED"] = os.getenv("SEARCH_LOG_ENABLED", "true").lower() == "true"
+    app.config["SEARCH_LOG_FLUSH_INTERVAL"] = float(os.getenv("SEARCH_LOG_FLUSH_INTERVAL", "2"))
+    app.config["SEARCH_LOG_BATCH_SIZE"] = int(os.getenv("SEARCH_LOG_BATCH_SIZE", "500"))
+    app.config["SEARCH_LOG_MAX_PENDING"] = int(os.getenv("SEARCH_LOG_MAX_PENDING", "10000"))
+
+    # Seat holds for busy events (see backend/alex_student/holds.py).
+    # HOLD_SECONDS is how long a student has to confirm a held seat.
+    app.config["HOLD_SECONDS"] = int(os.getenv("HOLD_SECONDS", "120"))
+    app.config["HOLD_SWEEP_INTERVAL"] = float(os.getenv("HOLD_SWEEP_INTERVAL", "5"))
+    app.config["HOLD_SWEEP_BATCH"] = int(os.getenv("HOLD_SWEEP_BATCH", "500"))
+
+    # Responses to POSTs sent with an Idempotency-Key are kept for
+    # IDEMPOTENCY_TTL seconds; duplicates wait up to WAIT_SECONDS for
+    # the first one to finish (see backend/cache/idempotency.py)
+    app.config["IDEMPOTENCY_ENABLED"] = os.getenv("IDEMPOTENCY_ENABLED", "true").lower() == "true"
+    app.config["IDEMPOTENCY_TTL"] = int(os.getenv("IDEMPOTENCY_TTL", "86400"))
+    app.config["IDEMPOTENCY_WAIT_SECONDS"] = int(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+    app.config["IDEMPOTENCY_SWEEP_INTERVAL"] = float(os.getenv("IDEMPOTENCY_SWEEP_INTERVAL", "300"))
+
+    # JSON encoder for responses: "orjson" (fast) or "stdlib"
+    # (see backend/json_provider/providers.py)
+    app.config["JSON_PROVIDER"] = os.getenv("JSON_PROVIDER", "orjson").strip().lower()
+    json_provider.init_app(app)
+
+    # Per-route request metrics at GET /metrics (see backend/metrics)
+    app.config["METRICS_ENABLED"] = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+    # Per-request query counts, Server-Timing headers and query budgets
+    # (see backend/metrics/query_budget.py).  STRICT turns a route
+    # going over its declared budget into a 500 - for tests only.
+    app.config["QUERY_BUDGET_ENABLED"] = os.getenv("QUERY_BUDGET_ENABLED", "true").lower() == "true"
+    app.config["SERVER_TIMING_ENABLED"] = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+    app.config["QUERY_BUDGET_STRICT"] = os.getenv("QUERY_BUDGET_STRICT", "false").lower() == "true"
+    app.config["QUERY_BUDGET_STATEMENTS"] = int(os.getenv("QUERY_BUDGET_STATEMENTS", "25"))
+    app.config["QUERY_BUDGET_DB_MS"] = float(os.getenv("QUERY_BUDGET_DB_MS", "1000"))
+    app.config["QUERY_REPEAT_LIMIT"] = int(os.getenv("QUERY_REPEAT_LIMIT", "10"))
+
+    # Transactions held open at least this long are logged
+    # (see backend/db_connection/transactions.py)
+    app.config["TRANSACTION_SLOW_MS"] = float(os.getenv("TRANSACTION_SLOW_MS", "500"))
+    # Write routes that hit a deadlock or lock wait timeout are re-run
+    # up to TRANSACTION_RETRIES times, waiting a random time of up to
+    # BASE_MS * 2^attempt (capped at MAX_MS) first
+    app.config["TRANSACTION_RETRIES"] = int(os.getenv("TRANSACTION_RETRIES", "3"))
+    app.config["TRANSACTION_RETRY_BASE_MS"] = float(os.getenv("TRANSACTION_RETRY_BASE_MS", "25"))
+    app.config["TRANSACTION_RETRY_MAX_MS"] = float(os.getenv("TRANSACTION_RETRY_MAX_MS", "500"))
+
     # Initialize the database object with the settings above.
     app.logger.info("current_app(): starting the database connection")
     db.init_app(app)
+    tx.init_app(app)
+    slow_queries.init_app(app)
+    cache.init_app(app)
+    transfer.init_app(app)
+    query_budget.init_app(app)
+    rollups.init_app(app)
+    search_log.init_app(app)
+    seat_holds.init_app(app)
+    idempotency.init_app(app)
 
     # Register the routes from each Blueprint with the app object
     # and give a url prefix to each
@@ -59,6 +160,10 @@ def create_app():
     app.register_blueprint(willow)
     app.register_blueprint(students, url_prefix="/student")
     app.register_blueprint(Elizabeth, url_prefix='/Elizabeth')
+    app.register_blueprint(ops, url_prefix="/ops")
+
+    # Metrics go last: they need the complete URL map
+    metrics.init_app(app)
     # Don't forget to return the app object
     return app
 
@@ -0,0 +1,178 @@
+#------------------------------------------------------------
+# Demographic breakdowns of club members, computed server side.
+#
+# MySQL collapses the member rows to one row per distinct
+# (club, age, gender, race, gradYear) combination with a count, so
+# what crosses the wire is bounded by the number of combinations
+# rather than the number of members.  NumPy then turns those
+# weighted rows into value counts, an age histogram and an optional
+# cross-tab, per club and across all the clubs asked for.
+#------------------------------------------------------------
+import numpy as np
+from flask import abort, jsonify, make_response
+
+# student columns that can be counted, filtered or cross-tabbed
+DIMENSIONS = ("gender", "race", "gradYear", "campus", "age")
+
+DEFAULT_AGE_BIN = 5
+UNKNOWN = "unknown"
+
+BASE_QUERY = """
+    SELECT sj.clubID, s.age, s.gender, s.race, s.gradYear, s.campus, COUNT(*) AS n
+    FROM studentJoins sj
+    JOIN student s ON s.studentID = sj.studentID
+"""
+GROUP_BY = " GROUP BY sj.clubID, s.age, s.gender, s.race, s.gradYear, s.campus"
+
+
+def _bad_request(message):
+    abort(make_response(jsonify({"error": message}), 400))
+
+
+def _int_list(values, name):
+    try:
+        return [int(v) for value in values for v in str(value).split(",") if v.strip()]
+    except ValueError:
+        _bad_request(f"{name} must be whole numbers")
+
+
+def _int_arg(args, name, default=None):
+    # an empty value (?minAge=) counts as not given
+    value = (args.get(name) or "").strip()
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        _bad_request(f"{name} must be a whole number")
+
+
+def parse_args(args, club_id=None):
+    """
+    Read the query string into (club_ids, filters, age_bin, crosstab).
+
+    club_ids comes from the URL or ?clubID=1&clubID=2 / ?clubID=1,2
+    (empty means every club).  gender, race, campus and gradYear
+    filters may be repeated; minAge / maxAge bound the age.
+    """
+    club_ids = [club_id] if club_id is not None else _int_list(args.getlist("clubID"), "clubID")
+
+    filters = {}
+    for name in ("gender", "race", "campus"):
+        values = [v for value in args.getlist(name) for v in value.split(",") if v]
+        if values:
+            filters[name] = values
+    if args.getlist("gradYear"):
+        filters["gradYear"] = _int_list(args.getlist("gradYear"), "gradYear")
+    for name in ("minAge", "maxAge"):
+        value = _int_arg(args, name)
+        if value is not None:
+            filters[name] = value
+
+    age_bin = _int_arg(args, "ageBin", DEFAULT_AGE_BIN)
+    if age_bin < 1:
+        _bad_request("ageBin must be at least 1")
+
+    crosstab = None
+    if args.get("crosstab"):
+        crosstab = tuple(args.get("crosstab").split(","))
+        if len(crosstab) != 2 or not set(crosstab) <= set(DIMENSIONS):
+            _bad_request(f"crosstab must be two of {', '.join(DIMENSIONS)}, e.g. gender,race")
+
+    return club_ids, filters, age_bin, crosstab
+
+
+def build_query(club_ids, filters):
+    """SQL and params for the grouped member counts."""
+    conditions, params = [], []
+    if club_ids:
+        conditions.append(f"sj.clubID IN ({', '.join(['%s'] * len(club_ids))})")
+        params.extend(club_ids)
+    for name in ("gender", "race", "campus", "gradYear"):
+        if name in filters:
+            conditions.append(f"s.{name} IN ({', '.join(['%s'] * len(filters[name]))})")
+            params.extend(filters[name])
+    if "minAge" in filters:
+        conditions.append("s.age >= %s")
+        params.append(filters["minAge"])
+    if "maxAge" in filters:
+        conditions.append("s.age <= %s")
+        params.append(filters["maxAge"])
+
+    query = BASE_QUERY
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    return query + GROUP_BY, params
+
+
+def _labels(rows, name):
+    # JSON object keys are strings; missing values get their own bucket
+    return np.array([UNKNOWN if row[name] is None else str(row[name]) for row in rows], dtype=object)
+
+
+def _value_counts(labels, weights):
+    keys, inverse = np.unique(labels.astype(str), return_inverse=True)
+    totals = np.bincount(inverse, weights=weights)
+    return {key: int(total) for key, total in zip(keys, totals)}
+
+
+def _age_histogram(ages, weights, age_bin):
+    known = ~np.isnan(ages)
+    if not known.any():
+        return {"binWidth": age_bin, "bins": [], "counts": [], UNKNOWN: int(weights.sum())}
+    starts = (np.floor(ages[known] / age_bin) * age_bin).astype(int)
+    lowest = starts.min()
+    totals = np.bincount((starts - lowest) // age_bin, weights=weights[known])
+    return {
+        "binWidth": age_bin,
+        "bins": [[int(lowest + i * age_bin), int(lowest + (i + 1) * age_bin)] for i in range(len(totals))],
+        "counts": [int(t) for t in totals],
+        UNKNOWN: int(weights[~known].sum()),
+    }
+
+
+def _crosstab(rows_labels, column_labels, weights):
+    table = {}
+    for row_key, column_key, weight in zip(rows_labels, column_labels, weights):
+        cell = table.setdefault(row_key, {})
+        cell[column_key] = cell.get(column_key, 0) + int(weight)
+    return table
+
+
+def _summarize(columns, weights, age_bin, crosstab):
+    summary = {
+        "members": int(weights.sum()),
+        "age": _age_histogram(columns["ageValue"], weights, age_bin),
+    }
+    for name in ("gender", "race", "gradYear", "campus"):
+        summary[name] = _value_counts(columns[name], weights)
+    if crosstab:
+        first, second = crosstab
+        summary["crosstab"] = {
+            "rows": first,
+            "columns": second,
+            "counts": _crosstab(columns[first], columns[second], weights),
+        }
+    return summary
+
+
+def summarize(rows, age_bin=DEFAULT_AGE_BIN, crosstab=None):
+    """
+    Turn grouped rows (one per distinct member profile, with a count
+    in "n") into per-club and overall distributions.
+    """
+    rows = list(rows)
+    weights = np.array([row["n"] for row in rows], dtype=np.int64)
+    columns = {name: _labels(rows, name) for name in DIMENSIONS}
+    columns["ageValue"] = np.array(
+        [np.nan if row["age"] is None else row["age"] for row in rows], dtype=float
+    )
+    club_ids = np.array([row["clubID"] for row in rows], dtype=np.int64)
+
+    clubs = {}
+    for club_id in np.unique(club_ids):
+        mask = club_ids == club_id
+        subset = {name: values[mask] for name, values in columns.items()}
+        clubs[str(club_id)] = _summarize(subset, weights[mask], age_bin, crosstab)
+
+    return {"clubs": clubs, "overall": _summarize(columns, weights, age_bin, crosstab)}
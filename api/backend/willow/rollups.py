@@ -0,0 +1,189 @@
+#------------------------------------------------------------
+# Materialized analytics rollups for the willow routes.
+#
+# clubStats holds one row per club (searches, applications,
+# members) and clubEventStats one row per club/event pair
+# (registrations, club size).  The willow routes read these small
+# tables instead of re-running GROUP BY / JOIN aggregations on
+# every request.
+#
+# Write routes call rollups.mark_club() / rollups.mark_event();
+# the ids are collected in memory and a background job refreshes
+# only those rows every ROLLUP_FLUSH_INTERVAL seconds, so the write
+# path itself does no extra SQL.  The same job rebuilds everything
+# every ROLLUP_FULL_REFRESH_INTERVAL seconds as a safety net.
+#
+# Rebuild by hand (e.g. from cron), from the api folder:
+#   python -m backend.willow.rollups
+#------------------------------------------------------------
+import logging
+import sys
+import threading
+import time
+
+from backend.cache import cache
+from backend.db_connection import db
+from backend.db_connection.background import PeriodicTask
+
+REFRESH_CLUB_STATS = """
+    INSERT INTO clubStats (clubID, name, numSearches, numApplications, numMembers, refreshedAt)
+    SELECT * FROM (
+        SELECT c.clubID, c.name, COALESCE(c.numSearches, 0) AS numSearches,
+               (SELECT COUNT(*) FROM application a WHERE a.clubID = c.clubID) AS numApplications,
+               COALESCE(c.numMembers, 0) AS numMembers, NOW() AS refreshedAt
+        FROM club c
+        {where}
+    ) AS fresh
+    ON DUPLICATE KEY UPDATE
+        name = fresh.name, numSearches = fresh.numSearches,
+        numApplications = fresh.numApplications, numMembers = fresh.numMembers,
+        refreshedAt = fresh.refreshedAt
+"""
+
+REFRESH_CLUB_EVENT_STATS = """
+    INSERT INTO clubEventStats (clubID, eventID, clubName, eventName,
+                                numRegistered, numClubMembers, refreshedAt)
+    SELECT * FROM (
+        SELECT c.clubID, e.eventID, c.name AS clubName, e.name AS eventName,
+               COALESCE(e.numRegistered, 0) AS numRegistered,
+               COALESCE(c.numMembers, 0) AS numClubMembers, NOW() AS refreshedAt
+        FROM club c
+        JOIN clubEvents ce ON c.clubID = ce.clubID
+        JOIN event e ON ce.eventID = e.eventID
+        {where}
+    ) AS fresh
+    ON DUPLICATE KEY UPDATE
+        clubName = fresh.clubName, eventName = fresh.eventName,
+        numRegistered = fresh.numRegistered, numClubMembers = fresh.numClubMembers,
+        refreshedAt = fresh.refreshedAt
+"""
+
+# club/event pairs whose clubEvents link is gone
+PRUNE_CLUB_EVENT_STATS = """
+    DELETE s FROM clubEventStats s
+    LEFT JOIN clubEvents ce ON s.clubID = ce.clubID AND s.eventID = ce.eventID
+    WHERE ce.clubID IS NULL
+"""
+
+# MySQL error raised when the rollup tables have not been migrated yet
+ER_NO_SUCH_TABLE = 1146
+
+
+def _in_clause(column, ids):
+    return f"WHERE {column} IN ({', '.join(['%s'] * len(ids))})"
+
+
+def refresh(conn, club_ids=(), event_ids=()):
+    """Recompute the rollup rows for the given clubs / events and commit."""
+    club_ids, event_ids = sorted(club_ids), sorted(event_ids)
+    with conn.cursor() as cursor:
+        if club_ids:
+            cursor.execute(REFRESH_CLUB_STATS.format(where=_in_clause("c.clubID", club_ids)), club_ids)
+            cursor.execute(
+                REFRESH_CLUB_EVENT_STATS.format(where=_in_clause("c.clubID", club_ids)), club_ids
+            )
+        if event_ids:
+            cursor.execute(
+                REFRESH_CLUB_EVENT_STATS.format(where=_in_clause("e.eventID", event_ids)), event_ids
+            )
+    conn.commit()
+
+
+def refresh_all(conn):
+    """Rebuild every rollup row and commit."""
+    with conn.cursor() as cursor:
+        cursor.execute(REFRESH_CLUB_STATS.format(where=""))
+        cursor.execute(REFRESH_CLUB_EVENT_STATS.format(where=""))
+        cursor.execute(PRUNE_CLUB_EVENT_STATS)
+    conn.commit()
+
+
+def freshness(rows):
+    """
+    Pop the refreshedAt column from each row and return the oldest
+    value as an ISO timestamp (or None for an empty result).
+    """
+    stamps = [row.pop("refreshedAt", None) for row in rows]
+    stamps = [s for s in stamps if s is not None]
+    return min(stamps).isoformat() if stamps else None
+
+
+class RollupRefresher:
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._clubs = set()
+        self._events = set()
+        self._last_full = time.monotonic()
+        self._counters = {"flushes": 0, "clubs_refreshed": 0, "events_refreshed": 0, "full_refreshes": 0}
+        self.full_interval = 3600
+        self._task = PeriodicTask("rollup-refresh", 5, self.flush, self.logger)
+
+    def init_app(self, app):
+        app.config.setdefault("ROLLUP_FLUSH_INTERVAL", 5)
+        app.config.setdefault("ROLLUP_FULL_REFRESH_INTERVAL", 3600)
+        self._task.interval = app.config["ROLLUP_FLUSH_INTERVAL"]
+        self._task.logger = self.logger = app.logger
+        self.full_interval = app.config["ROLLUP_FULL_REFRESH_INTERVAL"]
+
+    def ensure_running(self):
+        # readers call this so the periodic full refresh runs even
+        # when nothing has been written yet
+        self._task.ensure_started()
+
+    def mark_club(self, *club_ids):
+        with self._lock:
+            self._clubs.update(int(i) for i in club_ids if i is not None)
+        self._task.ensure_started()
+
+    def mark_event(self, *event_ids):
+        with self._lock:
+            self._events.update(int(i) for i in event_ids if i is not None)
+        self._task.ensure_started()
+
+    def flush(self):
+        with self._lock:
+            clubs, self._clubs = self._clubs, set()
+            events, self._events = self._events, set()
+        full = time.monotonic() - self._last_full >= self.full_interval
+        if not (clubs or events or full):
+            return
+
+        try:
+            with db.pool.connection() as conn:
+                if full:
+                    refresh_all(conn)
+                    self._last_full = time.monotonic()
+                    self._counters["full_refreshes"] += 1
+                else:
+                    refresh(conn, clubs, events)
+        except Exception:
+            # keep the ids for the next attempt
+            with self._lock:
+                self._clubs |= clubs
+                self._events |= events
+            raise
+        self._counters["flushes"] += 1
+        self._counters["clubs_refreshed"] += len(clubs)
+        self._counters["events_refreshed"] += len(events)
+        # cached rollup responses (and their ETags) are now stale
+        cache.invalidate("rollups")
+
+    def stats(self):
+        with self._lock:
+            pending = {"pending_clubs": len(self._clubs), "pending_events": len(self._events)}
+        return {**self._counters, **pending}
+
+
+rollups = RollupRefresher()
+
+
+if __name__ == "__main__":
+    from backend.rest_entry import create_app
+
+    app = create_app()
+    with app.app_context(), db.pool.connection() as conn:
+        refresh_all(conn)
+    print("rollups rebuilt")
+    sys.exit(0)
@@ -1,29 +1,74 @@
 from flask import Blueprint, jsonify, request, make_response
-from backend.db_connection import db
+from backend.db_connection import tx
+from backend.db_connection import streaming
+from backend.db_connection import pagination
+from backend.cache import cache
+from backend.willow.rollups import rollups, freshness, ER_NO_SUCH_TABLE
+from backend.willow import demographics
 from mysql.connector import Error
 from flask import current_app
+from datetime import datetime
+import pymysql
 
 # Create a Blueprint for  routes
 willow = Blueprint("willow", __name__)
 
+# Sort keys for ?limit=/&cursor= pagination (see pagination.py)
+CLUB_NAME_PAGE_KEYS = [('club.name', 'name')]
+CLUB_ID_PAGE_KEYS = [('club.clubID', 'clubID')]
+CATEGORY_PAGE_KEYS = [('club.name', 'name'), ('club.clubID', 'clubID'), ('category.categoryID', 'categoryID')]
+STUDENT_PAGE_KEYS = [('student.studentID', 'studentID')]
+ATTENDEE_PAGE_KEYS = [('club.clubID', 'clubID'), ('event.eventID', 'eventID')]
+# same cursor values, columns of the clubEventStats rollup
+ATTENDEE_ROLLUP_PAGE_KEYS = [('stats.clubID', 'clubID'), ('stats.eventID', 'eventID')]
+
+
+def fetch_rollup(cursor, rollup_query, live_query, params):
+    """
+    Read from a rollup table (see rollups.py).  Until migration 0002
+    has been applied the table does not exist, so fall back to the
+    live aggregation.  Returns (rows, refreshed_at).
+
+    Routes reading rollups are cached under the 'rollups' tag, which
+    the refresher bumps whenever it rewrites rollup rows.
+    """
+    rollups.ensure_running()
+    try:
+        cursor.execute(rollup_query, params)
+        rows = cursor.fetchall()
+        return rows, freshness(rows) or datetime.now().isoformat()
+    except pymysql.err.ProgrammingError as e:
+        if e.args[0] != ER_NO_SUCH_TABLE:
+            raise
+        current_app.logger.warning(f'Rollup table missing, using live query: {str(e)}')
+        cursor.execute(live_query, params)
+        return cursor.fetchall(), datetime.now().isoformat()
+
 
 # story 3
 # get data about how many searches each club has
 @willow.route('/clubs/searches', methods=["GET"])
+@cache.cached(ttl=300, tags=['rollups'])
 def get_club_searches():
     try:
         current_app.logger.info('Starting get_club_searches request')
-        cursor = db.get_db().cursor()
+        page = pagination.from_request(CLUB_NAME_PAGE_KEYS)
 
-        query = 'SELECT club.name, SUM(club.numSearches)\
-                    FROM club\
-                    GROUP BY club.name\
-                    ORDER BY club.name;'
+        # served from the clubStats rollup; aliased as club so the
+        # pagination keys match the live query
+        rollup_query = 'SELECT club.name, SUM(club.numSearches),\
+                    MIN(club.refreshedAt) AS refreshedAt\
+                    FROM clubStats club' + page.where() + '\
+                    GROUP BY club.name' + page.order_by()
+        live_query = 'SELECT club.name, SUM(club.numSearches)\
+                    FROM club' + page.where() + '\
+                    GROUP BY club.name' + page.order_by()
 
-        cursor.execute(query)
-        searches = cursor.fetchall()
+        with tx.cursor() as cursor:
+            searches, refreshed_at = fetch_rollup(cursor, rollup_query, live_query, page.params)
+        searches = page.trim(searches)
 
-        return jsonify(searches)
+        return jsonify(searches), 200, {**page.headers(), 'X-Data-Refreshed-At': refreshed_at}
 
     except Error as e:
         current_app.logger.error(f'Database error in get_club_searches: {str(e)}')
@@ -33,25 +78,30 @@ def get_club_searches():
 # story 3
 # show applications for each club
 @willow.route('/clubs/applications')
+@cache.cached(ttl=300, tags=['rollups'])
 def get_club_apps():
     try:
         current_app.logger.info('Starting get_club_apps request')
-        cursor = db.get_db().cursor()
-
-        query = 'SELECT club.name, COUNT(applicationID) as NumApps\
+        page = pagination.from_request(CLUB_ID_PAGE_KEYS)
+        rollup_query = 'SELECT club.clubID, club.name, club.numApplications AS NumApps,\
+                    club.refreshedAt\
+                    FROM clubStats club\
+                    WHERE club.numApplications > 0' + page.where(has_where=True) + page.order_by()
+        live_query = 'SELECT club.clubID, club.name, COUNT(applicationID) as NumApps\
                     FROM application\
-                    JOIN club ON application.clubID = club.clubID\
-                    GROUP BY club.clubID;'
+                    JOIN club ON application.clubID = club.clubID' + page.where() + '\
+                    GROUP BY club.clubID' + page.order_by()
 
-        cursor.execute(query)
-        applications = cursor.fetchall()
-        cursor.close()
+        with tx.cursor() as cursor:
+            applications, refreshed_at = fetch_rollup(cursor, rollup_query, live_query, page.params)
+            applications = page.trim(applications)
 
         
         response = make_response(applications)
         response.status_code = 200
         response.mimetype = 'application/json'
-        
+        response.headers.update(page.headers())
+        response.headers['X-Data-Refreshed-At'] = refreshed_at
         
         return response
 
@@ -63,23 +113,30 @@ def get_club_apps():
 # story 2
 # show categories for each club
 @willow.route('/clubs/categories', methods=['GET'])
+@cache.cached(ttl=300, tags=['clubs', 'categories'])
 def get_categories():
     try:
         current_app.logger.info('Starting get_categories request')
-        cursor = db.get_db().cursor()
+        page = pagination.from_request(CATEGORY_PAGE_KEYS)
         
         query = 'SELECT club.name, club.clubID, category.name, category.categoryID\
                 FROM club JOIN clubCategories ON club.clubID = clubCategories.clubID\
-                JOIN category ON clubCategories.categoryID = category.categoryID\
-                ORDER BY club.name;'
+                JOIN category ON clubCategories.categoryID = category.categoryID'
+        query += page.where() + page.order_by()
+
+        # ?stream=json or ?stream=ndjson sends rows as they are read
+        stream_format = streaming.requested()
+        if stream_format:
+            return streaming.stream_query(query, page.params, fmt=stream_format)
 
-        cursor.execute(query)
-        categories = cursor.fetchall()
-        cursor.close()
+        with tx.cursor() as cursor:
+            cursor.execute(query, page.params)
+            categories = page.trim(cursor.fetchall())
 
         response = make_response(categories)
         response.status_code = 200
         response.mimetype = 'application/json'
+        response.headers.update(page.headers())
         
         return response
 
@@ -95,22 +152,28 @@ def get_categories():
 def get_club_demographics(clubID):
     try:
         current_app.logger.info('Starting get_club_demographics request')
-        cursor = db.get_db().cursor()
+        page = pagination.from_request(STUDENT_PAGE_KEYS)
 
         query = f'SELECT student.studentID, student.age,\
                 student.gender, student.race, student.gradYear\
                 FROM student JOIN studentJoins ON\
                 student.studentID = studentJoins.studentID\
                 WHERE clubID = {clubID}'
+        query += page.where(has_where=True) + page.order_by()
 
-        # cursor.execute(query, clubID)
-        cursor.execute(query)
-        demographics = cursor.fetchall()
-        cursor.close()
+        stream_format = streaming.requested()
+        if stream_format:
+            return streaming.stream_query(query, page.params, fmt=stream_format)
+
+        with tx.cursor() as cursor:
+            # cursor.execute(query, clubID)
+            cursor.execute(query, page.params)
+            demographics = page.trim(cursor.fetchall())
 
         response = make_response(demographics)
         response.status_code = 200
         response.mimetype = 'application/json'
+        response.headers.update(page.headers())
         
         return response
 
@@ -118,25 +181,67 @@ def get_club_demographics(clubID):
         current_app.logger.error(f'Database error in get_club_demographics: {str(e)}')
         return jsonify({"error": str(e)}), 500
 
+# story 2
+# demographic breakdowns (value counts, age histogram, optional cross-tab)
+# for one club, several clubs, or every club, instead of raw member rows
+# Example: /clubs/demographics/summary?clubID=1,2&gender=Female&ageBin=2&crosstab=gender,race
+@willow.route('/clubs/demographics/summary', methods=['GET'])
+@willow.route('/clubs/<int:clubID>/demographics/summary', methods=['GET'])
+@cache.cached(ttl=300, tags=['demographics'])
+def get_demographics_summary(clubID=None):
+    try:
+        current_app.logger.info('Starting get_demographics_summary request')
+        club_ids, filters, age_bin, crosstab = demographics.parse_args(request.args, clubID)
+        query, params = demographics.build_query(club_ids, filters)
+
+        with tx.cursor() as cursor:
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+
+        return jsonify(demographics.summarize(rows, age_bin, crosstab)), 200
+
+    except Error as e:
+        current_app.logger.error(f'Database error in get_demographics_summary: {str(e)}')
+        return jsonify({"error": str(e)}), 500
+
 # story 4
 # show number of attendees for all events and the number of members the club hosting that event has
 @willow.route('/events/attendees', methods=['GET'])
+@cache.cached(ttl=300, tags=['rollups'])
 def get_attendees():
     try:
         current_app.logger.info('Starting get_attendees request')
-        cursor = db.get_db().cursor()
-
-        query = "SELECT club.clubID, club.name, event.eventID, event.name,\
+        page = pagination.from_request(ATTENDEE_PAGE_KEYS)
+        rollup_page = pagination.from_request(ATTENDEE_ROLLUP_PAGE_KEYS)
+
+        # served from the clubEventStats rollup, with the same column
+        # names the live join produces
+        columns = "stats.clubID, stats.clubName AS name, stats.eventID,\
+                stats.eventName AS `event.name`, stats.numRegistered, stats.numClubMembers"
+        rollup_query = "SELECT " + columns + ", stats.refreshedAt\
+                FROM clubEventStats stats" + rollup_page.where() + rollup_page.order_by()
+        live_query = "SELECT club.clubID, club.name, event.eventID, event.name,\
                 event.numRegistered, club.numMembers AS numClubMembers\
                 FROM club JOIN clubEvents ON club.clubID = clubEvents.clubID\
-                JOIN event ON clubEvents.eventID = event.eventID\
-                ORDER BY clubID;"
-
-    
-        cursor.execute(query)
-        attendees = cursor.fetchall()
-
-        return jsonify(attendees)
+                JOIN event ON clubEvents.eventID = event.eventID"
+        live_query += page.where() + page.order_by()
+
+        stream_format = streaming.requested()
+        if stream_format:
+            stream_query = "SELECT " + columns + " FROM clubEventStats stats"
+            stream_query += rollup_page.where() + rollup_page.order_by()
+            try:
+                return streaming.stream_query(stream_query, rollup_page.params, fmt=stream_format)
+            except pymysql.err.ProgrammingError as e:
+                if e.args[0] != ER_NO_SUCH_TABLE:
+                    raise
+                return streaming.stream_query(live_query, page.params, fmt=stream_format)
+
+        with tx.cursor() as cursor:
+            attendees, refreshed_at = fetch_rollup(cursor, rollup_query, live_query, page.params)
+        attendees = rollup_page.trim(attendees)
+
+        return jsonify(attendees), 200, {**rollup_page.headers(), 'X-Data-Refreshed-At': refreshed_at}
 
     except Error as e:
         current_app.logger.error(f'Database error in get_club_demographics: {str(e)}')
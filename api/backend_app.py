@@ -14,4 +14,7 @@ if __name__ == '__main__':
     # this app will be bound to port 4000. 
     # Take a look at the docker-compose.yml to see 
     # what port this might be mapped to... 
+    # This is the development server only; in production run
+    #   gunicorn -c gunicorn.conf.py backend_app:app
+    # (see gunicorn.conf.py and docker-compose.prod.yaml)
     app.run(debug = True, host = '0.0.0.0', port = 4000)
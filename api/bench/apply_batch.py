@@ -0,0 +1,104 @@
+#------------------------------------------------------------
+# Throughput of one-at-a-time vs batch application submission.
+#
+# Submits the same set of applications (one student, --clubs
+# clubs, --rounds times) through POST /student/applications one by
+# one, the way the new-application page used to, and through
+# POST /student/applications/batch in chunks of --batch-size.  Runs
+# in-process against the real database through Flask's test client,
+# so the numbers include routing, JSON and every SQL round trip but
+# no network.  Every application it creates is deleted afterwards.
+#
+# Usage (from the api folder):
+#   python -m bench.apply_batch --clubs 20 --rounds 5 --batch-size 20
+#------------------------------------------------------------
+import argparse
+import sys
+import time
+
+from backend.db_connection import db
+from backend.rest_entry import create_app
+
+
+def pick_ids(app, clubs):
+    with app.app_context(), db.pool.connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT studentID FROM student ORDER BY studentID LIMIT 1")
+            student = cursor.fetchone()
+            cursor.execute("SELECT clubID FROM club ORDER BY clubID LIMIT %s", (clubs,))
+            club_ids = [row["clubID"] for row in cursor.fetchall()]
+    if not student or not club_ids:
+        raise SystemExit("need at least one student and one club in the database")
+    return student["studentID"], club_ids
+
+
+def delete_applications(app, application_ids):
+    if not application_ids:
+        return
+    with app.app_context(), db.pool.connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM application WHERE applicationID IN "
+                f"({', '.join(['%s'] * len(application_ids))})",
+                application_ids,
+            )
+        conn.commit()
+
+
+def run_single(client, items):
+    created = []
+    for item in items:
+        response = client.post("/student/applications", json=item)
+        if response.status_code != 201:
+            raise SystemExit(f"single submit failed: {response.status_code} {response.get_json()}")
+        created.append(response.get_json()["applicationID"])
+    return created
+
+
+def run_batch(client, items, batch_size):
+    created = []
+    for start in range(0, len(items), batch_size):
+        response = client.post(
+            "/student/applications/batch", json={"applications": items[start:start + batch_size]}
+        )
+        body = response.get_json()
+        if response.status_code != 201 or body["rejected"]:
+            raise SystemExit(f"batch submit failed: {response.status_code} {body}")
+        created.extend(r["applicationID"] for r in body["results"])
+    return created
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single vs batch application submission")
+    parser.add_argument("--clubs", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_app()
+    client = app.test_client()
+    student_id, club_ids = pick_ids(app, args.clubs)
+    items = [
+        {"studentID": student_id, "clubID": club_id, "dateSubmitted": "2025-09-05"}
+        for _ in range(args.rounds)
+        for club_id in club_ids
+    ]
+    print(f"{len(items)} applications (student {student_id}, {len(club_ids)} clubs x {args.rounds})")
+
+    timings = {}
+    for name, run in (("single", lambda: run_single(client, items)),
+                      ("batch", lambda: run_batch(client, items, args.batch_size))):
+        started = time.perf_counter()
+        created = run()
+        timings[name] = time.perf_counter() - started
+        delete_applications(app, created)
+        print(f"{name:>6}: {len(created)} in {timings[name]:.3f}s -> "
+              f"{len(created) / timings[name]:.0f} applications/sec")
+
+    print(f"batch is {timings['single'] / timings['batch']:.1f}x faster "
+          f"(batch size {args.batch_size})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
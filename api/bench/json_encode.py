@@ -0,0 +1,116 @@
+#------------------------------------------------------------
+# Encoding cost of the JSON providers on typical responses.
+#
+# Builds payloads shaped like GET /eboardmember/clubs/<id>/events
+# (date, DATETIME start/end, a TIME-style duration, a DECIMAL) and
+# GET /eboardmember/clubs/<id>/members (a DATE per row) at a few
+# sizes, and times app.json.response() for each provider: Flask's
+# default (which cannot encode the TIME value at all, so it is
+# timed without it), the stdlib provider and the orjson provider.
+# No database needed.
+#
+# Usage (from the api folder):
+#   python -m bench.json_encode --rows 50 --rows 1000 --rows 10000
+#------------------------------------------------------------
+import argparse
+import decimal
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from backend.json_provider import PROVIDERS, orjson
+
+
+def event_rows(n):
+    rows = []
+    for i in range(n):
+        day = date(2025, 1, 1) + timedelta(days=i % 365)
+        start = datetime.combine(day, datetime.min.time()) + timedelta(hours=17, minutes=30 * (i % 4))
+        capacity = random.randint(20, 150)
+        registered = random.randint(0, capacity)
+        rows.append({
+            "eventID": i + 1,
+            "eventName": f"Workshop Series {i}",
+            "date": day,
+            "startTime": start,
+            "endTime": start + timedelta(hours=2),
+            "duration": timedelta(hours=2, minutes=15 * (i % 3)),
+            "location": "Curry Student Center Room 420",
+            "description": "Interactive workshop on industry best practices.",
+            "capacity": capacity,
+            "numRegistered": registered,
+            "isFull": int(registered >= capacity),
+            "isArchived": 0,
+            "tierRequirement": "Open",
+            "spotsRemaining": capacity - registered,
+            "fee": decimal.Decimal("12.50"),
+        })
+    return rows
+
+
+def member_rows(n):
+    majors = ["Computer Science", "Bioengineering", "Communications", "Health Science"]
+    return [
+        {
+            "studentID": i + 1,
+            "firstName": f"First{i}",
+            "lastName": f"Last{i}",
+            "major": majors[i % len(majors)],
+            "gradYear": 2025 + i % 4,
+            "memberType": "General Member",
+            "joinDate": date(2024, 9, 1) + timedelta(days=i % 200),
+            "email": f"student{i}@northeastern.edu",
+        }
+        for i in range(n)
+    ]
+
+
+def time_response(app, payload, repeat):
+    best = float("inf")
+    with app.app_context():
+        for _ in range(repeat):
+            started = time.perf_counter()
+            body = app.json.response(payload).get_data()
+            best = min(best, time.perf_counter() - started)
+    return best, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON provider encoding benchmark")
+    parser.add_argument("--rows", type=int, action="append")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    random.seed(1)
+
+    providers = {"flask-default": DefaultJSONProvider, "stdlib": PROVIDERS["stdlib"]}
+    if orjson is not None:
+        providers["orjson"] = PROVIDERS["orjson"]
+    apps = {}
+    for name, provider in providers.items():
+        app = Flask(__name__)
+        app.json = provider(app)
+        apps[name] = app
+
+    print(f"{'payload':<16} {'rows':>6} {'provider':<14} {'ms':>8} {'MB/s':>8} {'vs default':>10}")
+    for rows in args.rows or [50, 1000, 10000]:
+        for label, builder in (("club events", event_rows), ("club members", member_rows)):
+            payload = builder(rows)
+            baseline = None
+            for name, app in apps.items():
+                data = payload
+                if name == "flask-default" and label == "club events":
+                    # the default provider raises TypeError on timedelta
+                    data = [{k: v for k, v in row.items() if k != "duration"} for row in payload]
+                seconds, size = time_response(app, data, args.repeat)
+                baseline = baseline or seconds
+                print(
+                    f"{label:<16} {rows:>6} {name:<14} {seconds * 1000:>8.2f} "
+                    f"{size / seconds / 1e6:>8.1f} {baseline / seconds:>9.1f}x"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#------------------------------------------------------------
+# Concurrency stress test for event registration.
+#
+# Creates a scratch event with a small capacity, then lets every
+# student in the database try to register for it at the same time
+# (each one possibly several times).  Afterwards it checks that the
+# event was not oversold and that the counters agree with the
+# studentEvents rows.
+#
+# Usage (from the api folder):
+#   python -m bench.register_stress --capacity 50 --threads 64 --repeat 2
+#------------------------------------------------------------
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+import pymysql
+from dotenv import load_dotenv
+
+from backend.alex_student import registration
+
+
+def connect():
+    return pymysql.connect(
+        host=os.getenv("DB_HOST").strip(),
+        port=int(os.getenv("DB_PORT").strip()),
+        user=os.getenv("DB_USER").strip(),
+        password=os.getenv("MYSQL_ROOT_PASSWORD").strip(),
+        db=os.getenv("DB_NAME").strip(),
+        cursorclass=pymysql.cursors.DictCursor,
+    )
+
+
+def create_event(capacity):
+    conn = connect()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO event (name, date, startTime, endTime, location, description,
+                                   capacity, numRegistered, isFull, isArchived, tierRequirement)
+                VALUES ('register_stress scratch event', CURDATE(), NOW(), NOW(), 'bench',
+                        'created by bench/register_stress.py', %s, 0, 0, 0, 'Open')
+            """, (capacity,))
+            event_id = cursor.lastrowid
+            cursor.execute("SELECT studentID FROM student ORDER BY studentID")
+            students = [row["studentID"] for row in cursor.fetchall()]
+        conn.commit()
+        return event_id, students
+    finally:
+        conn.close()
+
+
+def check_event(event_id):
+    conn = connect()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT capacity, numRegistered, isFull FROM event WHERE eventID = %s",
+                (event_id,),
+            )
+            event = cursor.fetchone()
+            cursor.execute(
+                "SELECT COUNT(*) AS n FROM studentEvents WHERE eventID = %s", (event_id,)
+            )
+            rows = cursor.fetchone()["n"]
+        return event, rows
+    finally:
+        conn.close()
+
+
+def delete_event(event_id):
+    conn = connect()
+    try:
+        with conn.cursor() as cursor:
+            # studentEvents rows go with it (ON DELETE CASCADE)
+            cursor.execute("DELETE FROM event WHERE eventID = %s", (event_id,))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def worker(event_id, attempts, outcomes, latencies, start_gate):
+    conn = connect()
+    local = Counter()
+    local_latencies = []
+    try:
+        start_gate.wait()
+        for student_id in attempts:
+            started = time.perf_counter()
+            local[registration.register_student(conn, student_id, event_id)] += 1
+            local_latencies.append(time.perf_counter() - started)
+    finally:
+        conn.close()
+    with outcomes["lock"]:
+        outcomes["counts"].update(local)
+        latencies.extend(local_latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent event registration stress test")
+    parser.add_argument("--capacity", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--repeat", type=int, default=2,
+                        help="how many times each student tries to register")
+    parser.add_argument("--keep", action="store_true",
+                        help="keep the scratch event instead of deleting it")
+    args = parser.parse_args()
+
+    load_dotenv()
+    event_id, students = create_event(args.capacity)
+    attempts = students * args.repeat
+    print(f"event {event_id}: capacity {args.capacity}, "
+          f"{len(students)} students x {args.repeat} attempts, {args.threads} threads")
+
+    outcomes = {"lock": threading.Lock(), "counts": Counter()}
+    latencies = []
+    start_gate = threading.Barrier(args.threads + 1)
+    threads = [
+        threading.Thread(
+            target=worker,
+            args=(event_id, attempts[i::args.threads], outcomes, latencies, start_gate),
+        )
+        for i in range(args.threads)
+    ]
+    for t in threads:
+        t.start()
+    start_gate.wait()
+    started = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    try:
+        event, rows = check_event(event_id)
+    finally:
+        if not args.keep:
+            delete_event(event_id)
+
+    counts = outcomes["counts"]
+    latencies.sort()
+    expected = min(args.capacity, len(students)) if args.capacity > 0 else len(students)
+    print(f"outcomes: {dict(counts)}")
+    print(f"{len(attempts)} attempts in {elapsed:.2f}s -> {len(attempts) / elapsed:.0f} attempts/sec, "
+          f"{counts[registration.REGISTERED] / elapsed:.0f} registrations/sec")
+    print(f"latency p50 {latencies[len(latencies) // 2] * 1000:.1f}ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f}ms")
+    print(f"event row: {event}, studentEvents rows: {rows}")
+
+    failures = []
+    if counts[registration.REGISTERED] != expected:
+        failures.append(f"expected {expected} registrations, got {counts[registration.REGISTERED]}")
+    if rows != counts[registration.REGISTERED]:
+        failures.append(f"studentEvents has {rows} rows for {counts[registration.REGISTERED]} registrations")
+    if event["numRegistered"] != rows:
+        failures.append(f"numRegistered is {event['numRegistered']} but {rows} rows exist")
+    if args.capacity > 0 and rows > args.capacity:
+        failures.append(f"OVERSOLD: {rows} registrations for capacity {args.capacity}")
+    if args.capacity > 0 and event["isFull"] != (1 if rows >= args.capacity else 0):
+        failures.append(f"isFull is {event['isFull']} with {rows}/{args.capacity} registered")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("OK: no overselling, counters consistent")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
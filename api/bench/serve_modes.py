@@ -0,0 +1,153 @@
+#------------------------------------------------------------
+# Requests/sec of Flask's development server vs gunicorn.
+#
+# Starts the API twice on a spare port, first the way
+# `python backend_app.py` does (Flask's development server in debug
+# mode) and then under gunicorn with gunicorn.conf.py, and drives
+# each with --clients client processes for --seconds seconds.
+# Every client keeps its HTTP connection open between requests
+# (when the server allows it) and cycles through --path.  Reports
+# requests/sec, latency percentiles and errors for each mode.
+#
+# The development server is run without the reloader (which only
+# watches files in a second process and does not touch requests)
+# so the bench can stop it cleanly.
+#
+# Usage (from the api folder):
+#   python -m bench.serve_modes --clients 16 --seconds 20
+#   python -m bench.serve_modes --path /ops/pool --path "/student/clubs?limit=20"
+#------------------------------------------------------------
+import argparse
+import http.client
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import time
+
+DEV_SERVER = (
+    "from backend_app import app; "
+    "app.run(debug=True, use_reloader=False, host='127.0.0.1', port={port})"
+)
+
+
+def start_server(mode, port, workers, threads):
+    env = dict(os.environ, GUNICORN_ACCESS_LOG="")
+    if mode == "dev":
+        command = [sys.executable, "-c", DEV_SERVER.format(port=port)]
+    else:
+        command = [
+            sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+            "--bind", f"127.0.0.1:{port}", "--workers", str(workers),
+            "--threads", str(threads), "backend_app:app",
+        ]
+    server = subprocess.Popen(
+        command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/ops/pool")
+            conn.getresponse().read()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    stop_server(server)
+    raise SystemExit(f"{mode} server did not start on port {port}")
+
+
+def stop_server(server):
+    # SIGTERM lets gunicorn drain its workers
+    os.killpg(server.pid, signal.SIGTERM)
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        os.killpg(server.pid, signal.SIGKILL)
+
+
+def client(port, paths, seconds, results):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    latencies, errors = [], 0
+    deadline = time.monotonic() + seconds
+    i = 0
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            conn.request("GET", paths[i % len(paths)])
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 500:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+        i += 1
+    results.put((latencies, errors))
+
+
+def run_load(port, paths, clients, seconds):
+    results = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(target=client, args=(port, paths, seconds, results))
+        for _ in range(clients)
+    ]
+    started = time.monotonic()
+    for proc in procs:
+        proc.start()
+    latencies, errors = [], 0
+    for _ in procs:
+        proc_latencies, proc_errors = results.get()
+        latencies.extend(proc_latencies)
+        errors += proc_errors
+    for proc in procs:
+        proc.join()
+    elapsed = time.monotonic() - started
+    return latencies, errors, elapsed
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Development server vs gunicorn throughput")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--port", type=int, default=4100)
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count() * 2 + 1)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--path", action="append", dest="paths")
+    parser.add_argument("--mode", choices=["dev", "gunicorn"], action="append", dest="modes")
+    args = parser.parse_args()
+    paths = args.paths or ["/ops/pool", "/student/clubs?limit=20"]
+
+    print(f"{args.clients} clients, {args.seconds:.0f}s per mode, paths: {', '.join(paths)}")
+    print(f"{'mode':<10} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    rates = {}
+    for mode in args.modes or ["dev", "gunicorn"]:
+        server = start_server(mode, args.port, args.workers, args.threads)
+        try:
+            latencies, errors, elapsed = run_load(args.port, paths, args.clients, args.seconds)
+        finally:
+            stop_server(server)
+        latencies.sort()
+        rates[mode] = len(latencies) / elapsed
+        print(
+            f"{mode:<10} {rates[mode]:>9.0f} "
+            f"{percentile(latencies, 0.50) * 1000:>8.1f} "
+            f"{percentile(latencies, 0.95) * 1000:>8.1f} "
+            f"{percentile(latencies, 0.99) * 1000:>8.1f} {errors:>7}"
+        )
+    if rates.get("dev") and rates.get("gunicorn"):
+        print(f"gunicorn speed-up: {rates['gunicorn'] / rates['dev']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+###
+# Production server settings for the API (gunicorn).
+#
+# Run from the api folder:
+#   gunicorn -c gunicorn.conf.py backend_app:app
+#
+# backend_app.py is still the entry point; the only difference from
+# `python backend_app.py` is what serves it.  Instead of Flask's
+# single-process development server (debug mode, reloader) gunicorn
+# pre-forks WEB_CONCURRENCY worker processes with GUNICORN_THREADS
+# threads each.  Every setting can be overridden from the
+# environment (see api/.env.template).
+###
+import multiprocessing
+import os
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:4000")
+
+# Worker processes and threads per worker.  Requests spend most of
+# their time waiting on MySQL, so a few threads per process go a
+# long way.  Keep GUNICORN_THREADS at or below DB_POOL_MAX_SIZE:
+# each thread holds one pooled connection while it serves a request.
+workers = _env_int("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1)
+threads = _env_int("GUNICORN_THREADS", 4)
+worker_class = "gthread"
+
+# Build the app once in the master and fork the workers from it.
+# The connection pool, the background jobs and the response cache
+# are all fork-aware (each worker opens its own connections and
+# starts its own job threads on first use; the cache invalidation
+# counters live in shared memory created before the fork).
+preload_app = True
+
+# Keep client connections open between requests.  The Streamlit
+# app makes several API calls per page, so it reuses the same
+# connection instead of reconnecting every time.
+keepalive = _env_int("GUNICORN_KEEPALIVE", 5)
+
+# A worker that has not answered for `timeout` seconds is killed and
+# replaced.  On SIGTERM (docker stop) or SIGHUP, workers stop
+# accepting new connections and get `graceful_timeout` seconds to
+# finish the requests they are serving before they are killed.
+timeout = _env_int("GUNICORN_TIMEOUT", 60)
+graceful_timeout = _env_int("GUNICORN_GRACEFUL_TIMEOUT", 25)
+
+# Recycle each worker after this many requests (jittered so they do
+# not all restart at once).  0 turns it off.
+max_requests = _env_int("GUNICORN_MAX_REQUESTS", 5000)
+max_requests_jitter = _env_int("GUNICORN_MAX_REQUESTS_JITTER", 500)
+
+# "-" logs every request to stdout; an empty value turns it off
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-") or None
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+
+def post_fork(server, worker):
+    server.log.info(f"worker {worker.pid} started ({threads} threads)")
+
+
+def worker_exit(server, worker):
+    # Buffered work (search log, rollup marks) is flushed by the
+    # atexit hooks in backend/db_connection/background.py once the
+    # worker's in-flight requests are done.
+    server.log.info(f"worker {worker.pid} exiting")
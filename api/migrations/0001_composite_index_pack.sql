@@ -0,0 +1,53 @@
+-- 0001: composite indexes for the hot filters in the route files.
+--
+-- Every CREATE INDEX here is skipped by the migration runner when an
+-- index with the same name already exists on the table, so it is safe
+-- to re-run against a database that was partly migrated by hand.
+
+
+-- application: kaitlyn.get_club_applications / get_interested_students
+--   WHERE clubID = ? AND status = 'Pending' ORDER BY dateSubmitted
+-- also serves willow.get_club_apps (GROUP BY clubID)
+CREATE INDEX idx_application_club_status_date
+    ON application (clubID, status, dateSubmitted);
+
+-- application: alex.get_student_applications
+--   WHERE studentID = ? ORDER BY dateSubmitted DESC
+CREATE INDEX idx_application_student_date
+    ON application (studentID, dateSubmitted);
+
+-- event: kaitlyn.get_club_events
+--   WHERE date >= CURDATE() AND isArchived = 0 ORDER BY date
+-- the equality column goes first so the date range can still use the index
+CREATE INDEX idx_event_archived_date
+    ON `event` (isArchived, date);
+
+-- studentJoins: kaitlyn.get_club_members, willow.get_club_demographics
+--   WHERE clubID = ?   (studentID rides along as the primary key,
+--   so member lists are answered from the index alone)
+CREATE INDEX idx_studentJoins_club_member
+    ON studentJoins (clubID, memberType, joinDate);
+
+-- student: member / registration lists ORDER BY lastName, firstName
+CREATE INDEX idx_student_name
+    ON student (lastName, firstName);
+
+-- club: alex.get_clubs  WHERE campus = ? AND gradLevel = ?
+CREATE INDEX idx_club_campus_grad
+    ON club (campus, gradLevel);
+
+-- error: Elizabeth.get_all_errors  WHERE errorType = ? AND timeReported = ?
+CREATE INDEX idx_error_type_time
+    ON error (errorType, timeReported);
+
+-- error: Elizabeth.get_all_errors  WHERE timeReported = ? (without a type)
+CREATE INDEX idx_error_time
+    ON error (timeReported);
+
+-- error: Elizabeth.get_all_system_errors  WHERE systemID = ? AND errorType = ?
+CREATE INDEX idx_error_system_type
+    ON error (systemID, errorType);
+
+-- update: Elizabeth.get_all_updates  WHERE updateStatus = ? AND updateType = ?
+CREATE INDEX idx_update_status_type
+    ON `update` (updateStatus, updateType);
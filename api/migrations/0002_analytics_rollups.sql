@@ -0,0 +1,66 @@
+-- 0002: per-club summary tables behind the willow analytics routes.
+--
+-- They are kept up to date by backend/willow/rollups.py: writes mark
+-- clubs / events as changed and a background job refreshes just those
+-- rows a few seconds later, plus a periodic full rebuild.  The
+-- statements below create the tables and fill them for the first time.
+
+
+CREATE TABLE IF NOT EXISTS clubStats (
+   clubID          INT,
+   name            VARCHAR(150),
+   numSearches     INT,
+   numApplications INT,
+   numMembers      INT,
+   refreshedAt     DATETIME,
+   PRIMARY KEY (clubID),
+   FOREIGN KEY (clubID) REFERENCES club(clubID)
+       ON DELETE CASCADE
+       ON UPDATE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS clubEventStats (
+   clubID          INT,
+   eventID         INT,
+   clubName        VARCHAR(150),
+   eventName       VARCHAR(150),
+   numRegistered   INT,
+   numClubMembers  INT,
+   refreshedAt     DATETIME,
+   PRIMARY KEY (clubID, eventID),
+   FOREIGN KEY (clubID) REFERENCES club(clubID)
+       ON DELETE CASCADE
+       ON UPDATE CASCADE,
+   FOREIGN KEY (eventID) REFERENCES `event`(eventID)
+       ON DELETE CASCADE
+       ON UPDATE CASCADE
+);
+
+CREATE INDEX idx_clubStats_name
+    ON clubStats (name);
+
+INSERT INTO clubStats (clubID, name, numSearches, numApplications, numMembers, refreshedAt)
+SELECT * FROM (
+    SELECT c.clubID, c.name, COALESCE(c.numSearches, 0) AS numSearches,
+           (SELECT COUNT(*) FROM application a WHERE a.clubID = c.clubID) AS numApplications,
+           COALESCE(c.numMembers, 0) AS numMembers, NOW() AS refreshedAt
+    FROM club c
+) AS fresh
+ON DUPLICATE KEY UPDATE
+    name = fresh.name, numSearches = fresh.numSearches,
+    numApplications = fresh.numApplications, numMembers = fresh.numMembers,
+    refreshedAt = fresh.refreshedAt;
+
+INSERT INTO clubEventStats (clubID, eventID, clubName, eventName, numRegistered, numClubMembers, refreshedAt)
+SELECT * FROM (
+    SELECT c.clubID, e.eventID, c.name AS clubName, e.name AS eventName,
+           COALESCE(e.numRegistered, 0) AS numRegistered,
+           COALESCE(c.numMembers, 0) AS numClubMembers, NOW() AS refreshedAt
+    FROM club c
+    JOIN clubEvents ce ON c.clubID = ce.clubID
+    JOIN `event` e ON ce.eventID = e.eventID
+) AS fresh
+ON DUPLICATE KEY UPDATE
+    clubName = fresh.clubName, eventName = fresh.eventName,
+    numRegistered = fresh.numRegistered, numClubMembers = fresh.numClubMembers,
+    refreshedAt = fresh.refreshedAt;
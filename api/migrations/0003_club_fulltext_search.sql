@@ -0,0 +1,12 @@
+-- 0003: FULLTEXT indexes for the text search on /student/clubs?q=...
+--
+-- alex_student/club_search.py ranks name matches above description
+-- matches, so name gets an index of its own next to the combined one
+-- (MATCH() needs an index on exactly the columns it lists).
+
+
+CREATE FULLTEXT INDEX ft_club_name
+    ON club (name);
+
+CREATE FULLTEXT INDEX ft_club_name_description
+    ON club (name, description);
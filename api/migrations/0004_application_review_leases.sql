@@ -0,0 +1,17 @@
+-- 0004: lease columns for the e-board review queue.
+--
+-- A reviewer claims pending applications for a while
+-- (kaitlyn/review.py): claimedBy says who, claimExpiresAt until
+-- when.  Expired claims go back into the queue on their own, so a
+-- reviewer who closes the tab does not strand applications.
+
+
+ALTER TABLE application ADD COLUMN claimedBy VARCHAR(100) NULL;
+
+ALTER TABLE application ADD COLUMN claimExpiresAt DATETIME NULL;
+
+-- review queue: WHERE clubID = ? AND status = 'Pending'
+--   AND (claimExpiresAt IS NULL OR claimExpiresAt < NOW())
+--   ORDER BY dateSubmitted, applicationID
+CREATE INDEX idx_application_club_status_claim
+    ON application (clubID, status, claimExpiresAt, dateSubmitted);
@@ -0,0 +1,27 @@
+-- 0005: FIFO waitlists for full events (alex_student/waitlist.py).
+--
+-- Each event keeps two counters: waitlistTail is the last position
+-- handed out and waitlistHead the last position promoted, so the
+-- waitlist length is tail - head and a student's place in line is
+-- their position - head.  Positions stay contiguous (leaving the
+-- list closes the gap), which keeps every lookup a primary-key read.
+
+
+ALTER TABLE `event` ADD COLUMN waitlistHead INT NOT NULL DEFAULT 0;
+
+ALTER TABLE `event` ADD COLUMN waitlistTail INT NOT NULL DEFAULT 0;
+
+CREATE TABLE IF NOT EXISTS eventWaitlist (
+   eventID     INT,
+   studentID   INT,
+   position    INT NOT NULL,
+   joinedAt    DATETIME DEFAULT CURRENT_TIMESTAMP,
+   PRIMARY KEY (eventID, studentID),
+   UNIQUE KEY uq_eventWaitlist_position (eventID, position),
+   FOREIGN KEY (eventID) REFERENCES `event`(eventID)
+       ON DELETE CASCADE
+       ON UPDATE CASCADE,
+   FOREIGN KEY (studentID) REFERENCES student(studentID)
+       ON DELETE CASCADE
+       ON UPDATE CASCADE
+);
@@ -0,0 +1,27 @@
+-- 0006: time-limited seat holds for flash-crowd events
+-- (alex_student/holds.py).
+--
+-- event.numHeld counts live holds, so admission checks
+-- numRegistered + numHeld against capacity in the same single-row
+-- UPDATE as before.  The expiresAt index lets the sweeper read only
+-- the holds that have run out instead of scanning every hold.
+
+
+ALTER TABLE `event` ADD COLUMN numHeld INT NOT NULL DEFAULT 0;
+
+CREATE TABLE IF NOT EXISTS eventHold (
+   holdID      INT AUTO_INCREMENT PRIMARY KEY,
+   eventID     INT NOT NULL,
+   studentID   INT NOT NULL,
+   createdAt   DATETIME DEFAULT CURRENT_TIMESTAMP,
+   expiresAt   DATETIME NOT NULL,
+   UNIQUE KEY uq_eventHold_student (eventID, studentID),
+   FOREIGN KEY (eventID) REFERENCES `event`(eventID)
+       ON DELETE CASCADE
+       ON UPDATE CASCADE,
+   FOREIGN KEY (studentID) REFERENCES student(studentID)
+       ON DELETE CASCADE
+       ON UPDATE CASCADE
+);
+
+CREATE INDEX idx_eventHold_expiresAt ON eventHold (expiresAt);
@@ -0,0 +1,20 @@
+-- 0007: stored responses for POST requests sent with an
+-- Idempotency-Key header (cache/idempotency.py).
+--
+-- Rows are kept small: the key (scoped to method and path) and the
+-- request body are stored as SHA-256 digests and the response body
+-- is zlib-compressed.  The expiresAt index lets the sweeper delete
+-- expired rows without scanning the table.
+
+
+CREATE TABLE IF NOT EXISTS idempotencyKey (
+   keyHash       BINARY(32) PRIMARY KEY,
+   requestHash   BINARY(32) NOT NULL,
+   statusCode    SMALLINT NOT NULL,
+   contentType   VARCHAR(100) NOT NULL,
+   body          MEDIUMBLOB NOT NULL,
+   createdAt     DATETIME DEFAULT CURRENT_TIMESTAMP,
+   expiresAt     DATETIME NOT NULL
+);
+
+CREATE INDEX idx_idempotencyKey_expiresAt ON idempotencyKey (expiresAt);
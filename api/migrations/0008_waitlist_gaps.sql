@@ -0,0 +1,10 @@
+-- 0008: no schema change; corrects the notes in 0005, which is left
+-- as it was applied so its checksum still matches.
+--
+-- Leaving a waitlist no longer closes the gap: alex_student/waitlist.py
+-- deletes the student's row and leaves every position behind it alone,
+-- so a leave does not rewrite or lock the rest of the line.  Positions
+-- are therefore not contiguous.  position - waitlistHead (the place)
+-- and waitlistTail - waitlistHead (the length) are still read by
+-- primary key, but are upper bounds: each gap ahead of a student
+-- makes their real place one better than reported.
@@ -0,0 +1,35 @@
+# Helper for GET requests to the API that avoids downloading the
+# same data again on every Streamlit rerun.
+#
+# The API sends an ETag with each response (see
+# api/backend/cache/transfer.py).  get() remembers the last response
+# per URL in the user's session and sends its ETag back; when nothing
+# has changed the API answers 304 with no body and the remembered
+# response is returned instead.  The shared requests.Session keeps
+# the connection to the API open and asks for compressed responses.
+
+import requests
+import streamlit as st
+
+
+@st.cache_resource
+def _session():
+    return requests.Session()
+
+
+def get(url, params=None, **kwargs):
+    """Drop-in for requests.get(url, params=...) for JSON API calls."""
+    key = (url, tuple(sorted((params or {}).items())))
+    remembered = st.session_state.setdefault("_api_responses", {})
+    previous = remembered.get(key)
+
+    headers = dict(kwargs.pop("headers", None) or {})
+    if previous is not None and previous.headers.get("ETag"):
+        headers["If-None-Match"] = previous.headers["ETag"]
+
+    response = _session().get(url, params=params, headers=headers, **kwargs)
+    if response.status_code == 304 and previous is not None:
+        return previous
+    if response.status_code == 200 and response.headers.get("ETag"):
+        remembered[key] = response
+    return response
@@ -3,6 +3,7 @@ logger = logging.getLogger(__name__)
 import streamlit as st
 import requests
 from modules.nav import SideBarLinks
+from modules import api
 
 st.set_page_config(layout='wide')
 SideBarLinks()
@@ -11,7 +12,7 @@ st.title("Manage Member Tiers")
 st.write('')
 
 try:
-    response = requests.get('http://api:4000/eboardmember/clubs/1/members')
+    response = api.get('http://api:4000/eboardmember/clubs/1/members')
     
     if response.status_code == 200:
         members = response.json()
@@ -54,10 +55,56 @@ try:
                             st.error("Error updating member tier")
                     except:
                         st.error("Error updating member tier")
+
+            # Change many members' tiers in one request
+            st.write('')
+            st.subheader("Bulk Tier Change")
+            selected_bulk = st.multiselect("Select members:", options=list(member_options.keys()))
+            bulk_tier = st.selectbox(
+                "New Tier for Selected Members",
+                ["General Member", "Active Member", "E-Board"]
+            )
+            if st.button("Update Selected", disabled=not selected_bulk):
+                try:
+                    bulk_response = requests.put(
+                        "http://api:4000/eboardmember/clubs/1/members",
+                        json={"studentIDs": [member_options[name] for name in selected_bulk], "memberType": bulk_tier}
+                    )
+                    if bulk_response.status_code == 200:
+                        st.success(f"Updated {bulk_response.json()['applied']} members to {bulk_tier}!")
+                        st.rerun()
+                    else:
+                        st.error("Error updating member tiers")
+                except:
+                    st.error("Error updating member tiers")
         else:
             st.info("No members found")
     else:
         st.error("Error fetching members")
         
 except:
-    st.error("Could not connect to database")
\ No newline at end of file
+    st.error("Could not connect to database")
+
+# Load a roster file (studentID, memberType, joinDate columns)
+st.write('')
+st.subheader("Import Roster")
+roster_file = st.file_uploader("Roster CSV", type=["csv"])
+replace_roster = st.checkbox("Remove members who are not in the file")
+if roster_file is not None and st.button("Import Roster"):
+    try:
+        import_response = requests.post(
+            "http://api:4000/eboardmember/clubs/1/members/import",
+            params={"mode": "replace" if replace_roster else "merge"},
+            data=roster_file.getvalue(),
+            headers={"Content-Type": "text/csv"}
+        )
+        result = import_response.json()
+        if import_response.status_code == 200:
+            st.success(f"{result['message']} ({result['removed']} removed, {result['rejected']} rows rejected). "
+                       f"The club now has {result['numMembers']} members.")
+            for error in result['errors']:
+                st.warning(f"Line {error['line']}: {error['error']}")
+        else:
+            st.error(result.get('error', 'Error importing roster'))
+    except:
+        st.error("Error importing roster")
@@ -81,6 +81,35 @@ try:
                                 st.error("Error deleting application")
                         except:
                             st.error("Error deleting application")
+
+            # Decide many pending applications in one request
+            st.write('')
+            st.subheader("Bulk Review")
+            pending_options = {f"{app['firstName']} {app['lastName']} - {app['major']}": app['applicationID']
+                               for app in applications if app['status'] == 'pending'}
+            selected_bulk = st.multiselect("Select pending applications:", options=list(pending_options.keys()))
+            
+            bulk_col1, bulk_col2 = st.columns(2)
+            for column, label, status in ((bulk_col1, "✅ Approve Selected", "Accepted"),
+                                          (bulk_col2, "❌ Deny Selected", "Rejected")):
+                with column:
+                    if st.button(label, disabled=not selected_bulk):
+                        try:
+                            bulk_response = requests.put(
+                                "http://api:4000/eboardmember/applications",
+                                json={
+                                    "applicationIDs": [pending_options[name] for name in selected_bulk],
+                                    "status": status,
+                                    "clubID": 1
+                                }
+                            )
+                            if bulk_response.status_code == 200:
+                                st.success(f"{bulk_response.json()['applied']} applications marked {status}")
+                                st.rerun()
+                            else:
+                                st.error("Error updating applications")
+                        except:
+                            st.error("Error updating applications")
         else:
             st.info("No applications found")
     else:
@@ -27,9 +27,35 @@ with st.form(f"add_clubID_{st.session_state.form_key_counter}"):
 
 st.title(f"Demographics Data For Club {clubID}")
 
-demos = requests.get(f'http://api:4000/clubs/{clubID}/demographics').json()
+summary = requests.get(f'http://api:4000/clubs/{clubID}/demographics/summary',
+                       params={'crosstab': 'gender,race'}).json()
 
 try:
-  st.dataframe(demos)
+  club = summary['overall']
+  st.metric("Members", club['members'])
+
+  col1, col2 = st.columns(2)
+  with col1:
+    st.subheader("Gender")
+    st.bar_chart(club['gender'])
+    st.subheader("Grad Year")
+    st.bar_chart(club['gradYear'])
+  with col2:
+    st.subheader("Race")
+    st.bar_chart(club['race'])
+    st.subheader("Age")
+    ages = {f"{low}-{high - 1}": count for (low, high), count in zip(club['age']['bins'], club['age']['counts'])}
+    st.bar_chart(ages)
+
+  st.subheader("Gender by Race")
+  st.dataframe(club['crosstab']['counts'])
 except:
-  st.write('Could not connect to database to retrieve searches')
\ No newline at end of file
+  st.write('Could not connect to database to retrieve demographics')
+
+# the individual member rows are still available on request
+if st.checkbox("Show member rows"):
+  demos = requests.get(f'http://api:4000/clubs/{clubID}/demographics').json()
+  try:
+    st.dataframe(demos)
+  except:
+    st.write('Could not connect to database to retrieve demographics')
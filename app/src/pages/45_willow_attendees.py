@@ -2,13 +2,14 @@ import streamlit as st
 import requests
 from streamlit_extras.app_logo import add_logo
 from modules.nav import SideBarLinks
+from modules import api
 
 # Initialize sidebar
 SideBarLinks()
 
 st.title("Event Attendees Data")
 
-searches = requests.get('http://api:4000/events/attendees').json()
+searches = api.get('http://api:4000/events/attendees').json()
 
 try:
   st.dataframe(searches)
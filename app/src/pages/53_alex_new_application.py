@@ -7,7 +7,7 @@ SideBarLinks()
 st.title("Submit a New Application")
 
 student_id = st.text_input("Student ID", placeholder="Enter student ID number")
-club_id = st.text_input("Club ID", placeholder="Enter club ID number")
+club_id = st.text_input("Club ID(s)", placeholder="Enter a club ID, or several separated by commas")
 date_submitted = st.date_input("Date Submitted")
 
 if st.button("Submit Application", type="primary"):
@@ -25,20 +25,47 @@ if st.button("Submit Application", type="primary"):
         st.error("Student ID must be a valid number")
         st.stop()
     
-    # Validate club ID input
+    # Validate club ID input (one or more, comma separated)
     if not club_id or not club_id.strip():
         st.error("Please enter a Club ID")
         st.stop()
     
     try:
-        club_id_int = int(club_id.strip())
-        if club_id_int < 1:
-            st.error("Club ID must be a positive number")
+        club_ids = [int(c.strip()) for c in club_id.split(",") if c.strip()]
+        if any(c < 1 for c in club_ids):
+            st.error("Club IDs must be positive numbers")
             st.stop()
     except ValueError:
-        st.error("Club ID must be a valid number")
+        st.error("Club IDs must be valid numbers")
         st.stop()
     
+    # Several clubs go to the API in one request
+    if len(club_ids) > 1:
+        try:
+            response = requests.post(
+                "http://api:4000/student/applications/batch",
+                json={
+                    "studentID": student_id_int,
+                    "clubIDs": club_ids,
+                    "dateSubmitted": str(date_submitted)
+                }
+            )
+            result = response.json()
+            if response.status_code not in (201, 400) or "results" not in result:
+                st.error(f"HTTP Error {response.status_code}: {result.get('error', '')}")
+                st.stop()
+            st.write(f"**Message:** {result.get('message', '')}")
+            for item in result["results"]:
+                if item["status"] == "created":
+                    st.success(f"✅ Club {club_ids[item['index']]}: application {item['applicationID']} created")
+                else:
+                    st.error(f"Club {club_ids[item['index']]}: {item['error']}")
+        except requests.exceptions.RequestException as e:
+            st.error(f"Could not connect to the API: {str(e)}")
+        st.stop()
+
+    club_id_int = club_ids[0]
+    
     url = "http://api:4000/student/applications"
     
     body = {
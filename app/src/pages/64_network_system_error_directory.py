@@ -2,6 +2,7 @@ import streamlit as st
 import requests
 from streamlit_extras.app_logo import add_logo
 from modules.nav import SideBarLinks
+from modules import api
 
 # Initialize sidebar
 SideBarLinks()
@@ -16,7 +17,7 @@ col1, col2 = st.columns(2)
 
 # Get unique values for filters from the API
 try:
-    response = requests.get(API_URL)
+    response = api.get(API_URL)
     if response.status_code == 200:
         errors = response.json()
 
@@ -39,7 +40,7 @@ try:
             params["errorType"] = selected_error_type
 
         # Get filtered data
-        filtered_response = requests.get(API_URL, params=params)
+        filtered_response = api.get(API_URL, params=params)
         if filtered_response.status_code == 200:
             filtered_errors = filtered_response.json()
 